@@ -0,0 +1,193 @@
+# Streaming arrival forecasts for live lines
+import pickle
+
+import numpy as np
+import torch
+
+from production import COLORS
+
+# Forecaster inputs and outputs per tick: arrival count, then each color's share of it
+FORECAST_COLUMNS = ['arrivals'] + COLORS
+
+
+def load_forecaster(path, model_class=None, model_args=(), allow_pickle=True):
+    """Load an LSTM forecaster saved as a state_dict or (with allow_pickle) a pickled module.
+
+    State dicts are loaded into model_class(*model_args), importing
+    LSTMForecaster from the training module only when no class is given.
+    """
+    try:
+        saved = torch.load(path, map_location='cpu', weights_only=True)
+    except pickle.UnpicklingError:
+        if not allow_pickle:
+            raise ValueError(f"{path} is a pickled module; pass allow_pickle=True or save its state_dict") from None
+        return torch.load(path, map_location='cpu', weights_only=False)
+    if model_class is None:
+        from algorithm import LSTMForecaster as model_class
+    model = model_class(*model_args)
+    model.load_state_dict(saved)
+    return model
+
+
+def _find_lstm(model):
+    lstms = [module for module in model.modules() if isinstance(module, torch.nn.LSTM)]
+    if len(lstms) != 1:
+        raise ValueError(f"Expected one nn.LSTM in the forecaster, found {len(lstms)}; pass lstm= explicitly")
+    return lstms[0]
+
+
+class StreamingForecaster:
+    """Steps an LSTM forecaster one tick at a time for many lines at once.
+
+    The forecaster is assumed to compute ``head(lstm(window)[0][:, -1])``:
+    an LSTM over a window of ticks started from a zero state, then a head on
+    the last output. Instead of re-running the window on every tick, the
+    hidden and cell state of every line are carried forward one timestep
+    per ``step``. Carried state sees more history than the window does, so
+    once a line has a full window it is re-synced every ``resync_every``
+    ticks by re-running just that window from zero, which makes its state
+    match the windowed forecaster exactly again.
+
+    Args:
+        model: The forecaster module (only its LSTM and head are used)
+        n_lines: Number of lines stepped together
+        window: Ticks in the forecaster's input window
+        resync_every: Ticks between re-syncs per line; defaults to window
+        lstm, head: Override the LSTM (default: the model's only nn.LSTM)
+            and head (default: ``model.fc``)
+    """
+
+    def __init__(self, model, n_lines=1, window=60, resync_every=None, lstm=None, head=None):
+        model.eval()
+        self.lstm = lstm or _find_lstm(model)
+        self.head = head if head is not None else getattr(model, 'fc', None)
+        if self.head is None:
+            raise ValueError("The forecaster has no fc head; pass head= explicitly")
+        if self.lstm.bidirectional:
+            raise ValueError("A bidirectional LSTM cannot be stepped forward in time")
+        self.n_lines = n_lines
+        self.window = window
+        self.resync_every = resync_every or window
+        self.n_features = self.lstm.input_size
+        self.resyncs = 0
+        self.reset()
+
+    def reset(self, lines=None):
+        """Zero the state and history of the given lines (all by default)."""
+        if lines is None:
+            layers = self.lstm.num_layers
+            hidden = self.lstm.proj_size or self.lstm.hidden_size
+            self.h = torch.zeros(layers, self.n_lines, hidden)
+            self.c = torch.zeros(layers, self.n_lines, self.lstm.hidden_size)
+            # per line: ring buffer of the last `window` inputs, next slot, inputs held, ticks since re-sync
+            self.history = torch.zeros(self.n_lines, self.window, self.n_features)
+            self.next_slot = torch.zeros(self.n_lines, dtype=torch.long)
+            self.filled = torch.zeros(self.n_lines, dtype=torch.long)
+            self.since_resync = torch.zeros(self.n_lines, dtype=torch.long)
+            return
+        lines = torch.as_tensor(lines, dtype=torch.long)
+        for tensor in (self.h, self.c):
+            tensor[:, lines] = 0
+        for tensor in (self.history, self.next_slot, self.filled, self.since_resync):
+            tensor[lines] = 0
+
+    def _run(self, inputs, state):
+        # inputs (lines, time, features); the LSTM may expect time first
+        if not self.lstm.batch_first:
+            inputs = inputs.transpose(0, 1)
+        _, state = self.lstm(inputs, state)
+        return state
+
+    def windows(self, lines):
+        """Chronological input windows (len(lines), window, n_features) of full lines."""
+        offsets = (self.next_slot[lines, None] + torch.arange(self.window)) % self.window
+        return self.history[lines[:, None], offsets]
+
+    def _resync(self, lines):
+        zeros = (self.h.new_zeros(self.h.shape[0], len(lines), self.h.shape[2]),
+                 self.c.new_zeros(self.c.shape[0], len(lines), self.c.shape[2]))
+        h, c = self._run(self.windows(lines), zeros)
+        self.h[:, lines] = h
+        self.c[:, lines] = c
+        self.since_resync[lines] = 0
+        self.resyncs += len(lines)
+
+    def step(self, inputs, lines=None):
+        """Advance lines by one tick and return their forecasts.
+
+        Args:
+            inputs: (len(lines), n_features) tick features, e.g. from tick_features
+            lines: Line indexes that ticked; all lines if None
+
+        Returns:
+            NumPy array (len(lines), outputs) of head outputs
+        """
+        lines = torch.arange(self.n_lines) if lines is None else torch.as_tensor(lines, dtype=torch.long)
+        x = torch.as_tensor(np.asarray(inputs, dtype=np.float32)).reshape(len(lines), self.n_features)
+        with torch.no_grad():
+            h, c = self._run(x[:, None, :], (self.h[:, lines], self.c[:, lines]))
+            self.h[:, lines] = h
+            self.c[:, lines] = c
+
+            self.history[lines, self.next_slot[lines]] = x
+            self.next_slot[lines] = (self.next_slot[lines] + 1) % self.window
+            self.filled[lines] = torch.clamp(self.filled[lines] + 1, max=self.window)
+            self.since_resync[lines] += 1
+            due = lines[(self.filled[lines] == self.window) & (self.since_resync[lines] >= self.resync_every)]
+            if len(due):
+                self._resync(due)
+            # the last LSTM output is the top layer's hidden state
+            return self.head(self.h[-1, lines]).numpy()
+
+
+def tick_features(counts, colors=COLORS):
+    """Forecaster input for one tick from a dict of color -> cars that arrived in it."""
+    total = sum(counts.values())
+    shares = [counts.get(color, 0) / total if total else 0.0 for color in colors]
+    return np.array([total] + shares, dtype=np.float32)
+
+
+class ForecastFeed:
+    """Live arrival counts in, per-line arrival rate and color mix forecasts out.
+
+    Call ``record_arrival`` as cars arrive and ``tick`` once per tick; the
+    forecasts then parameterize ``simulate.forecast_arrivals`` (or anything
+    else that takes a color_distribution) in place of the static default.
+    Forecast outputs follow FORECAST_COLUMNS: arrivals per tick, then color shares.
+    """
+
+    def __init__(self, forecaster, colors=COLORS):
+        self.forecaster = forecaster
+        self.colors = colors
+        self.counts = [{} for _ in range(forecaster.n_lines)]
+        self.latest = [None] * forecaster.n_lines
+
+    def record_arrival(self, line, color):
+        counts = self.counts[line]
+        counts[color] = counts.get(color, 0) + 1
+
+    def tick(self):
+        """Close the current tick on every line and update all forecasts in one batched step."""
+        inputs = np.stack([tick_features(counts, self.colors) for counts in self.counts])
+        forecasts = self.forecaster.step(inputs)
+        self.latest = list(forecasts)
+        self.counts = [{} for _ in self.counts]
+        return forecasts
+
+    def rate(self, line):
+        """Forecast arrivals per tick, or None before the first tick."""
+        forecast = self.latest[line]
+        return None if forecast is None else max(0.0, float(forecast[0]))
+
+    def color_distribution(self, line):
+        """Forecast color mix as percentages (BufferSystem format), or None before the first tick."""
+        forecast = self.latest[line]
+        if forecast is None:
+            return None
+        shares = np.clip(forecast[1:1 + len(self.colors)], 0.0, None)
+        total = shares.sum()
+        if total <= 0:
+            return None
+        distribution = {color: round(float(share / total * 100), 2) for color, share in zip(self.colors, shares)}
+        distribution[0] = 0
+        return distribution
@@ -0,0 +1,369 @@
+"""LinUCB lane routing: a contextual bandit that picks the lane for every car.
+
+Each lane is an arm. For a car, every lane gets a context row (see
+``lane_features``) and LinUCB scores all of them at once::
+
+    score[n, k] = theta[k] . x[n, k] + alpha * sqrt(x[n, k]' A_inv[k] x[n, k])
+
+``select`` does this for a whole batch of cars with stacked arrays, so one
+call can route the next car of many lines. Updates keep ``A_inv`` current
+with a Sherman-Morrison rank-one step, O(d^2) per observation instead of a
+d x d inverse.
+
+``BanditRouter`` plugs a LinUCB into a BufferSystem (``bs.router``). Each
+routing decision is rewarded when it is made, by whether the car joined a
+lane of its own color, started an empty lane, mixed colors in a lane or
+was turned away by a full lane (see ``REWARDS``).
+
+    python bandit.py --lines 64 --cars 20000 --seed 7
+"""
+import argparse
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lane_index import OVEN1, OVEN2
+from lane_store import DEFAULT_LANE_CAPACITIES, parse_layout
+from sequencing import BufferSystem
+from simulate import PICK_POLICIES, random_arrivals
+
+# context row of one (car, lane) pair
+FEATURES = ('bias', 'front_match', 'back_match', 'empty', 'full', 'fill', 'front_share', 'car_share')
+N_FEATURES = len(FEATURES)
+DEFAULT_SNAPSHOT_PATH = 'linucb_bandit.npz'
+# reward of a routing decision by what it did to the chosen lane: the car
+# joined a lane that starts and ends with its color, started an empty lane,
+# was queued where it mixes colors, or hit a full lane (overflow to oven 2,
+# or rejection)
+REWARDS = {'match': 1.0, 'empty': 0.8, 'mismatch': 0.0, 'full': 0.5}
+
+
+class LinUCB:
+    """Disjoint LinUCB over n_arms arms with n_features-dimensional contexts.
+
+    Args:
+        n_arms: Number of arms (lanes)
+        n_features: Context dimension
+        alpha: Exploration weight of the confidence bonus
+        ridge: Initial A = ridge * I
+    """
+
+    def __init__(self, n_arms, n_features=N_FEATURES, alpha=1.0, ridge=1.0):
+        self.n_arms = n_arms
+        self.n_features = n_features
+        self.alpha = alpha
+        self.ridge = ridge
+        self.A_inv = np.tile(np.eye(n_features) / ridge, (n_arms, 1, 1))
+        self.b = np.zeros((n_arms, n_features))
+        self.theta = np.zeros((n_arms, n_features))
+        self.counts = np.zeros(n_arms, dtype=np.int64)
+        self.updates = 0
+
+    def _stacked(self, contexts):
+        # (N, d) contexts are shared by every arm; (N, K, d) gives each arm its own
+        X = np.asarray(contexts, dtype=np.float64)
+        if X.ndim == 2:
+            X = np.broadcast_to(X[:, None, :], (X.shape[0], self.n_arms, self.n_features))
+        return X
+
+    def scores(self, contexts):
+        """Upper confidence bounds, shape (N, n_arms)."""
+        X = self._stacked(contexts)
+        mean = np.einsum('nkd,kd->nk', X, self.theta)
+        # x' A_inv x for every (car, arm) pair in two stacked products
+        variance = np.einsum('nkd,nkd->nk', np.einsum('kde,nke->nkd', self.A_inv, X), X)
+        return mean + self.alpha * np.sqrt(np.maximum(variance, 0.0))
+
+    def select(self, contexts, mask=None):
+        """Best arm per context row; with a boolean (N, n_arms) mask, -1 where no arm is allowed."""
+        scores = self.scores(contexts)
+        if mask is None:
+            return scores.argmax(axis=1)
+        mask = np.asarray(mask, dtype=bool)
+        arms = np.where(mask, scores, -np.inf).argmax(axis=1)
+        arms[~mask.any(axis=1)] = -1
+        return arms
+
+    def update(self, arm, x, reward):
+        """Sherman-Morrison update of arm with context x and its observed reward."""
+        x = np.asarray(x, dtype=np.float64)
+        A_inv = self.A_inv[arm]
+        Ax = A_inv @ x
+        A_inv -= np.outer(Ax, Ax) / (1.0 + x @ Ax)
+        self.b[arm] += reward * x
+        self.theta[arm] = A_inv @ self.b[arm]
+        self.counts[arm] += 1
+        self.updates += 1
+
+    def update_batch(self, arms, contexts, rewards):
+        """Apply observations in order (each step depends on the previous A_inv of its arm)."""
+        for arm, x, reward in zip(arms, contexts, rewards):
+            self.update(arm, x, reward)
+
+    def snapshot(self):
+        """Copy of the learned state, compact: the upper triangle of each symmetric A_inv.
+
+        The copy is taken on the caller's thread (a few memcpys), so it can be
+        written out elsewhere while selection and updates carry on.
+        """
+        rows, cols = np.triu_indices(self.n_features)
+        return {
+            'a_inv': self.A_inv[:, rows, cols].copy(),
+            'b': self.b.copy(),
+            'counts': self.counts.copy(),
+            'params': np.array([self.alpha, self.ridge, self.updates], dtype=np.float64),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state):
+        n_arms, n_packed = state['a_inv'].shape
+        n_features = int((np.sqrt(8 * n_packed + 1) - 1) / 2)
+        alpha, ridge, updates = state['params']
+        bandit = cls(n_arms, n_features, alpha, ridge)
+        rows, cols = np.triu_indices(n_features)
+        bandit.A_inv[:, rows, cols] = state['a_inv']
+        bandit.A_inv[:, cols, rows] = state['a_inv']
+        bandit.b[:] = state['b']
+        bandit.theta = np.einsum('kde,ke->kd', bandit.A_inv, bandit.b)
+        bandit.counts[:] = state['counts']
+        bandit.updates = int(updates)
+        return bandit
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls.from_snapshot(dict(data))
+
+
+def save_snapshot(state, path):
+    """Write a snapshot() to path as compressed .npz, replacing any previous file atomically."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **state)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp, path)
+
+
+class Snapshotter:
+    """Saves a bandit every ``every`` updates on a background thread.
+
+    A snapshot is skipped while the previous write is still running, so a
+    slow disk never holds up routing.
+    """
+
+    def __init__(self, bandit, path=DEFAULT_SNAPSHOT_PATH, every=10000):
+        self.bandit = bandit
+        self.path = path
+        self.every = every
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bandit-snapshot')
+        self._pending = None
+        self._last_update = bandit.updates
+        self.written = 0
+
+    def maybe_snapshot(self):
+        if self.bandit.updates - self._last_update < self.every:
+            return
+        if self._pending is not None and not self._pending.done():
+            return
+        self._last_update = self.bandit.updates
+        self._pending = self.executor.submit(save_snapshot, self.bandit.snapshot(), self.path)
+        self.written += 1
+
+    def close(self):
+        """Write the final state and wait for it."""
+        if self._pending is not None:
+            self._pending.result()
+        save_snapshot(self.bandit.snapshot(), self.path)
+        self.written += 1
+        self.executor.shutdown()
+
+
+def lane_features(buffer_system, color):
+    """Context rows (n_lanes, N_FEATURES) for routing a car of color."""
+    lanes = buffer_system.lanes
+    shares = buffer_system.color_distribution
+    car_share = shares.get(color, 0) / 100
+    rows = []
+    for i in range(len(lanes)):
+        front = lanes.front(i)
+        count = lanes.count(i)
+        rows.append((1.0, front == color, lanes.back(i) == color, count == 0, lanes.is_full(i),
+                     count / lanes.capacity(i),
+                     shares.get(front, 0) / 100 if count else 0.0, car_share))
+    return np.array(rows, dtype=np.float64)
+
+
+class BanditRouter:
+    """Routes a BufferSystem's cars with a (possibly shared) LinUCB.
+
+    ``BanditRouter(bandit).attach(bs)`` makes ``bs.add_to_bufferline`` route
+    through the bandit. Its arms are the lanes of the car's oven, full ones
+    included, exactly like the routing rules: a full oven 1 lane overflows
+    the car to oven 2 (counted as a penalty, then routed again among the
+    oven 2 lanes) and a full oven 2 lane rejects it.
+
+    Each decision is rewarded as soon as it is committed, from what it did
+    to the chosen lane (see ``reward``), so the bandit learns only from
+    outcomes the routing controls and not from the conveyer's picks.
+    """
+
+    def __init__(self, bandit, snapshotter=None):
+        self.bandit = bandit
+        self.snapshotter = snapshotter
+        self.buffer_system = None
+
+    def attach(self, buffer_system):
+        if len(buffer_system.lanes) != self.bandit.n_arms:
+            raise ValueError(f"Bandit has {self.bandit.n_arms} arms for {len(buffer_system.lanes)} lanes")
+        self.buffer_system = buffer_system
+        buffer_system.router = self
+        return self
+
+    def mask(self, oven):
+        """Arms a car of oven may choose: every lane of that oven."""
+        bs = self.buffer_system
+        mask = np.zeros(len(bs.lanes), dtype=bool)
+        mask[bs._oven_lanes(OVEN1 if oven == 1 else OVEN2)] = True
+        return mask
+
+    def reward(self, lane_idx, color):
+        """Reward of putting a car of color into a lane, from the lane as it is before the car arrives."""
+        lanes = self.buffer_system.lanes
+        if lanes.is_full(lane_idx):
+            return REWARDS['full']
+        if lanes.count(lane_idx) == 0:
+            return REWARDS['empty']
+        if lanes.front(lane_idx) == color and lanes.back(lane_idx) == color:
+            return REWARDS['match']
+        return REWARDS['mismatch']
+
+    def commit(self, color, oven, lane_idx, x):
+        """Apply the chosen lane and learn from it; None if the car overflowed and must be routed for oven 2."""
+        bs = self.buffer_system
+        lane_idx = int(lane_idx)
+        self.bandit.update(lane_idx, x, self.reward(lane_idx, color))
+        if self.snapshotter is not None:
+            self.snapshotter.maybe_snapshot()
+        if bs.add_to_lane(lane_idx, color, 'bandit'):
+            return True
+        if oven == 1:
+            bs.penalty_counter += 1
+            bs.overflow += 1
+            bs.events.record('overflow', -1, color)
+            return None
+        bs.events.record('reject', -1, color)
+        return False
+
+    def route(self, color, oven):
+        return route_batch([self], [(color, oven)])[0]
+
+
+def route_batch(routers, cars):
+    """Route one car per router with a single select call per oven pass; routers must share one bandit.
+
+    cars holds a (color, oven) per router. Returns the add results in order.
+    """
+    bandit = routers[0].bandit
+    results = [None] * len(routers)
+    waiting = [(n, color, oven) for n, (color, oven) in enumerate(cars)]
+    while waiting:
+        contexts = np.empty((len(waiting), bandit.n_arms, bandit.n_features))
+        masks = np.empty((len(waiting), bandit.n_arms), dtype=bool)
+        for k, (n, color, oven) in enumerate(waiting):
+            contexts[k] = lane_features(routers[n].buffer_system, color)
+            masks[k] = routers[n].mask(oven)
+        arms = bandit.select(contexts, masks)
+        overflowed = []
+        for k, ((n, color, oven), lane) in enumerate(zip(waiting, arms)):
+            results[n] = routers[n].commit(color, oven, lane, contexts[k, lane])
+            if results[n] is None:
+                overflowed.append((n, color, 2))
+        waiting = overflowed
+    return results
+
+
+def simulate_lines(n_lines, n_cars, router='linucb', seed=None, layout=None, pick_policy='interleaved',
+                   alpha=0.2, bandit=None, snapshotter=None):
+    """Run n_lines headless lines in lockstep and return their summed KPIs.
+
+    With router 'linucb' every line routes through one shared bandit, each
+    arrival step batched into a single select; 'rules' uses the standard
+    add_to_bufferline rules for comparison.
+    """
+    geometry = {}
+    if layout is not None:
+        geometry['lane_capacities'], geometry['oven1_lanes'] = parse_layout(layout)
+    systems = [BufferSystem(event_sink='off', **geometry) for _ in range(n_lines)]
+    rng = random.Random(seed)
+    arrivals = [iter(random_arrivals(bs, n_cars, random.Random(rng.random()))) for bs in systems]
+    should_pick = PICK_POLICIES[pick_policy]
+    routers = None
+    if router == 'linucb':
+        bandit = bandit or LinUCB(len(systems[0].lanes), alpha=alpha)
+        routers = [BanditRouter(bandit, snapshotter).attach(bs) for bs in systems]
+
+    rejected = 0
+    operation_count = 0
+    started = time.perf_counter()
+    next_cars = [next(a, None) for a in arrivals]
+    while next_cars[0] is not None:
+        if should_pick(operation_count):
+            for bs in systems:
+                bs.process_conveyer_pickup()
+        elif routers is not None:
+            rejected += route_batch(routers, next_cars).count(False)
+            next_cars = [next(a, None) for a in arrivals]
+        else:
+            for bs, (color, oven) in zip(systems, next_cars):
+                rejected += not bs.add_to_bufferline(color, oven)
+            next_cars = [next(a, None) for a in arrivals]
+        operation_count += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'router': router,
+        'lines': n_lines,
+        'cars': n_lines * n_cars,
+        'color_changes': sum(bs.conveyer.color_changes for bs in systems),
+        'overflow_penalties': sum(bs.overflow for bs in systems),
+        'rejected': rejected,
+        'elapsed_seconds': round(elapsed, 4),
+        'cars_per_second': round(n_lines * n_cars / elapsed) if elapsed > 0 else 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare LinUCB lane routing with the routing rules.")
+    parser.add_argument('--lines', type=int, default=16, help="lines simulated in lockstep")
+    parser.add_argument('--cars', type=int, default=10000, help="cars per line")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--layout', default=None, help="lane layout, e.g. 4x14/5x16")
+    parser.add_argument('--alpha', type=float, default=0.2, help="LinUCB exploration weight")
+    parser.add_argument('--snapshot', default=None, help="resume from and keep saving the bandit to this .npz")
+    parser.add_argument('--snapshot-every', type=int, default=10000, help="updates between snapshots")
+    args = parser.parse_args(argv)
+
+    if args.snapshot and os.path.exists(args.snapshot):
+        bandit = LinUCB.load(args.snapshot)
+    else:
+        capacities = parse_layout(args.layout)[0] if args.layout else DEFAULT_LANE_CAPACITIES
+        bandit = LinUCB(len(capacities), alpha=args.alpha)
+    snapshotter = Snapshotter(bandit, args.snapshot, args.snapshot_every) if args.snapshot else None
+    results = [
+        simulate_lines(args.lines, args.cars, 'rules', args.seed, args.layout),
+        simulate_lines(args.lines, args.cars, 'linucb', args.seed, args.layout, bandit=bandit,
+                       snapshotter=snapshotter),
+    ]
+    if snapshotter is not None:
+        snapshotter.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Orders/sec for ProductionPredictor: predict_for_new_order vs predict_batch.
+
+Uses a randomly initialized stand-in for TwinHeadNN (see
+benchmarks.predictor), so neither a model file nor the training module is
+needed.
+
+    cd optimalalgo && python -m benchmarks.inference --orders 20000
+"""
+import argparse
+import json
+import time
+
+import torch
+
+from benchmarks.predictor import random_orders, random_predictor
+
+
+def time_scalar(predictor, orders, limit):
+    n = min(limit, len(orders['buffer']))
+    started = time.perf_counter()
+    for i in range(n):
+        predictor.predict_for_new_order(*(orders[c][i] for c in ('buffer', 'priority', 'hour', 'color', 'oven')))
+    return n / (time.perf_counter() - started)
+
+
+def time_batch(predictor, orders, chunk_size):
+    predictor.predict_batch(orders, chunk_size)  # warm-up
+    started = time.perf_counter()
+    predictor.predict_batch(orders, chunk_size)
+    return len(orders['buffer']) / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--scalar-orders', type=int, default=2000, help="orders timed on the scalar path")
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    torch.set_num_threads(1)
+    predictor = random_predictor(args.seed)
+    orders = random_orders(args.orders, args.seed)
+    scalar = time_scalar(predictor, orders, args.scalar_orders)
+    batch = time_batch(predictor, orders, args.chunk_size)
+    print(json.dumps({
+        'scalar_orders_per_second': round(scalar),
+        'batch_orders_per_second': round(batch),
+        'speedup': round(batch / scalar, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Lane selection with the FrontIndex vs the linear lane scans.
+
+First replays randomized workloads (random color shares with ties, random
+add/pick mixes, several layouts) through a scanning and an indexed
+BufferSystem side by side and checks that every operation touches the same
+lane; then times both at 9, 64 and 512 lanes.
+
+    cd optimalalgo && python -m benchmarks.lane_selection --cars 20000
+"""
+import argparse
+import json
+import random
+import time
+
+from lane_store import parse_layout
+from sequencing import BufferSystem
+from simulate import random_arrivals, run_operations
+
+LAYOUTS = {
+    9: '4x14/5x16',
+    64: '32x14/32x16',
+    512: '256x14/256x16',
+}
+COLORS = [f'C{i}' for i in range(1, 13)]
+
+
+def build(layout, lane_index, color_distribution=None):
+    capacities, oven1_lanes = parse_layout(layout)
+    return BufferSystem(color_distribution=color_distribution, lane_capacities=capacities,
+                        oven1_lanes=oven1_lanes, event_sink='off', lane_index=lane_index)
+
+
+def random_picks(share, seed):
+    """Pick policy that picks with probability share, from its own seeded stream."""
+    rng = random.Random(seed)
+    return lambda operation_count: rng.random() < share
+
+
+def trace(buffer_system, n_cars, pick_policy, seed):
+    """Every (op, lane, color) the run produced, plus the operation results and final lanes."""
+    ops = []
+    buffer_system.listeners.append(lambda op, lane_idx, color: ops.append((op, lane_idx, color)))
+    results = list(run_operations(buffer_system, n_cars, random_arrivals, pick_policy, random.Random(seed)))
+    return ops, results, buffer_system.buffer_lanes, buffer_system.conveyer.color_changes
+
+
+def check(rounds, n_cars):
+    """Randomized equivalence of the indexed and scanning lane selection; returns rounds run."""
+    for k in range(rounds):
+        rng = random.Random(k)
+        shares = {color: rng.randint(0, 5) for color in COLORS}
+        shares[rng.choice(COLORS)] = max(shares.values()) + 1  # at least one color with a share
+        shares[0] = 0
+        layout = f"{rng.randint(1, 12)}x{rng.randint(1, 16)}/{rng.randint(1, 12)}x{rng.randint(1, 16)}"
+        pick_share = rng.uniform(0.2, 0.6)
+        scanned = trace(build(layout, False, dict(shares)), n_cars, random_picks(pick_share, k), k)
+        indexed = trace(build(layout, True, dict(shares)), n_cars, random_picks(pick_share, k), k)
+        if scanned != indexed:
+            raise AssertionError(f"lane selection differs in round {k} (layout {layout}, shares {shares})")
+    return rounds
+
+
+def time_run(lanes, lane_index, n_cars, seed):
+    buffer_system = build(LAYOUTS[lanes], lane_index)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    operations = sum(1 for _ in run_operations(buffer_system, n_cars, random_arrivals, 'interleaved', rng))
+    elapsed = time.perf_counter() - started
+    return operations / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cars', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check-rounds', type=int, default=200)
+    parser.add_argument('--check-cars', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    results = {'equivalence_rounds': check(args.check_rounds, args.check_cars)}
+    for lanes in LAYOUTS:
+        scan = time_run(lanes, False, args.cars, args.seed)
+        index = time_run(lanes, True, args.cars, args.seed)
+        results[f'{lanes}_lanes'] = {
+            'scan_ops_per_sec': round(scan),
+            'index_ops_per_sec': round(index),
+            'speedup': round(index / scan, 2),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
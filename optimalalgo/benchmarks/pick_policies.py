@@ -0,0 +1,98 @@
+"""Color changes and per-pick decision latency: greedy pick_car vs LookaheadPolicy.
+
+Every policy sees the same seeded car streams; only the conveyer's pick
+rule differs. Latency is measured around each process_conveyer_pickup.
+
+    cd optimalalgo && python -m benchmarks.pick_policies --cars 5000 --seeds 5
+"""
+import argparse
+import json
+import random
+import time
+
+from lane_store import parse_layout
+from lookahead import LookaheadPolicy
+from sequencing import BufferSystem
+from simulate import ARRIVAL_POLICIES, PICK_POLICIES, run_operations
+
+
+def percentile(sorted_values, share):
+    return sorted_values[min(len(sorted_values) - 1, int(share * len(sorted_values)))]
+
+
+def run_policy(make_policy, n_cars, seeds, layout, arrival, pick):
+    """Summed KPIs and pick latencies of one policy over every seed."""
+    geometry = {}
+    if layout is not None:
+        geometry['lane_capacities'], geometry['oven1_lanes'] = parse_layout(layout)
+    totals = {'color_changes': 0, 'total_picks': 0, 'rejected': 0}
+    latencies = []
+    policy_stats = []
+    for seed in seeds:
+        policy = make_policy()
+        buffer_system = BufferSystem(event_sink='off', conveyer_policy=policy, **geometry)
+        operations = run_operations(buffer_system, n_cars, arrival, pick, random.Random(seed))
+        while True:
+            started = time.perf_counter()
+            step = next(operations, None)
+            elapsed = time.perf_counter() - started
+            if step is None:
+                break
+            operation, result = step
+            if operation == 'pick':
+                latencies.append(elapsed)
+            elif not result:
+                totals['rejected'] += 1
+        totals['color_changes'] += buffer_system.conveyer.color_changes
+        totals['total_picks'] += buffer_system.conveyer.total_picks
+        if policy is not None:
+            policy_stats.append(policy.stats())
+
+    latencies.sort()
+    report = {
+        **totals,
+        'changes_per_100_picks': round(totals['color_changes'] / totals['total_picks'] * 100, 2)
+        if totals['total_picks'] else 0.0,
+        'pick_latency_us': {
+            'p50': round(percentile(latencies, 0.5) * 1e6, 1),
+            'p99': round(percentile(latencies, 0.99) * 1e6, 1),
+            'max': round(latencies[-1] * 1e6, 1),
+        } if latencies else None,
+    }
+    if policy_stats:
+        decisions = sum(s['decisions'] for s in policy_stats)
+        report['search'] = {
+            'timeouts': sum(s['timeouts'] for s in policy_stats),
+            'mean_depth': round(sum(s['mean_depth'] * s['decisions'] for s in policy_stats) / decisions, 2)
+            if decisions else 0.0,
+            'nodes': sum(s['nodes'] for s in policy_stats),
+            'cache_hits': sum(s['cache_hits'] for s in policy_stats),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cars', type=int, default=5000, help="cars per run")
+    parser.add_argument('--seeds', type=int, default=5, help="runs per policy, seeded 0..N-1")
+    parser.add_argument('--layout', default=None, help="lane layout, e.g. 4x14/5x16")
+    parser.add_argument('--arrival', choices=sorted(ARRIVAL_POLICIES), default='random')
+    parser.add_argument('--pick', choices=sorted(PICK_POLICIES), default='interleaved')
+    parser.add_argument('--depth', type=int, default=6, help="lookahead picks")
+    parser.add_argument('--beam', type=int, default=3, help="lane fronts expanded per node")
+    parser.add_argument('--budget-ms', type=float, default=0.5, help="search time per pick")
+    args = parser.parse_args(argv)
+
+    seeds = range(args.seeds)
+    results = {
+        'greedy': run_policy(lambda: None, args.cars, seeds, args.layout, args.arrival, args.pick),
+        'lookahead': run_policy(lambda: LookaheadPolicy(args.depth, args.beam, args.budget_ms),
+                                args.cars, seeds, args.layout, args.arrival, args.pick),
+    }
+    greedy, lookahead = results['greedy']['color_changes'], results['lookahead']['color_changes']
+    results['color_change_reduction_percent'] = round((greedy - lookahead) / greedy * 100, 1) if greedy else 0.0
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
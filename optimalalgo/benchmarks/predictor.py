@@ -0,0 +1,50 @@
+"""Randomly initialized ProductionPredictor and random orders for the inference benchmarks.
+
+The training module is not part of this repository, so the benchmarks
+time a stand-in network with TwinHeadNN's interface: N_FEATURES inputs,
+a shared trunk and (processing time, downtime risk) heads. Its outputs
+are meaningless; only the cost of preprocessing, the forward pass and
+postprocessing is measured.
+"""
+import os
+import sys
+
+import numpy as np
+import torch
+from torch import nn
+
+# production.py lives in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from production import COLORS, N_FEATURES, OVENS, ProductionPredictor  # noqa: E402
+
+
+class StandInTwinHead(nn.Module):
+    """Two-headed MLP shaped like TwinHeadNN: returns (processing_time, downtime_risk) columns."""
+
+    def __init__(self, n_features=N_FEATURES, hidden=64):
+        super().__init__()
+        self.shared = nn.Sequential(nn.Linear(n_features, hidden), nn.ReLU(),
+                                    nn.Linear(hidden, hidden // 2), nn.ReLU())
+        self.time_head = nn.Linear(hidden // 2, 1)
+        self.risk_head = nn.Sequential(nn.Linear(hidden // 2, 1), nn.Sigmoid())
+
+    def forward(self, x):
+        shared = self.shared(x)
+        return self.time_head(shared), self.risk_head(shared)
+
+
+def random_orders(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'buffer': rng.integers(1, 10, n),
+        'priority': rng.integers(0, 2, n),
+        'hour': rng.integers(0, 24, n),
+        'color': rng.choice(COLORS, n),
+        'oven': rng.choice(OVENS, n),
+    }
+
+
+def random_predictor(seed=0):
+    torch.manual_seed(seed)
+    return ProductionPredictor(model=StandInTwinHead(N_FEATURES))
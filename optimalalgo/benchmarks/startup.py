@@ -0,0 +1,84 @@
+"""Inference worker startup time for each model file format.
+
+For a legacy fully pickled module, a state-dict bundle and an exported-graph
+bundle (all from the same randomly initialized TwinHeadNN), a fresh Python
+process times importing production, constructing ProductionPredictor and
+serving the first prediction, and reports which training-only modules got
+imported along the way.
+
+    cd optimalalgo && python -m benchmarks.startup --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+WORKER = '''
+import json, sys, time
+started = time.perf_counter()
+import production
+imported = time.perf_counter()
+predictor = production.ProductionPredictor(sys.argv[1], allow_pickle=True, warmup=sys.argv[2] == '1')
+loaded = time.perf_counter()
+predictor.predict_for_new_order(3, 0, 14, 'C1', 'O1')
+first = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1e3,
+    'load_ms': (loaded - imported) * 1e3,
+    'first_prediction_ms': (first - loaded) * 1e3,
+    'training_modules': sorted(m for m in ('algorithm', 'pandas', 'sklearn', 'joblib') if m in sys.modules),
+}))
+'''
+
+
+def build_artifacts(directory, seed=0):
+    sys.path.insert(0, ROOT)
+    import torch
+    from algorithm import TwinHeadNN
+    from production import LEGACY_TRANSFORM, N_FEATURES, save_model_bundle
+
+    torch.manual_seed(seed)
+    model = TwinHeadNN(N_FEATURES).eval()
+    paths = {
+        'pickled_module': os.path.join(directory, 'twin_head_model.pth'),
+        'state_dict_bundle': os.path.join(directory, 'twin_head_bundle.pt'),
+        'exported_bundle': os.path.join(directory, 'twin_head_exported.pt2'),
+    }
+    torch.save(model, paths['pickled_module'])
+    save_model_bundle(paths['state_dict_bundle'], model, LEGACY_TRANSFORM)
+    save_model_bundle(paths['exported_bundle'], model, LEGACY_TRANSFORM, exported=True)
+    return paths
+
+
+def time_startup(path, warmup, runs):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (ROOT, env.get('PYTHONPATH')) if p)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', WORKER, path, '1' if warmup else '0'],
+                             env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    best = {key: round(min(s[key] for s in samples), 1) for key in ('import_ms', 'load_ms', 'first_prediction_ms')}
+    best['total_ms'] = round(best['import_ms'] + best['load_ms'] + best['first_prediction_ms'], 1)
+    best['training_modules'] = samples[-1]['training_modules']
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help="fresh processes per format (best is reported)")
+    parser.add_argument('--warmup', action='store_true', help="construct the predictor with warmup=True")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = build_artifacts(directory)
+        results = {name: time_startup(path, args.warmup, args.runs) for name, path in paths.items()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
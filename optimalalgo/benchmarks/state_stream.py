@@ -0,0 +1,68 @@
+"""Bytes and server CPU per tick: full snapshots vs the delta protocol.
+
+Replays the dashboard workload (alternating ovens, 2:1 add/pick cadence,
+one message per operation) and serializes every message the way
+``websocket.send_json`` does.
+
+    cd optimalalgo && python -m benchmarks.state_stream --cars 20000
+"""
+import argparse
+import json
+import random
+import time
+
+from sequencing import BufferSystem
+from simulate import run_operations
+from state_stream import DeltaEncoder
+
+
+def encode(message):
+    # same encoding starlette's send_json uses
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def measure(n_cars, seed, delta, keyframe_interval=100, sim_rate=None):
+    """Run one replay and return bytes/tick, CPU/tick and projected bytes/sec."""
+    buffer_system = BufferSystem()
+    encoder = DeltaEncoder(buffer_system, keyframe_interval) if delta else None
+    ticks = 0
+    total_bytes = 0
+    cpu = 0.0
+    for _ in run_operations(buffer_system, n_cars, rng=random.Random(seed)):
+        started = time.process_time()
+        if encoder is not None:
+            message = encoder.next_message()
+        else:
+            message = {'type': 'system_update', 'data': buffer_system.get_system_state()}
+        total_bytes += len(encode(message))
+        cpu += time.process_time() - started
+        ticks += 1
+
+    result = {
+        'protocol': 'delta' if delta else 'snapshot',
+        'ticks': ticks,
+        'bytes_per_tick': round(total_bytes / ticks, 1),
+        'cpu_us_per_tick': round(cpu / ticks * 1e6, 2),
+    }
+    if sim_rate:
+        result['bytes_per_second'] = round(total_bytes / ticks * sim_rate)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cars', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keyframe-interval', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=100.0, help="messages per second per client")
+    args = parser.parse_args(argv)
+
+    before = measure(args.cars, args.seed, False, sim_rate=args.rate)
+    after = measure(args.cars, args.seed, True, args.keyframe_interval, sim_rate=args.rate)
+    print(json.dumps({'before': before, 'after': after}, indent=2))
+    print(f"bytes/tick: {before['bytes_per_tick'] / after['bytes_per_tick']:.1f}x smaller, "
+          f"cpu/tick: {before['cpu_us_per_tick'] / after['cpu_us_per_tick']:.1f}x lower")
+
+
+if __name__ == "__main__":
+    main()
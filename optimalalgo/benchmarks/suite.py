@@ -0,0 +1,326 @@
+"""Reproducible benchmark suite with machine-readable results.
+
+Runs the tracked hot paths with fixed seeds and writes one JSON file per
+run, so two commits can be compared:
+
+    cd optimalalgo
+    python -m benchmarks.suite run --out before.json
+    git checkout <other commit>
+    python -m benchmarks.suite run --out after.json
+    python -m benchmarks.suite compare before.json after.json --threshold 10
+
+Groups (pick with --only):
+
+- ``sequencing``: add_to_bufferline / process_conveyer_pickup throughput at
+  several fill levels and lane counts
+- ``state``: get_system_state, its JSON encoding and the delta message
+- ``ws``: end-to-end /ws message rate against a local uvicorn server
+- ``inference``: ProductionPredictor scalar vs batch latency with a randomly
+  initialized stand-in for TwinHeadNN (skipped if torch is missing)
+
+Every measurement is the best of ``--repeat`` runs. Everything runs offline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from itertools import islice
+
+from benchmarks.lane_selection import LAYOUTS, build
+from simulate import random_arrivals
+from state_stream import DeltaEncoder
+
+SEED = 1234
+FILL_LEVELS = (0.0, 0.5, 0.9)
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# group name -> function(args) returning a list of result dicts
+GROUPS = {}
+
+
+def group(name):
+    def register(function):
+        GROUPS[name] = function
+        return function
+    return register
+
+
+def result(benchmark, value, unit, higher_is_better, **params):
+    return {'benchmark': benchmark, 'params': params, 'value': value, 'unit': unit,
+            'higher_is_better': higher_is_better}
+
+
+def result_key(entry):
+    params = ','.join(f'{k}={v}' for k, v in sorted(entry['params'].items()))
+    return f"{entry['benchmark']}[{params}]" if params else entry['benchmark']
+
+
+def best_of(repeat, measure):
+    """Run measure() repeat times and keep the lowest (least disturbed) timing."""
+    return min(measure() for _ in range(repeat))
+
+
+def filled_system(lanes, fill, seed, spare_arrivals):
+    """Default-distribution BufferSystem with `lanes` lanes filled to about `fill` of capacity.
+
+    Returns it with the rest of the seeded arrival stream (at least spare_arrivals cars).
+    """
+    buffer_system = build(LAYOUTS[lanes], None)
+    rng = random.Random(seed)
+    capacity = sum(buffer_system.oven_capacity)
+    arrivals = iter(random_arrivals(buffer_system, capacity * 2 + spare_arrivals, rng))
+    # at most capacity * 2 cars go into filling (a full oven 2 rejects the rest)
+    for color, oven in islice(arrivals, capacity * 2):
+        buffer_system.add_to_bufferline(color, oven)
+        if buffer_system.cars >= fill * capacity:
+            break
+    return buffer_system, arrivals
+
+
+@group('sequencing')
+def bench_sequencing(args):
+    """Adds and pickups alternate, so the fill level stays roughly where it started."""
+    results = []
+    for lanes in LAYOUTS:
+        for fill in FILL_LEVELS:
+            def measure():
+                buffer_system, arrivals = filled_system(lanes, fill, SEED, args.operations)
+                add_time = pick_time = 0.0
+                clock = time.perf_counter
+                for _ in range(args.operations):
+                    color, oven = next(arrivals)
+                    started = clock()
+                    buffer_system.add_to_bufferline(color, oven)
+                    added = clock()
+                    buffer_system.process_conveyer_pickup()
+                    pick_time += clock() - added
+                    add_time += added - started
+                return add_time, pick_time
+
+            add_time, pick_time = best_of(args.repeat, measure)
+            results.append(result('sequencing.add_to_bufferline', round(args.operations / add_time),
+                                  'ops/s', True, lanes=lanes, fill=fill))
+            results.append(result('sequencing.process_conveyer_pickup', round(args.operations / pick_time),
+                                  'ops/s', True, lanes=lanes, fill=fill))
+    return results
+
+
+def encode(message):
+    # same encoding the server uses for every websocket message
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False)
+
+
+@group('state')
+def bench_state(args):
+    results = []
+    calls = max(1, args.operations // 10)
+    for lanes in (9, 64):
+        buffer_system, arrivals = filled_system(lanes, 0.5, SEED, calls * (args.repeat + 1))
+        state = buffer_system.get_system_state()
+
+        def time_calls(function):
+            def measure():
+                started = time.perf_counter()
+                for _ in range(calls):
+                    function()
+                return time.perf_counter() - started
+            return round(best_of(args.repeat, measure) / calls * 1e6, 2)
+
+        encoder = DeltaEncoder(buffer_system)
+        encoder.next_message()  # initial keyframe
+
+        def delta_tick():
+            color, oven = next(arrivals)
+            buffer_system.add_to_bufferline(color, oven)
+            buffer_system.process_conveyer_pickup()
+            encode(encoder.next_message())
+
+        results += [
+            result('state.get_system_state', time_calls(buffer_system.get_system_state), 'us', False, lanes=lanes),
+            result('state.json_encode', time_calls(lambda: encode(state)), 'us', False, lanes=lanes),
+            result('state.get_system_state_and_encode',
+                   time_calls(lambda: encode(buffer_system.get_system_state())), 'us', False, lanes=lanes),
+            result('state.delta_tick_and_encode', time_calls(delta_tick), 'us', False, lanes=lanes),
+        ]
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def ws_message_rate(url, runs):
+    """Best messages/s (with its mean message size) over `runs` full simulations at speed 0."""
+    import websockets
+    best = (0.0, 0.0)
+    async with websockets.connect(url, max_size=None) as ws:
+        # a frame per operation, so the rate measures the publish path itself
+        await ws.send(json.dumps({'type': 'update_speed', 'speed': 0, 'publish_fps': 0}))
+        for _ in range(runs):
+            await ws.send(json.dumps({'type': 'start_simulation'}))
+            messages = size = 0
+            first = last = None
+            while True:
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    break  # the simulation finished
+                last = time.perf_counter()
+                first = first or last
+                messages += 1
+                size += len(message)
+            if messages > 1 and last > first:
+                best = max(best, (messages / (last - first), size / messages))
+    return best
+
+
+@group('ws')
+def bench_ws(args):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'server:app', '--port', str(port),
+                               '--log-level', 'warning'], cwd=SERVER_DIR)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("benchmark server did not start")
+                time.sleep(0.1)
+        results = []
+        for protocol in ('snapshot', 'delta'):
+            # one session per protocol so runs do not share a simulation
+            url = f'ws://127.0.0.1:{port}/ws/bench-{protocol}?protocol={protocol}'
+            rate, message_size = asyncio.run(ws_message_rate(url, args.repeat))
+            results.append(result('ws.message_rate', round(rate), 'msg/s', True, protocol=protocol))
+            results.append(result('ws.bytes_per_message', round(message_size), 'B', False, protocol=protocol))
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+@group('inference')
+def bench_inference(args):
+    try:
+        import torch
+        from benchmarks.predictor import random_orders, random_predictor
+    except ImportError as e:
+        print(f"skipping inference benchmarks: {e}", file=sys.stderr)
+        return []
+    torch.set_num_threads(1)
+    predictor = random_predictor(SEED)
+    columns = ('buffer', 'priority', 'hour', 'color', 'oven')
+    results = []
+
+    scalar_orders = random_orders(max(1, args.operations // 10), SEED)
+    rows = list(zip(*(scalar_orders[c] for c in columns)))
+
+    def scalar():
+        started = time.perf_counter()
+        for row in rows:
+            predictor.predict_for_new_order(*row)
+        return time.perf_counter() - started
+    results.append(result('inference.scalar_latency', round(best_of(args.repeat, scalar) / len(rows) * 1e6, 2),
+                          'us', False))
+
+    for batch_size in (1, 64, 4096):
+        orders = random_orders(batch_size, SEED)
+        predictor.predict_batch(orders)  # warm-up
+
+        def batch():
+            started = time.perf_counter()
+            predictor.predict_batch(orders)
+            return time.perf_counter() - started
+        results.append(result('inference.batch_latency', round(best_of(args.repeat, batch) * 1e6, 2),
+                              'us', False, batch_size=batch_size))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SERVER_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    random.seed(SEED)
+    results = []
+    for name in args.only or GROUPS:
+        print(f"running {name} benchmarks...", file=sys.stderr)
+        results += GROUPS[name](args)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': SEED,
+            'operations': args.operations,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    for entry in results:
+        print(f"{result_key(entry):60} {entry['value']:>14} {entry['unit']}")
+    print(f"Results written to {args.out}", file=sys.stderr)
+
+
+def compare(args):
+    """Print the change of every shared result; exit 1 if any regressed by more than the threshold."""
+    with open(args.base) as f:
+        base = {result_key(e): e for e in json.load(f)['results']}
+    with open(args.head) as f:
+        head = {result_key(e): e for e in json.load(f)['results']}
+    regressions = 0
+    for key in sorted(base.keys() & head.keys()):
+        old, new = base[key]['value'], head[key]['value']
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if head[key]['higher_is_better'] else change
+        flag = 'REGRESSION' if worse > args.threshold else ('improved' if worse < -args.threshold else '')
+        regressions += flag == 'REGRESSION'
+        print(f"{key:60} {old:>12} -> {new:>12} {head[key]['unit']:6} {change:+7.1f}% {flag}")
+    for key in sorted(base.keys() ^ head.keys()):
+        print(f"{key:60} only in {'base' if key in base else 'head'}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="run the benchmarks and write a results file")
+    run_parser.add_argument('--only', nargs='+', choices=sorted(GROUPS), help="benchmark groups to run")
+    run_parser.add_argument('--operations', type=int, default=20000, help="operations per measurement")
+    run_parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (best is kept)")
+    run_parser.add_argument('--out', default='benchmark_results.json')
+    compare_parser = commands.add_parser('compare', help="compare two results files")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help="percent change flagged")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
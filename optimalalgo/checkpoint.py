@@ -0,0 +1,212 @@
+"""Compact binary checkpoints of BufferSystem state and parallel what-if forks.
+
+A checkpoint holds only what routing and picking depend on: lane layout
+and contents, the car/penalty/overflow counters, per-color totals, the
+routing priorities and the conveyer's color state. Event logs and pick
+history are left out. Colors are interned into a table and lane contents
+packed as 16-bit codes, so the default 9-lane system fits in well under a
+kilobyte.
+
+``ForkEvaluator`` ships a checkpoint to worker processes, which try every
+candidate lane for the next car followed by the same upcoming arrivals,
+and reports the outcomes before the live system commits its decision.
+A fork past the decision's deadline stops at its next check, so a timed
+out decision does not keep the workers busy.
+"""
+import os
+import random
+import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from sequencing import BufferSystem
+from simulate import random_arrivals, run_operations
+
+MAGIC = b'BSCK'
+VERSION = 1
+NO_COLOR = 0xFFFF
+# total_cars, penalty_counter, overflow, color_changes, total_picks, current color code
+_COUNTERS = struct.Struct('<qqqqqH')
+# operations a fork runs between deadline checks
+DEADLINE_CHECK_EVERY = 256
+
+
+def _pack_array(typecode, values):
+    data = array(typecode, values)
+    return struct.pack('<I', len(data)) + data.tobytes()
+
+
+def _unpack_array(typecode, buffer, offset):
+    (n,) = struct.unpack_from('<I', buffer, offset)
+    offset += 4
+    data = array(typecode)
+    end = offset + n * data.itemsize
+    data.frombytes(buffer[offset:end])
+    return data, end
+
+
+def dump(buffer_system):
+    """Serialize the essential state of buffer_system to bytes."""
+    bs = buffer_system
+    lanes = bs.lanes
+    conveyer = bs.conveyer
+    contents = [lanes.vehicles(i) for i in range(len(lanes))]
+
+    # color table; code 0 is the empty lane key of color_distribution
+    codes = {0: 0}
+    colors = [0]
+    def code(color):
+        if color not in codes:
+            if not isinstance(color, str):
+                raise TypeError(f"Checkpoints store string colors, got {color!r}")
+            codes[color] = len(colors)
+            colors.append(color)
+        return codes[color]
+    slots = [code(car) for lane in contents for car in lane]
+    for color in (*bs.color_distribution, *bs.stats['by_color'], *conveyer.color_counts):
+        code(color)
+    current = NO_COLOR if conveyer.current_color is None else code(conveyer.current_color)
+
+    table = b''.join(struct.pack('<B', len(c.encode())) + c.encode() for c in colors[1:])
+    # routing priorities keep their dict order: arrival sampling draws colors in that order
+    distribution = bs.color_distribution
+    parts = [
+        MAGIC, struct.pack('<BHH', VERSION, len(colors), bs.oven1_lanes), table,
+        _pack_array('H', [lanes.capacity(i) for i in range(len(lanes))]),
+        _pack_array('H', [len(lane) for lane in contents]),
+        _pack_array('H', slots),
+        _pack_array('H', [codes[c] for c in distribution]),
+        _pack_array('d', list(distribution.values())),
+        _pack_array('q', [bs.stats['by_color'].get(c, 0) for c in colors]),
+        _pack_array('q', [conveyer.color_counts.get(c, 0) for c in colors]),
+        _COUNTERS.pack(bs.stats['total_cars'], bs.penalty_counter, bs.overflow,
+                       conveyer.color_changes, conveyer.total_picks, current),
+    ]
+    return b''.join(parts)
+
+
+def load(data, lane_store='ring', event_sink='off', lane_index=None):
+    """Rebuild a BufferSystem from dump() output."""
+    buffer = memoryview(data)
+    if bytes(buffer[:4]) != MAGIC:
+        raise ValueError("Not a BufferSystem checkpoint")
+    version, n_colors, oven1_lanes = struct.unpack_from('<BHH', buffer, 4)
+    if version != VERSION:
+        raise ValueError(f"Unsupported checkpoint version {version}")
+    offset = 9
+    colors = [0]
+    for _ in range(n_colors - 1):
+        length = buffer[offset]
+        colors.append(bytes(buffer[offset + 1:offset + 1 + length]).decode())
+        offset += 1 + length
+    capacities, offset = _unpack_array('H', buffer, offset)
+    counts, offset = _unpack_array('H', buffer, offset)
+    slots, offset = _unpack_array('H', buffer, offset)
+    order, offset = _unpack_array('H', buffer, offset)
+    shares, offset = _unpack_array('d', buffer, offset)
+    by_color, offset = _unpack_array('q', buffer, offset)
+    color_counts, offset = _unpack_array('q', buffer, offset)
+    total_cars, penalties, overflow, color_changes, total_picks, current = _COUNTERS.unpack_from(buffer, offset)
+
+    lanes = []
+    start = 0
+    for capacity, count in zip(capacities, counts):
+        lane = [colors[code] for code in slots[start:start + count]]
+        lanes.append(lane + [0] * (capacity - count))
+        start += count
+
+    # shares are usually whole-number weights; give them back as ints
+    distribution = {colors[code]: int(share) if share.is_integer() else share
+                    for code, share in zip(order, shares)}
+    bs = BufferSystem(color_distribution=distribution, lane_store=lane_store, lane_capacities=(),
+                      oven1_lanes=0, event_sink=event_sink, lane_index=lane_index)
+    bs.oven1_lanes = oven1_lanes
+    bs.adopt_lanes(bs.lane_store.from_lanes(lanes))
+    bs.stats = {'total_cars': total_cars, 'penalties': penalties,
+                'by_color': {c: n for c, n in zip(colors, by_color) if n}}
+    bs.penalty_counter = penalties
+    bs.overflow = overflow
+    conveyer = bs.conveyer
+    conveyer.current_color = None if current == NO_COLOR else colors[current]
+    conveyer.color_changes = color_changes
+    conveyer.total_picks = total_picks
+    conveyer.color_counts = {c: n for c, n in zip(colors, color_counts) if n}
+    return bs
+
+
+def evaluate_lane(data, lane_idx, color, arrivals, pick_policy='interleaved', deadline=None):
+    """Worker entry point: force color into lane_idx, then run the arrivals with the regular policy.
+
+    Returns None if the lane is full or the fork is still running at
+    deadline (a time.time() value).
+    """
+    if deadline is not None and time.time() >= deadline:
+        return None
+    bs = load(data)
+    if not bs.add_to_lane(lane_idx, color):
+        return None
+    start_changes = bs.conveyer.color_changes
+    start_overflow = bs.overflow
+    rejected = 0
+    operations = run_operations(bs, len(arrivals), lambda *_: arrivals, pick_policy)
+    for count, (operation, result) in enumerate(operations, 1):
+        if operation == 'add' and not result:
+            rejected += 1
+        if deadline is not None and count % DEADLINE_CHECK_EVERY == 0 and time.time() >= deadline:
+            return None
+    return {
+        'lane': lane_idx,
+        'color_changes': bs.conveyer.color_changes - start_changes,
+        'overflow_penalties': bs.overflow - start_overflow,
+        'rejected': rejected,
+        'cars_in_buffer': bs.cars,
+    }
+
+
+def sample_arrivals(buffer_system, n_cars, seed=0):
+    """Upcoming (color, oven) cars drawn from the routing distribution, the same for every fork."""
+    return list(random_arrivals(buffer_system, n_cars, random.Random(seed)))
+
+
+class ForkEvaluator:
+    """Scores candidate lanes for the next car in a pool of worker processes."""
+
+    def __init__(self, workers=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def evaluate(self, buffer_system, color, oven, arrivals, lanes=None, pick_policy='interleaved', timeout=None):
+        """What-if results per candidate lane, best first.
+
+        Args:
+            buffer_system: Live system; it is checkpointed, never modified
+            color, oven: The car about to be routed
+            arrivals: Upcoming (color, oven) cars every fork replays (see sample_arrivals)
+            lanes: Candidate lanes; default every non-full lane of the car's oven
+            timeout: Seconds to wait; forks still running then stop and are left out
+
+        Results are ranked by rejections, then overflows, then color changes.
+        """
+        if lanes is None:
+            oven_lanes = range(buffer_system.oven1_lanes) if oven == 1 else \
+                range(buffer_system.oven1_lanes, len(buffer_system.lanes))
+            lanes = [i for i in oven_lanes if not buffer_system.lanes.is_full(i)]
+        data = dump(buffer_system)
+        # wall-clock deadline, comparable across processes; running forks check it themselves
+        deadline = None if timeout is None else time.time() + timeout
+        futures = [self.pool.submit(evaluate_lane, data, lane, color, arrivals, pick_policy, deadline)
+                   for lane in lanes]
+        done, not_done = wait(futures, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+        results = [f.result() for f in done if f.result() is not None]
+        return sorted(results, key=lambda r: (r['rejected'], r['overflow_penalties'], r['color_changes'], r['lane']))
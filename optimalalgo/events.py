@@ -0,0 +1,113 @@
+"""Structured operation events and the sinks that keep them.
+
+BufferSystem records one Event per add, overflow, rejection and pickup.
+Events are plain tuples with a ``time.monotonic()`` timestamp; nothing is
+formatted unless someone reads the log. Pick a sink with ``make_sink``:
+
+- ``'off'``: drop everything (fastest, for headless runs)
+- ``'ring'`` or ``'ring:N'``: keep the last N events in memory (default 1000)
+- ``'jsonl:PATH'``: append events to a JSON-lines file, written in batches
+"""
+import json
+import time
+from collections import deque, namedtuple
+
+Event = namedtuple('Event', 'time kind lane color detail')
+
+
+def format_event(event):
+    """Human-readable one-liner for an event, in the style of the old operation log."""
+    if event.kind == 'add':
+        return f"Added {event.color} to lane {event.lane} ({event.detail})"
+    if event.kind == 'overflow':
+        return f"Penalty: {event.color} overflow to oven 2"
+    if event.kind == 'reject':
+        return f"Error: All lanes full for {event.color}"
+    if event.kind == 'pick':
+        return f"Conveyer picked {event.color} from lane {event.lane}"
+    return f"{event.kind}: {event.detail}"
+
+
+class NullSink:
+    """Discards every event."""
+
+    def record(self, kind, lane=-1, color=None, detail=None):
+        pass
+
+    def recent(self):
+        return []
+
+    def clear(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingSink:
+    """Keeps the most recent ``size`` events in memory."""
+
+    def __init__(self, size=1000):
+        self.events = deque(maxlen=size)
+
+    def record(self, kind, lane=-1, color=None, detail=None):
+        self.events.append(Event(time.monotonic(), kind, lane, color, detail))
+
+    def recent(self):
+        return list(self.events)
+
+    def clear(self):
+        self.events.clear()
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """Appends events to a JSON-lines file, one ``[time, kind, lane, color, detail]`` array per line.
+
+    Events are buffered and written every ``batch_size`` records (and on
+    close), so the hot path only appends a tuple to a list.
+    """
+
+    def __init__(self, path, batch_size=4096):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._file = open(path, 'a')
+
+    def record(self, kind, lane=-1, color=None, detail=None):
+        self._pending.append(Event(time.monotonic(), kind, lane, color, detail))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._file.write(''.join(json.dumps(event) + '\n' for event in self._pending))
+            self._file.flush()
+            self._pending = []
+
+    def recent(self):
+        return list(self._pending)
+
+    def clear(self):
+        # the file is append-only; mark the reset instead of truncating it
+        self.record('reset')
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def make_sink(spec='ring'):
+    """Build a sink from a spec string ('off', 'ring', 'ring:N', 'jsonl:PATH') or pass one through."""
+    if spec is None or spec == 'off':
+        return NullSink()
+    if not isinstance(spec, str):
+        return spec
+    kind, _, arg = spec.partition(':')
+    if kind == 'ring':
+        return RingSink(int(arg)) if arg else RingSink()
+    if kind == 'jsonl' and arg:
+        return JsonlSink(arg)
+    raise ValueError(f"Unknown event sink {spec!r}; expected 'off', 'ring[:N]' or 'jsonl:PATH'")
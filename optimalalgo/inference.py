@@ -0,0 +1,184 @@
+"""Micro-batched model inference for the server's prediction routes.
+
+Line controllers send one order per request. MicroBatcher collects whatever
+requests arrive within ``max_wait_ms`` (or until ``max_batch`` are waiting),
+runs a single batched call in a worker thread so the event loop keeps
+serving websockets, and hands each caller its own result.
+
+InferenceService wires two batchers to a ProductionPredictor, which is
+loaded (torch included) on the first request rather than at server start.
+The predictor serves batches from its PredictionGrid and, every
+MODEL_CHECK_INTERVAL seconds at most, reloads the model file if it changed.
+The server only loads bundles (see production.save_model_bundle): a pickled
+module at TWIN_HEAD_MODEL is refused, at startup and on reload, since
+unpickling runs arbitrary code from the file.
+"""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# production.py lives in the repository root
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_MODEL_PATH = os.path.join(REPO_ROOT, 'twin_head_model.pth')
+
+
+class MicroBatcher:
+    """Coalesces concurrent submit() calls into batched run_batch(items) calls.
+
+    run_batch takes a list of items and returns a list of results in the same
+    order; it runs on ``executor``. If it raises, every caller in that batch
+    gets the exception.
+    """
+
+    def __init__(self, run_batch, max_batch=256, max_wait_ms=5.0, max_queue=10000, executor=None):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self._task = None
+        self._loop = None
+        self.in_flight = 0
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.largest_batch = 0
+        self.last_batch_size = 0
+        self.batch_seconds = 0.0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result; raises asyncio.QueueFull when overloaded."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # first use, or a new event loop (queues and tasks are bound to one)
+            self._loop = loop
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        future = loop.create_future()
+        self.queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # callers that gave up (e.g. a closed HTTP request) are dropped
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            self.in_flight = len(batch)
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.run_batch, [item for item, _ in batch])
+            except Exception as e:
+                self.errors += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.in_flight = 0
+            self.batch_seconds += time.perf_counter() - started
+            self.batches += 1
+            self.items += len(batch)
+            self.last_batch_size = len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'in_flight': self.in_flight,
+            'batches': self.batches,
+            'items': self.items,
+            'errors': self.errors,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'last_batch_size': self.last_batch_size,
+            'largest_batch': self.largest_batch,
+            'mean_batch_ms': round(self.batch_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+        }
+
+
+def _rows(columns):
+    # dict of NumPy columns -> list of per-order dicts with plain Python values;
+    # float32 outputs are re-rounded in float64 so JSON shows 0.2, not 0.20000000298
+    lists = {
+        name: (values.astype(np.float64).round(1) if values.dtype.kind == 'f' else values).tolist()
+        for name, values in columns.items()
+    }
+    return [dict(zip(lists, values)) for values in zip(*lists.values())]
+
+
+class InferenceService:
+    """Prediction and buffer-recommendation batchers sharing one lazily loaded predictor."""
+
+    def __init__(self, model_path=None, max_batch=256, max_wait_ms=5.0):
+        self.model_path = model_path or os.environ.get('TWIN_HEAD_MODEL', DEFAULT_MODEL_PATH)
+        self.predictor = None
+        # one worker thread: batches run one at a time, in arrival order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+        self.predictions = MicroBatcher(self._predict, max_batch, max_wait_ms, executor=self.executor)
+        self.recommendations = MicroBatcher(self._recommend, max_batch, max_wait_ms, executor=self.executor)
+        self._loading = None
+
+    def _load(self):
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from production import ProductionPredictor
+        return ProductionPredictor(self.model_path, allow_pickle=False, prediction_grid=True, warmup=True)
+
+    async def ready(self):
+        """Load the predictor on first use, off the event loop; raises if the model cannot be loaded."""
+        if self.predictor is None:
+            if self._loading is None or (self._loading.done() and self._loading.exception() is not None):
+                self._loading = asyncio.get_running_loop().run_in_executor(self.executor, self._load)
+            self.predictor = await asyncio.shield(self._loading)
+
+    def _predict(self, orders):
+        columns = {name: [order[name] for order in orders] for name in ('buffer', 'priority', 'hour', 'color', 'oven')}
+        return _rows(self.predictor.predict_batch(columns))
+
+    def _recommend(self, queries):
+        return self.predictor.recommend_batch(queries)
+
+    async def predict(self, order):
+        """Processing time and downtime risk for one order dict (see predict_batch)."""
+        await self.ready()
+        return await self.predictions.submit(order)
+
+    async def recommend(self, query):
+        """Best buffer for one order dict with an occupancies mapping (see recommend_best_buffer)."""
+        await self.ready()
+        return await self.recommendations.submit(query)
+
+    def stats(self):
+        return {
+            'model_loaded': self.predictor is not None,
+            'predict': self.predictions.stats(),
+            'recommend': self.recommendations.stats(),
+        }
@@ -0,0 +1,138 @@
+"""Front-color index over a lane store, so lane selection does not scan every lane.
+
+BufferSystem calls ``FrontIndex.update(lane_idx)`` after every push and pop;
+the index then answers the routing questions add_to_bufferline and
+ConveyerBelt.pick_car ask, always with the same lane the linear scans would
+pick (lowest lane index on ties).
+"""
+import heapq
+
+# per-oven buckets: index 0 is oven 1, index 1 is oven 2
+OVEN1, OVEN2 = 0, 1
+
+
+class LaneSet:
+    """Set of lane indexes with cheap add, discard and min.
+
+    Backed by a heap with lazy deletion; each lane is in the heap at most
+    once, so its size is bounded by the number of lanes.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._queued = set()
+        self._members = set()
+
+    def __len__(self):
+        return len(self._members)
+
+    def add(self, lane_idx):
+        self._members.add(lane_idx)
+        if lane_idx not in self._queued:
+            self._queued.add(lane_idx)
+            heapq.heappush(self._heap, lane_idx)
+
+    def discard(self, lane_idx):
+        self._members.discard(lane_idx)
+
+    def min(self):
+        """Lowest lane index in the set, or None if it is empty."""
+        heap = self._heap
+        while heap and heap[0] not in self._members:
+            self._queued.discard(heapq.heappop(heap))
+        return heap[0] if heap else None
+
+
+def _bucket(buckets, key):
+    lanes = buckets.get(key)
+    if lanes is None:
+        lanes = buckets[key] = LaneSet()
+    return lanes
+
+
+class FrontIndex:
+    """Lanes grouped by front color, free space and front-color priority.
+
+    Priorities come from ``color_distribution`` (unknown colors rank last),
+    as in BufferSystem; build a new index if the distribution changes.
+    """
+
+    def __init__(self, lanes, oven1_lanes, color_distribution):
+        self.lanes = lanes
+        self.oven1_lanes = oven1_lanes
+        self.color_distribution = color_distribution
+        n = len(lanes)
+        self.oven_ranges = (range(0, oven1_lanes), range(oven1_lanes, n))
+        # cached (front, is_full) per lane, to know which buckets a lane leaves
+        self._state = [None] * n
+        # all lanes: front color -> lanes with that front; and every non-empty lane
+        self.by_front = {}
+        self.occupied = LaneSet()
+        # per oven: front color -> lanes with that front and a free slot
+        self.open_by_front = ({}, {})
+        # per oven: front priority -> lanes whose front has that priority (full or not)
+        self.by_priority = ({}, {})
+        for lane_idx in range(n):
+            self.update(lane_idx)
+
+    def update(self, lane_idx):
+        """Re-file a lane after its contents changed."""
+        front = self.lanes.front(lane_idx)
+        full = self.lanes.is_full(lane_idx)
+        state = (front, full)
+        old = self._state[lane_idx]
+        if state == old:
+            return
+        oven = OVEN2 if lane_idx >= self.oven1_lanes else OVEN1
+
+        if old is not None:
+            old_front, old_full = old
+            if old_front != 0:
+                self.by_front[old_front].discard(lane_idx)
+                self.occupied.discard(lane_idx)
+            if not old_full:
+                self.open_by_front[oven][old_front].discard(lane_idx)
+            self.by_priority[oven][self.priority(old_front)].discard(lane_idx)
+
+        if front != 0:
+            _bucket(self.by_front, front).add(lane_idx)
+            self.occupied.add(lane_idx)
+        if not full:
+            _bucket(self.open_by_front[oven], front).add(lane_idx)
+        _bucket(self.by_priority[oven], self.priority(front)).add(lane_idx)
+        self._state[lane_idx] = state
+
+    def priority(self, color):
+        return self.color_distribution.get(color, float('inf'))
+
+    def open_lane(self, color, oven):
+        """Lowest lane of oven (OVEN1/OVEN2) with color at its front and a free slot, or None."""
+        lanes = self.open_by_front[oven].get(color)
+        return lanes.min() if lanes is not None else None
+
+    def min_priority_lane(self, oven):
+        """Lowest lane of oven whose front color has the lowest priority."""
+        buckets = [(priority, lanes) for priority, lanes in self.by_priority[oven].items() if lanes]
+        if not buckets:
+            return self.oven_ranges[oven].start
+        return min(buckets, key=lambda bucket: bucket[0])[1].min()
+
+    def front_lane(self, color):
+        """Lowest lane (any oven) with color at its front, or None."""
+        lanes = self.by_front.get(color)
+        return lanes.min() if lanes is not None else None
+
+    def first_occupied_lane(self):
+        """Lowest non-empty lane, or None."""
+        return self.occupied.min()
+
+    def most_frequent_front(self):
+        """Color at the front of the most lanes; ties go to the color seen in the lowest lane."""
+        best = None
+        best_key = None
+        for color, lanes in self.by_front.items():
+            if lanes:
+                key = (-len(lanes), lanes.min())
+                if best_key is None or key < best_key:
+                    best, best_key = color, key
+        return best
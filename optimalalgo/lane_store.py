@@ -0,0 +1,238 @@
+from array import array
+
+# default lanes: lanes 0-3 (oven 1) have 14 slots, lanes 4-8 (oven 2) have 16 slots
+DEFAULT_LANE_CAPACITIES = (14, 14, 14, 14, 16, 16, 16, 16, 16)
+DEFAULT_OVEN1_LANES = 4
+
+
+def parse_layout(layout):
+    """Parse a lane layout like '4x14/5x16' into (lane_capacities, oven1_lanes).
+
+    The part before '/' describes the oven 1 lanes and the part after it the
+    oven 2 lanes; each part is one or more '<lanes>x<capacity>' groups joined
+    with '+', e.g. '2x14+2x12/5x16'.
+    """
+    try:
+        oven1, oven2 = layout.split('/')
+        groups = [[tuple(int(n) for n in group.split('x')) for group in part.split('+')]
+                  for part in (oven1, oven2)]
+    except ValueError:
+        raise ValueError(f"Invalid lane layout {layout!r}; expected e.g. '4x14/5x16'") from None
+    capacities = [[capacity] * lanes for part in groups for lanes, capacity in part]
+    oven1_lanes = sum(lanes for lanes, _ in groups[0])
+    return tuple(c for group in capacities for c in group), oven1_lanes
+
+
+def format_layout(lane_capacities, oven1_lanes):
+    """Inverse of parse_layout: (14, 14, 16), 2 -> '2x14/1x16'."""
+    def part(capacities):
+        groups = []
+        for capacity in capacities:
+            if groups and groups[-1][1] == capacity:
+                groups[-1][0] += 1
+            else:
+                groups.append([1, capacity])
+        return '+'.join(f"{lanes}x{capacity}" for lanes, capacity in groups)
+    return f"{part(lane_capacities[:oven1_lanes])}/{part(lane_capacities[oven1_lanes:])}"
+
+
+class ListLaneStore:
+    """Stores each buffer lane as a Python list padded with 0 for empty slots."""
+
+    def __init__(self, capacities=DEFAULT_LANE_CAPACITIES):
+        self.lanes = [[0] * capacity for capacity in capacities]
+        self._count = [0] * len(self.lanes)
+
+    @classmethod
+    def from_lanes(cls, buffer_lanes):
+        """Build a store from padded lane lists (0 marks an empty slot)."""
+        store = cls(())
+        store.lanes = buffer_lanes
+        store._count = [sum(1 for car in lane if car != 0) for lane in buffer_lanes]
+        return store
+
+    def copy(self):
+        """Independent store with the same lane contents."""
+        store = ListLaneStore(())
+        store.lanes = [lane[:] for lane in self.lanes]
+        store._count = self._count[:]
+        return store
+
+    def __len__(self):
+        return len(self.lanes)
+
+    def capacity(self, lane_idx):
+        return len(self.lanes[lane_idx])
+
+    def count(self, lane_idx):
+        return self._count[lane_idx]
+
+    def front(self, lane_idx):
+        """Color at the front of the lane, or 0 if the lane is empty."""
+        lane = self.lanes[lane_idx]
+        return lane[0] if lane else 0
+
+    def back(self, lane_idx):
+        """Color of the last car in the lane, or 0 if the lane is empty."""
+        count = self._count[lane_idx]
+        return self.lanes[lane_idx][count - 1] if count else 0
+
+    def is_full(self, lane_idx):
+        return 0 not in self.lanes[lane_idx]
+
+    def push(self, lane_idx, color):
+        """Put a car into the first empty slot of the lane; False if it is full."""
+        lane = self.lanes[lane_idx]
+        for j in range(len(lane)):
+            if lane[j] == 0:
+                lane[j] = color
+                self._count[lane_idx] += 1
+                return True
+        return False
+
+    def pop(self, lane_idx):
+        """Remove the car at the front of the lane and shift the rest forward."""
+        lane = self.lanes[lane_idx]
+        if not lane:
+            return 0
+        self.lanes[lane_idx] = lane[1:] + [0]
+        if lane[0] != 0:
+            self._count[lane_idx] -= 1
+        return lane[0]
+
+    def vehicles(self, lane_idx):
+        """Cars in the lane from front to back."""
+        return [car for car in self.lanes[lane_idx] if car != 0]
+
+    def peek(self, lane_idx, n):
+        """The first n cars of the lane (fewer if it holds fewer), front first."""
+        return self.lanes[lane_idx][:min(n, self._count[lane_idx])]
+
+    def to_lists(self):
+        """Lanes as padded lists, the format BufferSystem.buffer_lanes exposes."""
+        return self.lanes
+
+
+class RingLaneStore:
+    """Stores each buffer lane as a fixed-capacity ring buffer of color codes.
+
+    Colors are interned to small integers so a lane is a compact ``array``;
+    every lane keeps a head index, a fill count and its cached front color, so
+    enqueue, dequeue and front lookups are O(1) regardless of lane capacity.
+    """
+
+    def __init__(self, capacities=DEFAULT_LANE_CAPACITIES):
+        self._capacity = list(capacities)
+        self._slots = [array('H', [0]) * capacity for capacity in self._capacity]
+        self._head = [0] * len(self._capacity)
+        self._count = [0] * len(self._capacity)
+        self._front = [0] * len(self._capacity)
+        # code 0 is reserved for an empty slot
+        self._codes = {0: 0}
+        self._colors = [0]
+
+    @classmethod
+    def from_lanes(cls, buffer_lanes):
+        """Build a store from padded lane lists (0 marks an empty slot)."""
+        store = cls([len(lane) for lane in buffer_lanes])
+        for lane_idx, lane in enumerate(buffer_lanes):
+            for car in lane:
+                if car != 0:
+                    store.push(lane_idx, car)
+        return store
+
+    def copy(self):
+        """Independent store with the same lane contents."""
+        store = RingLaneStore(())
+        store._capacity = self._capacity[:]
+        store._slots = [array('H', slots) for slots in self._slots]
+        store._head = self._head[:]
+        store._count = self._count[:]
+        store._front = self._front[:]
+        store._codes = dict(self._codes)
+        store._colors = self._colors[:]
+        return store
+
+    def _code(self, color):
+        code = self._codes.get(color)
+        if code is None:
+            code = len(self._colors)
+            self._codes[color] = code
+            self._colors.append(color)
+        return code
+
+    def __len__(self):
+        return len(self._capacity)
+
+    def capacity(self, lane_idx):
+        return self._capacity[lane_idx]
+
+    def count(self, lane_idx):
+        return self._count[lane_idx]
+
+    def front(self, lane_idx):
+        """Color at the front of the lane, or 0 if the lane is empty."""
+        return self._front[lane_idx]
+
+    def back(self, lane_idx):
+        """Color of the last car in the lane, or 0 if the lane is empty."""
+        count = self._count[lane_idx]
+        if count == 0:
+            return 0
+        tail = (self._head[lane_idx] + count - 1) % self._capacity[lane_idx]
+        return self._colors[self._slots[lane_idx][tail]]
+
+    def is_full(self, lane_idx):
+        return self._count[lane_idx] >= self._capacity[lane_idx]
+
+    def push(self, lane_idx, color):
+        """Put a car at the back of the lane; False if it is full."""
+        count = self._count[lane_idx]
+        capacity = self._capacity[lane_idx]
+        if count >= capacity:
+            return False
+        tail = (self._head[lane_idx] + count) % capacity
+        self._slots[lane_idx][tail] = self._code(color)
+        if count == 0:
+            self._front[lane_idx] = color
+        self._count[lane_idx] = count + 1
+        return True
+
+    def pop(self, lane_idx):
+        """Remove and return the car at the front of the lane (0 if empty)."""
+        count = self._count[lane_idx]
+        if count == 0:
+            return 0
+        car = self._front[lane_idx]
+        head = (self._head[lane_idx] + 1) % self._capacity[lane_idx]
+        self._head[lane_idx] = head
+        self._count[lane_idx] = count - 1
+        self._front[lane_idx] = self._colors[self._slots[lane_idx][head]] if count > 1 else 0
+        return car
+
+    def vehicles(self, lane_idx):
+        """Cars in the lane from front to back."""
+        slots = self._slots[lane_idx]
+        head = self._head[lane_idx]
+        capacity = self._capacity[lane_idx]
+        return [self._colors[slots[(head + k) % capacity]] for k in range(self._count[lane_idx])]
+
+    def peek(self, lane_idx, n):
+        """The first n cars of the lane (fewer if it holds fewer), front first."""
+        slots = self._slots[lane_idx]
+        head = self._head[lane_idx]
+        capacity = self._capacity[lane_idx]
+        return [self._colors[slots[(head + k) % capacity]] for k in range(min(n, self._count[lane_idx]))]
+
+    def to_lists(self):
+        """Lanes as padded lists, the format BufferSystem.buffer_lanes exposes."""
+        return [
+            self.vehicles(i) + [0] * (self._capacity[i] - self._count[i])
+            for i in range(len(self._capacity))
+        ]
+
+
+LANE_STORES = {
+    'list': ListLaneStore,
+    'ring': RingLaneStore,
+}
@@ -0,0 +1,164 @@
+"""Lookahead sequencing policy for ConveyerBelt.
+
+A pick policy is any object with ``choose_lane(lanes, current_color)``
+returning the lane to pick from next (None when every lane is empty); set
+it as ``ConveyerBelt.policy`` (or pass ``conveyer_policy`` to BufferSystem)
+to replace the greedy rule of ``pick_car``.
+
+LookaheadPolicy searches the next ``depth`` picks over the cars already in
+the lanes (arrivals are unknown, so none are assumed) for the order with the
+fewest color changes. The search state is the multiset of lane prefixes
+still reachable within the remaining picks: lane identity does not change
+the cost, so states are canonicalized by sorting and memoized in a
+transposition table shared across decisions, evicting the least recently
+used entries one at a time. Each level only expands the ``beam_width`` most
+promising distinct lane fronts. Depths are searched iteratively until the
+per-pick time budget runs out; the deepest finished answer wins, and the
+greedy choice is the fallback, so a zero budget reproduces
+``ConveyerBelt.pick_car`` exactly. The deadline is checked before every
+node, so a decision overruns its budget by at most one expansion.
+"""
+import time
+from collections import OrderedDict
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def greedy_lane(prefixes, current_color):
+    """The lane ConveyerBelt.pick_car's greedy rule picks, given each lane's cars front first."""
+    occupied = [i for i, prefix in enumerate(prefixes) if prefix]
+    if not occupied:
+        return None
+    if current_color is None:
+        # most frequent front color, ties to the color seen in the earliest lane
+        counts = {}
+        for i in occupied:
+            counts[prefixes[i][0]] = counts.get(prefixes[i][0], 0) + 1
+        current_color = max(counts.items(), key=lambda x: x[1])[0]
+    for i in occupied:
+        if prefixes[i][0] == current_color:
+            return i
+    return occupied[0]
+
+
+def _front_run(prefix):
+    # cars of the front color at the head of a lane prefix
+    run = 1
+    while run < len(prefix) and prefix[run] == prefix[0]:
+        run += 1
+    return run
+
+
+class LookaheadPolicy:
+    """Bounded-depth beam search over lane fronts with a transposition cache.
+
+    Args:
+        depth: Picks looked ahead per decision
+        beam_width: Distinct lane fronts expanded per search node
+        budget_ms: Wall time allowed per decision
+        cache_size: Transposition entries kept; the least recently used are evicted beyond it
+    """
+
+    def __init__(self, depth=6, beam_width=3, budget_ms=0.5, cache_size=50000):
+        self.depth = depth
+        self.beam_width = beam_width
+        self.budget = budget_ms / 1000
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.decisions = 0
+        self.timeouts = 0
+        self.depth_reached = 0
+        self.cache_hits = 0
+        self.nodes = 0
+
+    def choose_lane(self, lanes, current_color):
+        deadline = time.perf_counter() + self.budget
+        prefixes = [tuple(lanes.peek(i, self.depth)) for i in range(len(lanes))]
+        best = greedy_lane(prefixes, current_color)
+        if best is None:
+            return None
+        self.decisions += 1
+        reached = 1
+        for depth in range(2, self.depth + 1):
+            try:
+                best = self._best_lane(prefixes, current_color, depth, deadline)
+            except _OutOfTime:
+                self.timeouts += 1
+                break
+            reached = depth
+        self.depth_reached += reached
+        return best
+
+    def _best_lane(self, prefixes, current_color, depth, deadline):
+        """Lane whose pick starts the cheapest depth-pick sequence; ties go to the greedy choice."""
+        greedy = greedy_lane(prefixes, current_color)
+        truncated = [prefix[:depth] for prefix in prefixes]
+        # greedy's lane first, then lanes in order: the first of equal costs wins
+        order = [greedy] + [i for i in range(len(prefixes)) if i != greedy]
+        best_lane, best_cost = greedy, None
+        seen = set()
+        for i in order:
+            prefix = truncated[i]
+            if not prefix or prefix in seen:
+                continue
+            if time.perf_counter() > deadline:
+                raise _OutOfTime
+            seen.add(prefix)
+            color = prefix[0]
+            rest = truncated[:i] + [prefix[1:]] + truncated[i + 1:]
+            cost = (current_color is not None and color != current_color) + \
+                self._cost(self._state(rest, depth - 1), color, depth - 1, deadline)
+            if best_cost is None or cost < best_cost:
+                best_lane, best_cost = i, cost
+        return best_lane
+
+    @staticmethod
+    def _state(prefixes, remaining):
+        # canonical multiset of non-empty prefixes that matter for the remaining picks
+        return tuple(sorted(p[:remaining] for p in prefixes if p and remaining))
+
+    def _cost(self, state, current_color, remaining, deadline):
+        """Fewest color changes over the next `remaining` picks from state."""
+        if not state:
+            return 0
+        if time.perf_counter() > deadline:
+            raise _OutOfTime
+        key = (current_color, remaining, state)
+        cost = self.cache.get(key)
+        if cost is not None:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return cost
+        self.nodes += 1
+
+        # beam: fronts matching the current color first, then the longest same-color runs;
+        # the state is sorted and the sort is stable, so ties keep that order on every run
+        moves = sorted(dict.fromkeys(state), key=lambda p: (p[0] != current_color, -_front_run(p)))[:self.beam_width]
+        best = None
+        for prefix in moves:
+            rest = list(state)
+            rest.remove(prefix)
+            rest.append(prefix[1:])
+            cost = (prefix[0] != current_color) + \
+                self._cost(self._state(rest, remaining - 1), prefix[0], remaining - 1, deadline)
+            if best is None or cost < best:
+                best = cost
+                if best == 0:
+                    break
+
+        self.cache[key] = best
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return best
+
+    def stats(self):
+        return {
+            'decisions': self.decisions,
+            'timeouts': self.timeouts,
+            'mean_depth': round(self.depth_reached / self.decisions, 2) if self.decisions else 0.0,
+            'nodes': self.nodes,
+            'cache_hits': self.cache_hits,
+            'cache_entries': len(self.cache),
+        }
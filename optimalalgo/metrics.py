@@ -0,0 +1,165 @@
+"""Hot-path timing, Prometheus text exposition and on-demand profiling.
+
+Timing hooks are a pair of calls around the measured code::
+
+    started = metrics.clock()
+    ...
+    metrics.observe_since('add_to_bufferline', started)
+
+``clock()`` returns None while timing is off, so a disabled hook costs one
+attribute check. Timing starts off unless the METRICS_TIMING environment
+variable is set, and can be switched at runtime with ``metrics.enabled``.
+Observations land in fixed-bucket histograms rendered by ``render``.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+from bisect import bisect_left
+
+# histogram bucket upper bounds, in seconds (10us .. 1s)
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    """Cumulative-on-render latency histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """(le, cumulative count) pairs, ending with '+Inf'."""
+        cumulative = 0
+        samples = []
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            samples.append((bound if bound == '+Inf' else repr(bound), cumulative))
+        return samples
+
+
+def _escape(value):
+    # label values escape backslash, double quote and newline in the text format
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def render_family(name, kind, help_text, samples):
+    """Prometheus text lines for one metric family of (labels, value) samples."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    lines.extend(f'{name}{_labels(labels)} {value}' for labels, value in samples)
+    return lines
+
+
+class Metrics:
+    """Latency histograms keyed by (family, label) plus runtime on/off switch."""
+
+    FAMILIES = {
+        'sequencing_operation_seconds': ('op', "Time spent in simulation and publish hot paths."),
+        'sequencing_tick_lag_seconds': (None, "How far each simulation tick wakes up after its target time."),
+    }
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+
+    def clock(self):
+        """Start time for observe_since, or None while timing is off."""
+        return time.perf_counter() if self.enabled else None
+
+    def observe_since(self, op, started, family='sequencing_operation_seconds'):
+        if started is not None:
+            self.observe(op, time.perf_counter() - started, family)
+
+    def observe(self, op, seconds, family='sequencing_operation_seconds'):
+        histogram = self.histograms.get((family, op))
+        if histogram is None:
+            histogram = self.histograms[(family, op)] = Histogram()
+        histogram.observe(seconds)
+
+    def reset(self):
+        self.histograms.clear()
+
+    def render(self, families=()):
+        """Prometheus text for the histograms followed by extra (name, kind, help, samples) families."""
+        lines = render_family('sequencing_timing_enabled', 'gauge',
+                              "1 while the timing hooks are recording.", [({}, int(self.enabled))])
+        for family, (label, help_text) in self.FAMILIES.items():
+            histograms = sorted((op, h) for (name, op), h in self.histograms.items() if name == family)
+            if not histograms:
+                continue
+            lines += [f'# HELP {family} {help_text}', f'# TYPE {family} histogram']
+            for op, histogram in histograms:
+                labels = {label: op} if label else {}
+                for bound, count in histogram.samples():
+                    lines.append(f'{family}_bucket{_labels({**labels, "le": bound})} {count}')
+                lines.append(f'{family}_sum{_labels(labels)} {histogram.sum}')
+                lines.append(f'{family}_count{_labels(labels)} {histogram.count}')
+        for name, kind, help_text, samples in families:
+            lines += render_family(name, kind, help_text, samples)
+        return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    """One cProfile (or pyinstrument, if installed) capture at a time."""
+
+    KINDS = ('cprofile', 'pyinstrument')
+
+    def __init__(self):
+        self.kind = None
+        self._profiler = None
+
+    @property
+    def running(self):
+        return self._profiler is not None
+
+    def start(self, kind='cprofile'):
+        """Begin a capture; raises RuntimeError if one is running or the profiler is unavailable."""
+        if self.running:
+            raise RuntimeError(f"A {self.kind} capture is already running")
+        if kind not in self.KINDS:
+            raise RuntimeError(f"Unknown profiler {kind!r}; expected one of {self.KINDS}")
+        if kind == 'pyinstrument':
+            try:
+                import pyinstrument
+            except ImportError:
+                raise RuntimeError("pyinstrument is not installed; use the cprofile capture instead") from None
+            profiler = pyinstrument.Profiler(async_mode='enabled')
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self.kind = kind
+        self._profiler = profiler
+
+    def stop(self, limit=40):
+        """End the capture and return its text report (top ``limit`` functions by cumulative time)."""
+        if not self.running:
+            raise RuntimeError("No profile capture is running")
+        profiler, self._profiler = self._profiler, None
+        if self.kind == 'pyinstrument':
+            profiler.stop()
+            return profiler.output_text()
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+# process-wide instances the server and sessions share
+metrics = Metrics(enabled=bool(os.environ.get('METRICS_TIMING')))
+profiler = Profiler()
@@ -0,0 +1,304 @@
+"""Replay historical plant logs through BufferSystem.
+
+Logs use the training schema (timestamp, color, priority, oven, buffer,
+processing_time, in_unavail, out_unavail) and are streamed record by record,
+so multi-GB files never sit in memory:
+
+- ``.csv``: read with the csv module
+- ``.parquet``: read in record batches with pyarrow
+- ``.arrow`` / ``.feather``: Arrow IPC files, memory-mapped with pyarrow
+
+Every logged car arrives at its timestamp and is routed by the sequencing
+policy; it is scheduled to leave the buffer ``processing_time`` seconds
+later, as it did on the line. At that time the conveyer picks whichever car
+the policy chooses. Rolling KPIs per event-time window put the policy's
+color changes and lane choices next to what the log says actually happened.
+
+    python replay.py plant_logs.parquet --window 3600 --speed 0
+"""
+import argparse
+import csv
+import heapq
+import json
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from lane_store import parse_layout
+from sequencing import BufferSystem
+
+LogRecord = namedtuple('LogRecord', 'time color priority oven buffer processing_time in_unavail out_unavail')
+LOG_COLUMNS = ['timestamp', 'color', 'priority', 'oven', 'buffer', 'processing_time', 'in_unavail', 'out_unavail']
+
+
+def to_seconds(value):
+    """Event time in seconds from epoch numbers, datetimes or ISO 8601 strings."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def _number(value, default=None):
+    if value is None or value == '':
+        return default
+    number = float(value)
+    return default if number != number else number  # NaN
+
+
+def parse_record(row, default_processing_time=60.0):
+    """LogRecord from a dict with LOG_COLUMNS keys (strings from CSV or typed values from Arrow)."""
+    oven = row['oven']
+    return LogRecord(
+        time=to_seconds(row['timestamp']),
+        color=row['color'],
+        priority=int(_number(row.get('priority'), 0)),
+        # ovens are logged as O1/O2 (or 1/2); BufferSystem takes 1 or 2
+        oven=2 if str(oven).upper().lstrip('O') == '2' else 1,
+        buffer=int(_number(row.get('buffer'), 0)),
+        processing_time=_number(row.get('processing_time'), default_processing_time),
+        in_unavail=_flag(row.get('in_unavail', False)),
+        out_unavail=_flag(row.get('out_unavail', False)),
+    )
+
+
+def read_csv(path, default_processing_time=60.0):
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield parse_record(row, default_processing_time)
+
+
+def _read_batches(batches, default_processing_time):
+    for batch in batches:
+        columns = batch.to_pydict()
+        names = list(columns)
+        for values in zip(*columns.values()):
+            yield parse_record(dict(zip(names, values)), default_processing_time)
+
+
+def read_parquet(path, chunk_size=65536, default_processing_time=60.0):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet logs need pyarrow; install it or convert the log to CSV") from None
+    parquet = pq.ParquetFile(path)
+    columns = [name for name in LOG_COLUMNS if name in parquet.schema_arrow.names]
+    yield from _read_batches(parquet.iter_batches(batch_size=chunk_size, columns=columns), default_processing_time)
+
+
+def read_arrow(path, default_processing_time=60.0):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("Arrow logs need pyarrow; install it or convert the log to CSV") from None
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        yield from _read_batches(batches, default_processing_time)
+
+
+def read_log(path, chunk_size=65536, default_processing_time=60.0):
+    """Stream LogRecords from a CSV, Parquet or Arrow IPC log, picked by file extension."""
+    if path.endswith('.parquet'):
+        return read_parquet(path, chunk_size, default_processing_time)
+    if path.endswith(('.arrow', '.feather', '.ipc')):
+        return read_arrow(path, default_processing_time)
+    return read_csv(path, default_processing_time)
+
+
+def in_event_order(records, reorder_window=1000, stats=None):
+    """Re-sort slightly out-of-order records through a bounded heap.
+
+    Records more than ``reorder_window`` rows late are released at the
+    current event time and counted in ``stats['late_records']``.
+    """
+    heap = []
+    last = float('-inf')
+    late = 0
+    for seq, record in enumerate(records):
+        heapq.heappush(heap, (record.time, seq, record))
+        if len(heap) > reorder_window:
+            _, _, record = heapq.heappop(heap)
+            if record.time < last:
+                late += 1
+                record = record._replace(time=last)
+            last = record.time
+            yield record
+    while heap:
+        _, _, record = heapq.heappop(heap)
+        if record.time < last:
+            late += 1
+            record = record._replace(time=last)
+        last = record.time
+        yield record
+    if stats is not None:
+        stats['late_records'] = late
+
+
+class ReplayKpis:
+    """Running replay counters; ``window()`` reports the change since the previous call."""
+
+    FIELDS = ('arrivals', 'picks', 'idle_picks', 'policy_color_changes', 'actual_color_changes',
+              'overflow_penalties', 'rejected', 'lane_matches', 'in_unavail', 'out_unavail')
+
+    def __init__(self, buffer_system):
+        self.buffer_system = buffer_system
+        self.totals = dict.fromkeys(self.FIELDS, 0)
+        self._last = dict(self.totals)
+        self.actual_color = None
+
+    def snapshot(self):
+        bs = self.buffer_system
+        self.totals['picks'] = bs.conveyer.total_picks
+        self.totals['policy_color_changes'] = bs.conveyer.color_changes
+        self.totals['overflow_penalties'] = bs.overflow
+        return dict(self.totals)
+
+    def window(self, start, end):
+        totals = self.snapshot()
+        delta = {field: totals[field] - self._last[field] for field in self.FIELDS}
+        self._last = totals
+        bs = self.buffer_system
+        matches = delta.pop('lane_matches')
+        return {
+            'window_start': start,
+            'window_end': end,
+            **delta,
+            'lane_agreement': round(matches / delta['arrivals'], 4) if delta['arrivals'] else None,
+            'buffer_utilization': round(bs.cars / sum(bs.oven_capacity) * 100, 1),
+        }
+
+
+def _merge(records, departures):
+    """(time, record, departure) events: logged arrivals interleaved with due departures."""
+    for record in records:
+        while departures and departures[0][0] <= record.time:
+            departure = heapq.heappop(departures)
+            yield departure[0], None, departure
+        yield record.time, record, None
+    while departures:
+        departure = heapq.heappop(departures)
+        yield departure[0], None, departure
+
+
+def _busy(report):
+    return report['arrivals'] or report['picks'] or report['actual_color_changes']
+
+
+def replay(records, layout=None, color_distribution=None, speed=None, window=3600.0,
+           reorder_window=1000, lane_store='ring', clock=time.monotonic, sleep=time.sleep):
+    """Drive a BufferSystem with logged arrivals and departures, yielding KPIs per window.
+
+    Args:
+        records: LogRecords, roughly in event-time order (see read_log)
+        layout: Lane layout such as '4x14/5x16'; logged buffer N is compared with lane N
+        color_distribution: Routing priorities; BufferSystem default if None
+        speed: None or 0 for max speed, otherwise N x real time
+        window: Event-time seconds per KPI window
+        reorder_window: Records buffered to repair out-of-order logs
+
+    Yields one dict per window with events in it, then a final dict with
+    ``'window_start': None`` holding the totals.
+    """
+    geometry = {}
+    if layout is not None:
+        geometry['lane_capacities'], geometry['oven1_lanes'] = parse_layout(layout)
+    bs = BufferSystem(color_distribution=color_distribution, lane_store=lane_store, event_sink='off', **geometry)
+    kpis = ReplayKpis(bs)
+    totals = kpis.totals
+    routed = []
+    bs.listeners.append(lambda op, lane_idx, color: routed.append(lane_idx) if op == 'add' else None)
+
+    departures = []  # heap of (time, seq, color, admitted) for cars still on the line
+    order_stats = {}
+    wall_start = event_start = window_start = None
+    seq = 0
+
+    for event_time, record, departure in _merge(in_event_order(records, reorder_window, order_stats), departures):
+        if window_start is None:
+            wall_start, event_start, window_start = clock(), event_time, event_time
+        if event_time >= window_start + window:
+            report = kpis.window(window_start, window_start + window)
+            if _busy(report):
+                yield report
+            # skip straight to the window holding this event; idle gaps are not reported
+            window_start += window * ((event_time - window_start) // window)
+        if speed:
+            # N x real time: wait until the wall clock catches up with event time
+            delay = wall_start + (event_time - event_start) / speed - clock()
+            if delay > 0:
+                sleep(delay)
+
+        if record is not None:
+            totals['arrivals'] += 1
+            totals['in_unavail'] += record.in_unavail
+            totals['out_unavail'] += record.out_unavail
+            routed.clear()
+            admitted = bs.add_to_bufferline(record.color, record.oven)
+            if admitted:
+                totals['lane_matches'] += routed[-1] + 1 == record.buffer
+            else:
+                totals['rejected'] += 1
+            seq += 1
+            heapq.heappush(departures, (event_time + record.processing_time, seq, record.color, admitted))
+        else:
+            _, _, color, admitted = departure
+            # the log's own sequence: cars leave in departure-time order
+            if kpis.actual_color is not None and color != kpis.actual_color:
+                totals['actual_color_changes'] += 1
+            kpis.actual_color = color
+            if admitted and not bs.process_conveyer_pickup():
+                totals['idle_picks'] += 1
+
+    if window_start is not None:
+        report = kpis.window(window_start, window_start + window)
+        if _busy(report):
+            yield report
+    summary = kpis.snapshot()
+    summary.update(window_start=None, late_records=order_stats.get('late_records', 0))
+    matches = summary.pop('lane_matches')
+    summary['lane_agreement'] = round(matches / summary['arrivals'], 4) if summary['arrivals'] else None
+    yield summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a plant log through the sequencing policy.")
+    parser.add_argument('log', help="CSV, Parquet or Arrow IPC log with the training schema")
+    parser.add_argument('--speed', type=float, default=0, help="N x real time; 0 replays at max speed")
+    parser.add_argument('--window', type=float, default=3600.0, help="event-time seconds per KPI window")
+    parser.add_argument('--layout', default=None, help="lane layout, e.g. 4x14/5x16")
+    parser.add_argument('--chunk-size', type=int, default=65536, help="rows per Parquet read")
+    parser.add_argument('--reorder-window', type=int, default=1000,
+                        help="records buffered to repair out-of-order timestamps")
+    parser.add_argument('--default-processing-time', type=float, default=60.0,
+                        help="seconds in the buffer for records without processing_time")
+    parser.add_argument('--out', default=None, help="write window KPIs as JSON lines here instead of stdout")
+    args = parser.parse_args(argv)
+
+    records = read_log(args.log, args.chunk_size, args.default_processing_time)
+    out = open(args.out, 'w') if args.out else None
+    try:
+        for report in replay(records, args.layout, speed=args.speed, window=args.window,
+                             reorder_window=args.reorder_window):
+            if report['window_start'] is None:
+                del report['window_start']
+                print(json.dumps(report, indent=2))
+            else:
+                print(json.dumps(report), file=out, flush=out is None)
+    finally:
+        if out is not None:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
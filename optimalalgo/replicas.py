@@ -0,0 +1,274 @@
+"""Lockstep simulation of many BufferSystem replicas as NumPy arrays.
+
+Every replica runs the same sequencing rules on its own car stream. Lane
+contents for all R replicas live in one ``(R, lanes, capacity)`` array of
+color codes (code 0 is an empty slot), with ring-buffer heads, counts and
+front colors as ``(R, lanes)`` arrays. Each step applies add_to_bufferline
+or ConveyerBelt.pick_car to every replica at once with masked array
+operations, and gives the same results as a scalar BufferSystem fed the
+same cars.
+
+    python replicas.py --replicas 4096 --cars 2000 --seed 7 --check 16
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from lane_store import DEFAULT_LANE_CAPACITIES, DEFAULT_OVEN1_LANES, parse_layout
+from sequencing import BufferSystem
+from simulate import PICK_POLICIES
+
+NO_COLOR = -1
+
+
+class ReplicaBatch:
+    """R independent buffer systems with a shared lane layout and color distribution.
+
+    Args:
+        n_replicas: Number of replicas R
+        color_distribution: Routing priorities as in BufferSystem; default if None
+        lane_capacities, oven1_lanes: Lane layout as in BufferSystem
+    """
+
+    def __init__(self, n_replicas, color_distribution=None, lane_capacities=DEFAULT_LANE_CAPACITIES,
+                 oven1_lanes=DEFAULT_OVEN1_LANES):
+        if color_distribution is None:
+            color_distribution = BufferSystem(lane_capacities=(), oven1_lanes=0,
+                                              event_sink='off').default_color_distribution
+        self.color_distribution = color_distribution
+        self.capacity = np.asarray(lane_capacities, dtype=np.int64)
+        self.oven1_lanes = oven1_lanes
+        self.n_replicas = n_replicas
+        # color codes; code 0 is the empty slot, as in RingLaneStore
+        self.colors = [0] + [c for c in color_distribution if c != 0]
+        self.codes = {color: code for code, color in enumerate(self.colors)}
+        self._priority = np.array([color_distribution.get(c, np.inf) for c in self.colors], dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        R, L = self.n_replicas, len(self.capacity)
+        self.slots = np.zeros((R, L, int(self.capacity.max(initial=0))), dtype=np.int16)
+        self.head = np.zeros((R, L), dtype=np.int64)
+        self.count = np.zeros((R, L), dtype=np.int64)
+        self.front = np.zeros((R, L), dtype=np.int16)
+        self.cars = np.zeros(R, dtype=np.int64)
+        self.current = np.full(R, NO_COLOR, dtype=np.int64)
+        self.total_cars = np.zeros(R, dtype=np.int64)
+        self.overflow = np.zeros(R, dtype=np.int64)
+        self.rejected = np.zeros(R, dtype=np.int64)
+        self.color_changes = np.zeros(R, dtype=np.int64)
+        self.total_picks = np.zeros(R, dtype=np.int64)
+        self._rows = np.arange(R)
+
+    def encode(self, colors):
+        """Color codes for an array-like of colors; unseen colors get new codes (lowest priority)."""
+        flat = np.asarray(colors, dtype=object).ravel()
+        for color in set(flat.tolist()) - self.codes.keys():
+            self.codes[color] = len(self.colors)
+            self.colors.append(color)
+            self._priority = np.append(self._priority, np.inf)
+        return np.array([self.codes[c] for c in flat], dtype=np.int16).reshape(np.shape(colors))
+
+    def _route(self, rows, color, lanes):
+        """Lane each row picks within lanes: first open color match, else the min-priority lane."""
+        front = self.front[rows][:, lanes]
+        match = (front == color[:, None]) & (self.count[rows][:, lanes] < self.capacity[lanes])
+        min_lane = self._priority[front].argmin(axis=1)  # first minimum, like the scan
+        return lanes.start + np.where(match.any(axis=1), match.argmax(axis=1), min_lane)
+
+    def _push(self, rows, lane, color):
+        capacity = self.capacity[lane]
+        count = self.count[rows, lane]
+        self.slots[rows, lane, (self.head[rows, lane] + count) % capacity] = color
+        self.front[rows, lane] = np.where(count == 0, color, self.front[rows, lane])
+        self.count[rows, lane] = count + 1
+        self.cars[rows] += 1
+        self.total_cars[rows] += 1
+
+    def add(self, colors, ovens, active=None):
+        """add_to_bufferline for every (active) replica; returns a bool array of admitted cars.
+
+        colors are color codes (see encode), ovens 1 or 2, both shaped (R,).
+        """
+        colors = np.asarray(colors, dtype=np.int16)
+        ovens = np.asarray(ovens)
+        rows = self._rows if active is None else self._rows[np.asarray(active, dtype=bool)]
+        admitted = np.zeros(self.n_replicas, dtype=bool)
+        oven1 = range(self.oven1_lanes)
+        oven2 = range(self.oven1_lanes, len(self.capacity))
+
+        # oven 1: lane 0 for the very first car, otherwise color match / min priority
+        o1 = rows[ovens[rows] == 1]
+        lane = np.where(self.cars[o1] == 0, 0, self._route(o1, colors[o1], oven1))
+        fits = self.count[o1, lane] < self.capacity[lane]
+        self._push(o1[fits], lane[fits], colors[o1[fits]])
+        admitted[o1[fits]] = True
+        overflowed = o1[~fits]
+        self.overflow[overflowed] += 1
+
+        # oven 2, including oven 1 overflow
+        o2 = np.concatenate([rows[ovens[rows] == 2], overflowed])
+        lane = self._route(o2, colors[o2], oven2)
+        fits = self.count[o2, lane] < self.capacity[lane]
+        self._push(o2[fits], lane[fits], colors[o2[fits]])
+        admitted[o2[fits]] = True
+        self.rejected[o2[~fits]] += 1
+        return admitted
+
+    def _most_frequent_front(self, rows):
+        """ConveyerBelt.find_most_frequent_color per row: most common front, ties to the earliest lane."""
+        front = self.front[rows]
+        n_lanes = front.shape[1]
+        onehot = front[:, :, None] == np.arange(1, len(self.colors))  # (rows, lanes, colors); 0 is empty
+        counts = onehot.sum(axis=1)
+        first_lane = np.where(onehot.any(axis=1), onehot.argmax(axis=1), n_lanes)
+        return 1 + (counts * (n_lanes + 1) - first_lane).argmax(axis=1)
+
+    def pick(self, active=None):
+        """process_conveyer_pickup for every (active) replica; returns a bool array of picks."""
+        occupied = self.count > 0
+        has_cars = occupied.any(axis=1)
+        if active is not None:
+            has_cars &= np.asarray(active, dtype=bool)
+        rows = self._rows[has_cars]
+
+        unset = rows[self.current[rows] == NO_COLOR]
+        self.current[unset] = self._most_frequent_front(unset)
+
+        current = self.current[rows]
+        match = (self.front[rows] == current[:, None]) & occupied[rows]
+        has_match = match.any(axis=1)
+        lane = np.where(has_match, match.argmax(axis=1), occupied[rows].argmax(axis=1))
+        changed = rows[~has_match]
+        self.color_changes[changed] += 1
+        self.current[changed] = self.front[changed, lane[~has_match]]
+
+        # pop the front car of the chosen lanes
+        head = (self.head[rows, lane] + 1) % self.capacity[lane]
+        count = self.count[rows, lane] - 1
+        self.head[rows, lane] = head
+        self.count[rows, lane] = count
+        self.front[rows, lane] = np.where(count > 0, self.slots[rows, lane, head], 0)
+        self.cars[rows] -= 1
+        self.total_picks[rows] += 1
+        return has_cars
+
+    def run(self, colors, ovens, pick_policy='interleaved'):
+        """Feed every replica its car stream in lockstep, like simulate.run_operations.
+
+        colors and ovens are (R, n_cars) arrays; colors may be codes or color values.
+        """
+        colors = np.asarray(colors)
+        if colors.dtype.kind not in 'iu':
+            colors = self.encode(colors)
+        should_pick = PICK_POLICIES[pick_policy] if isinstance(pick_policy, str) else pick_policy
+        operation_count = 0
+        car = 0
+        while car < colors.shape[1]:
+            if should_pick(operation_count):
+                self.pick()
+            else:
+                self.add(colors[:, car], ovens[:, car])
+                car += 1
+            operation_count += 1
+
+    def vehicles(self, replica, lane_idx):
+        """Cars in one lane of one replica from front to back, as colors."""
+        capacity = self.capacity[lane_idx]
+        head = self.head[replica, lane_idx]
+        return [self.colors[self.slots[replica, lane_idx, (head + k) % capacity]]
+                for k in range(self.count[replica, lane_idx])]
+
+    def buffer_lanes(self, replica):
+        """One replica's lanes as padded lists, like BufferSystem.buffer_lanes."""
+        return [self.vehicles(replica, i) + [0] * (int(self.capacity[i]) - int(self.count[replica, i]))
+                for i in range(len(self.capacity))]
+
+    def kpis(self):
+        """Per-replica counters (arrays of shape (R,)), in simulate's KPI names."""
+        return {
+            'total_picks': self.total_picks,
+            'color_changes': self.color_changes,
+            'overflow_penalties': self.overflow,
+            'rejected': self.rejected,
+            'cars_in_buffer': self.cars,
+            'total_cars': self.total_cars,
+        }
+
+
+def random_streams(batch, n_cars, seed=None):
+    """Per-replica (colors, ovens) code arrays drawn like simulate.random_arrivals."""
+    rng = np.random.default_rng(seed)
+    weighted = [(batch.codes[c], p) for c, p in batch.color_distribution.items() if c != 0 and p > 0]
+    codes = np.array([code for code, _ in weighted], dtype=np.int16)
+    weights = np.array([p for _, p in weighted], dtype=np.float64)
+    colors = rng.choice(codes, size=(batch.n_replicas, n_cars), p=weights / weights.sum())
+    ovens = rng.integers(1, 3, size=(batch.n_replicas, n_cars))
+    return colors, ovens
+
+
+def check_replicas(batch, colors, ovens, replicas, pick_policy='interleaved'):
+    """Replay replicas through scalar BufferSystems and raise if any result differs."""
+    for r in replicas:
+        bs = BufferSystem(color_distribution=dict(batch.color_distribution),
+                          lane_capacities=tuple(int(c) for c in batch.capacity),
+                          oven1_lanes=batch.oven1_lanes, event_sink='off', lane_index=False)
+        stream = [(batch.colors[c], int(o)) for c, o in zip(colors[r], ovens[r])]
+        rejected = 0
+        should_pick = PICK_POLICIES[pick_policy]
+        operation_count = 0
+        cars = iter(stream)
+        car = next(cars, None)
+        while car is not None:
+            if should_pick(operation_count):
+                bs.process_conveyer_pickup()
+            else:
+                rejected += not bs.add_to_bufferline(*car)
+                car = next(cars, None)
+            operation_count += 1
+        expected = (bs.buffer_lanes, bs.conveyer.color_changes, bs.conveyer.total_picks, bs.overflow, rejected,
+                    bs.conveyer.current_color)
+        current = batch.current[r]
+        actual = (batch.buffer_lanes(r), int(batch.color_changes[r]), int(batch.total_picks[r]),
+                  int(batch.overflow[r]), int(batch.rejected[r]),
+                  None if current == NO_COLOR else batch.colors[current])
+        if expected != actual:
+            raise AssertionError(f"replica {r} differs from BufferSystem")
+    return len(replicas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many BufferSystem replicas in lockstep with NumPy.")
+    parser.add_argument('--replicas', type=int, default=1024)
+    parser.add_argument('--cars', type=int, default=2000, help="cars per replica")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--layout', default=None, help="lane layout, e.g. 4x14/5x16")
+    parser.add_argument('--pick', choices=sorted(PICK_POLICIES), default='interleaved')
+    parser.add_argument('--check', type=int, default=0, help="replicas to verify against BufferSystem")
+    args = parser.parse_args(argv)
+
+    geometry = {}
+    if args.layout is not None:
+        geometry['lane_capacities'], geometry['oven1_lanes'] = parse_layout(args.layout)
+    batch = ReplicaBatch(args.replicas, **geometry)
+    colors, ovens = random_streams(batch, args.cars, args.seed)
+    started = time.perf_counter()
+    batch.run(colors, ovens, args.pick)
+    elapsed = time.perf_counter() - started
+
+    summary = {name: {'mean': round(float(values.mean()), 2), 'min': int(values.min()), 'max': int(values.max())}
+               for name, values in batch.kpis().items()}
+    summary['replicas'] = args.replicas
+    summary['cars'] = args.replicas * args.cars
+    summary['elapsed_seconds'] = round(elapsed, 4)
+    summary['cars_per_second'] = round(args.replicas * args.cars / elapsed) if elapsed > 0 else 0
+    if args.check:
+        summary['checked_replicas'] = check_replicas(batch, colors, ovens, range(min(args.check, args.replicas)),
+                                                     args.pick)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+import random
+import time
+from collections import deque, namedtuple
+
+from events import format_event, make_sink
+from lane_index import OVEN1, OVEN2, FrontIndex
+from lane_store import DEFAULT_LANE_CAPACITIES, DEFAULT_OVEN1_LANES, LANE_STORES
+
+# below this many lanes the plain scans beat maintaining a FrontIndex
+LANE_INDEX_MIN_LANES = 16
+
+# one conveyer pickup, as kept in ConveyerBelt.sequence_history
+Pick = namedtuple('Pick', 'time color lane color_change')
+
+
+class ConveyerBelt:
+    """Represents the conveyer belt that picks up cars from buffer lanes.
+
+    Only the last ``history_size`` picks are kept; totals live in counters.
+    With a ``policy`` (see lookahead.LookaheadPolicy), its
+    ``choose_lane(lanes, current_color)`` replaces the greedy pick rule.
+    """
+    
+    def __init__(self, history_size=100, policy=None):
+        self.history_size = history_size
+        self.policy = policy
+        self.reset()
+        
+    def reset(self):
+        """Reset conveyer belt to initial state."""
+        self.current_color = None
+        self.color_changes = 0
+        self.total_picks = 0
+        self.color_counts = {}
+        self.sequence_history = deque(maxlen=self.history_size)
+        
+    def find_most_frequent_color(self, lanes, index=None):
+        """Find the most frequent color at the front of all lanes."""
+        if index is not None:
+            return index.most_frequent_front()
+        front_colors = {}
+        for lane_idx in range(len(lanes)):
+            car = lanes.front(lane_idx)
+            if car != 0:
+                front_colors[car] = front_colors.get(car, 0) + 1
+        if not front_colors:
+            return None
+        return max(front_colors.items(), key=lambda x: x[1])[0]
+    
+    def pick_car(self, lanes, index=None):
+        """Pick a car from the buffer lanes based on optimization rules.
+
+        With a FrontIndex of the lanes, the lane lookups use it instead of scanning.
+        """
+        if self.policy is not None:
+            return self._pick_with_policy(lanes)
+
+        # If no current color, find most frequent color
+        if self.current_color is None:
+            self.current_color = self.find_most_frequent_color(lanes, index)
+            if self.current_color is None:
+                return None, -1  # No cars available
+        
+        # Try to find a lane with current color at front
+        if index is not None:
+            lane_idx = index.front_lane(self.current_color)
+            candidates = () if lane_idx is None else (lane_idx,)
+        else:
+            candidates = range(len(lanes))
+        for lane_idx in candidates:
+            if lanes.front(lane_idx) == self.current_color:
+                picked_car = self.current_color
+                self._record_pick(picked_car, lane_idx, False)
+                return picked_car, lane_idx
+        
+        # If no matching color found, pick any non-empty lane and count color change
+        if index is not None:
+            lane_idx = index.first_occupied_lane()
+            candidates = () if lane_idx is None else (lane_idx,)
+        else:
+            candidates = range(len(lanes))
+        for lane_idx in candidates:
+            picked_car = lanes.front(lane_idx)
+            if picked_car != 0:
+                color_changed = picked_car != self.current_color
+                if color_changed:
+                    self.color_changes += 1
+                self.current_color = picked_car
+                self._record_pick(picked_car, lane_idx, color_changed)
+                return picked_car, lane_idx
+        
+        return None, -1  # No cars available
+
+    def _pick_with_policy(self, lanes):
+        lane_idx = self.policy.choose_lane(lanes, self.current_color)
+        if lane_idx is None:
+            return None, -1  # No cars available
+        picked_car = lanes.front(lane_idx)
+        # as with the greedy rule, the very first pick is not a change
+        color_changed = self.current_color is not None and picked_car != self.current_color
+        if color_changed:
+            self.color_changes += 1
+        self.current_color = picked_car
+        self._record_pick(picked_car, lane_idx, color_changed)
+        return picked_car, lane_idx
+
+    def _record_pick(self, car, lane_idx, color_change):
+        """Count a picked car and append it to the history."""
+        self.total_picks += 1
+        self.color_counts[car] = self.color_counts.get(car, 0) + 1
+        self.sequence_history.append(Pick(time.monotonic(), car, lane_idx, color_change))
+
+    def get_stats(self):
+        """Return statistics about the conveyer belt operations."""
+        stats = {
+            'total_picks': self.total_picks,
+            'color_changes': self.color_changes,
+            'current_color': self.current_color,
+        }
+        if self.total_picks:
+            stats['color_distribution'] = dict(self.color_counts)
+        return stats
+
+
+class BufferSystem:
+    """Represents the buffer lanes and the enqueueing logic for ovens 1 and 2.
+
+    Lane contents live in a lane store (see ``lane_store.LANE_STORES``);
+    ``lane_store`` selects the backend by name or takes a store class.
+    The first ``oven1_lanes`` lanes feed oven 1, the remaining lanes oven 2.
+    Operations are recorded to ``event_sink`` (see ``events.make_sink``).
+    With ``lane_index`` on, lane selection goes through a FrontIndex kept up to
+    date on every enqueue and dequeue instead of scanning all lanes; the
+    default (None) turns it on for LANE_INDEX_MIN_LANES lanes or more.
+    ``conveyer_policy`` replaces the conveyer's greedy pick rule (see ConveyerBelt).
+    A ``router`` (e.g. ``bandit.BanditRouter``) replaces the routing rules of
+    add_to_bufferline when set.
+    """
+
+    def __init__(self, buffer_lanes=None, color_distribution=None, lane_store='ring',
+                 lane_capacities=DEFAULT_LANE_CAPACITIES, oven1_lanes=DEFAULT_OVEN1_LANES,
+                 event_sink='ring', lane_index=None, conveyer_policy=None):
+        self.conveyer = ConveyerBelt(policy=conveyer_policy)
+        self.default_color_distribution = {
+            'C1': 40, 'C2': 25, 'C3': 12, 'C4': 8, 'C5': 3,
+            'C6': 2, 'C7': 2, 'C8': 2, 'C9': 2, 'C10': 2,
+            'C11': 2, 'C12': 1, 0: 0,
+        }
+        self.lane_store = LANE_STORES[lane_store] if isinstance(lane_store, str) else lane_store
+        self.lane_capacities = tuple(lane_capacities)
+        self.oven1_lanes = oven1_lanes
+        # callables (op, lane_idx, color) notified of every 'add' and 'pick'
+        self.listeners = []
+        # callables () notified after reset() or adopt_lanes() replaced the lanes
+        self.reset_listeners = []
+        # object with route(color, oven) -> bool that takes over add_to_bufferline
+        self.router = None
+        self.events = make_sink(event_sink)
+        self.use_lane_index = lane_index
+        self.overflow = 0
+        self.reset(buffer_lanes, color_distribution)
+
+    def reset(self, buffer_lanes=None, color_distribution=None):
+        """Reset the buffer system to initial state."""
+        if buffer_lanes is None:
+            self.lanes = self.lane_store(self.lane_capacities)
+        else:
+            self.lanes = self.lane_store.from_lanes(buffer_lanes)
+        
+        if color_distribution is None:
+            color_distribution = self.default_color_distribution.copy()
+            
+        # running car counts and fixed capacities per oven, indexed [oven 1, oven 2]
+        ovens = (range(self.oven1_lanes), range(self.oven1_lanes, len(self.lanes)))
+        self.oven_cars = [sum(self.lanes.count(i) for i in oven) for oven in ovens]
+        self.oven_capacity = [sum(self.lanes.capacity(i) for i in oven) for oven in ovens]
+        self.cars = sum(self.oven_cars)
+        self.color_distribution = color_distribution
+        self._build_index()
+        self.penalty_counter = 0
+        self.stats = {'total_cars': 0, 'by_color': {}, 'penalties': 0}
+        self.events.clear()
+        self.conveyer.reset()
+        self.overflow = 0
+        for listener in self.reset_listeners:
+            listener()
+
+    def _build_index(self):
+        use_index = self.use_lane_index
+        if use_index is None:
+            use_index = len(self.lanes) >= LANE_INDEX_MIN_LANES
+        self.index = FrontIndex(self.lanes, self.oven1_lanes, self.color_distribution) if use_index else None
+
+    def adopt_lanes(self, lanes):
+        """Switch to an already filled lane store, recounting cars and rebuilding the index."""
+        self.lanes = lanes
+        ovens = (range(self.oven1_lanes), range(self.oven1_lanes, len(lanes)))
+        self.oven_cars = [sum(lanes.count(i) for i in oven) for oven in ovens]
+        self.oven_capacity = [sum(lanes.capacity(i) for i in oven) for oven in ovens]
+        self.lane_capacities = tuple(lanes.capacity(i) for i in range(len(lanes)))
+        self.cars = sum(self.oven_cars)
+        self._build_index()
+        for listener in self.reset_listeners:
+            listener()
+
+    def fork(self, event_sink='off'):
+        """Independent copy of the essential state for what-if runs.
+
+        Lanes, counters and the conveyer's color state are copied; the event
+        log, pick history and listeners are not, so forking stays cheap
+        however long the live system has been running.
+        """
+        # start from an empty layout: the lanes are replaced right away
+        clone = BufferSystem(color_distribution=dict(self.color_distribution), lane_store=self.lane_store,
+                             lane_capacities=(), oven1_lanes=0, event_sink=event_sink,
+                             lane_index=self.use_lane_index, conveyer_policy=self.conveyer.policy)
+        clone.oven1_lanes = self.oven1_lanes
+        clone.adopt_lanes(self.lanes.copy())
+        clone.stats = {'total_cars': self.stats['total_cars'], 'by_color': dict(self.stats['by_color']),
+                       'penalties': self.stats['penalties']}
+        clone.penalty_counter = self.penalty_counter
+        clone.overflow = self.overflow
+        conveyer = self.conveyer
+        clone.conveyer.current_color = conveyer.current_color
+        clone.conveyer.color_changes = conveyer.color_changes
+        clone.conveyer.total_picks = conveyer.total_picks
+        clone.conveyer.color_counts = dict(conveyer.color_counts)
+        return clone
+
+    @property
+    def buffer_lanes(self):
+        """Lanes as lists padded with 0 for empty slots."""
+        return self.lanes.to_lists()
+
+    def generate_cars_by_distribution(self, total_cars, rng=None):
+        """Generate a list of cars based on the percentage distribution.
+
+        Pass a ``random.Random`` as rng for a reproducible shuffle.
+        """
+        colors = []
+        for color, percentage in self.color_distribution.items():
+            if color != 0:  # Skip the 0 key
+                # Calculate number of cars for this color based on percentage
+                num_cars = round((percentage / 100) * total_cars)
+                colors.extend([color] * num_cars)
+        
+        # Shuffle the colors to randomize their order
+        (rng or random).shuffle(colors)
+        return colors
+
+    def update_stats(self, color):
+        """Update statistics for the added car."""
+        self.stats['total_cars'] += 1
+        self.stats['by_color'][color] = self.stats['by_color'].get(color, 0) + 1
+        self.stats['penalties'] = self.penalty_counter
+
+    def log_event(self, message):
+        """Record a free-form message in the event sink."""
+        self.events.record('log', detail=message)
+
+    @property
+    def operation_log(self):
+        """Recent events as readable messages (empty when the sink keeps none in memory)."""
+        return [format_event(event) for event in self.events.recent()]
+
+    def _enqueue(self, lane_idx, color):
+        """Put a car into a lane and count it; False if the lane is full."""
+        if not self.lanes.push(lane_idx, color):
+            return False
+        if self.index is not None:
+            self.index.update(lane_idx)
+        self.cars += 1
+        self.oven_cars[lane_idx >= self.oven1_lanes] += 1
+        self.update_stats(color)
+        for listener in self.listeners:
+            listener('add', lane_idx, color)
+        return True
+
+    def _oven_lanes(self, oven):
+        """Lane index range feeding oven (OVEN1 or OVEN2)."""
+        return range(self.oven1_lanes) if oven == OVEN1 else range(self.oven1_lanes, len(self.lanes))
+
+    def _find_color_lane(self, color, oven):
+        """First lane of oven with color at its front and a free slot."""
+        if self.index is not None:
+            return self.index.open_lane(color, oven)
+        for i in self._oven_lanes(oven):
+            if self.lanes.front(i) == color and not self.lanes.is_full(i):
+                return i
+        return None
+
+    def _find_min_priority_lane(self, oven):
+        """Lane of oven whose front color has the lowest distribution share."""
+        if self.index is not None:
+            return self.index.min_priority_lane(oven)
+        lanes = self._oven_lanes(oven)
+        min_priority = float('inf')
+        min_lane = lanes.start
+        for i in lanes:
+            priority = self.color_distribution.get(self.lanes.front(i), float('inf'))
+            if priority < min_priority:
+                min_priority = priority
+                min_lane = i
+        return min_lane
+
+    def add_to_lane(self, lane_idx, color, reason='forced'):
+        """Enqueue a car into a given lane, bypassing the routing rules; False if it is full."""
+        if self._enqueue(lane_idx, color):
+            self.events.record('add', lane_idx, color, reason)
+            return True
+        return False
+
+    def add_to_bufferline(self, color, oven):
+        """Enqueue a car with color into the buffer lanes for oven (1 or 2)."""
+        if self.router is not None:
+            return self.router.route(color, oven)
+        if oven == 1:
+            # 1. Base case: No cars present
+            if self.cars == 0:
+                self._enqueue(0, color)
+                self.events.record('add', 0, color, 'first car')
+                return True
+
+            # 2. Try to find an oven 1 lane with matching front color
+            lane = self._find_color_lane(color, OVEN1)
+            if lane is not None:
+                self._enqueue(lane, color)
+                self.events.record('add', lane, color, 'color match')
+                return True
+
+            # 3. No matching color: enqueue to the lane with minimum priority color
+            min_lane = self._find_min_priority_lane(OVEN1)
+            if self._enqueue(min_lane, color):
+                self.events.record('add', min_lane, color, 'min priority')
+                return True
+
+            # 4. The min priority lane is full, call again for the oven 2 lanes using oven=2
+            self.penalty_counter += 1
+            self.overflow += 1
+            self.events.record('overflow', -1, color)
+            return self.add_to_bufferline(color, 2)
+
+        if oven == 2:
+            # Try to find an oven 2 lane with matching front color
+            lane = self._find_color_lane(color, OVEN2)
+            if lane is not None:
+                self._enqueue(lane, color)
+                self.events.record('add', lane, color, 'oven 2 color match')
+                return True
+
+            # No matching color: enqueue to the lane with minimum priority color
+            min_lane = self._find_min_priority_lane(OVEN2)
+            if self._enqueue(min_lane, color):
+                self.events.record('add', min_lane, color, 'oven 2 min priority')
+                return True
+            
+            # The min priority lane is full, log error
+            self.events.record('reject', -1, color)
+            return False
+
+    def remove_car_from_lane(self, lane_idx):
+        """Remove car from front of lane and shift remaining cars forward."""
+        if self.lanes.capacity(lane_idx) == 0:
+            return None
+        
+        car = self.lanes.pop(lane_idx)
+        if self.index is not None:
+            self.index.update(lane_idx)
+        self.cars -= 1
+        if car != 0:
+            self.oven_cars[lane_idx >= self.oven1_lanes] -= 1
+        for listener in self.listeners:
+            listener('pick', lane_idx, car)
+        return car
+
+    def process_conveyer_pickup(self):
+        """Process one pickup by the conveyer belt."""
+        car, lane_idx = self.conveyer.pick_car(self.lanes, self.index)
+        if car is not None and lane_idx >= 0:
+            self.remove_car_from_lane(lane_idx)
+            self.events.record('pick', lane_idx, car)
+            return True
+        return False
+
+    def get_lane_status(self, lane_idx):
+        """Get status of a lane based on utilization."""
+        utilization = self.lanes.count(lane_idx) / self.lanes.capacity(lane_idx)
+        
+        if utilization >= 0.9:
+            return 'critical'
+        elif utilization >= 0.7:
+            return 'warning'
+        else:
+            return 'active'
+
+    def _lane_state(self, lane_idx):
+        """Lane summary for the frontend."""
+        return {
+            'id': f'L{lane_idx+1}',
+            'capacity': self.lanes.capacity(lane_idx),
+            'current': self.lanes.count(lane_idx),
+            'vehicles': self.lanes.vehicles(lane_idx),
+            'status': self.get_lane_status(lane_idx)
+        }
+
+    def get_system_state(self):
+        """Get current system state for frontend display."""
+        oven1 = range(self.oven1_lanes)
+        oven2 = range(self.oven1_lanes, len(self.lanes))
+        oven1_cars, oven2_cars = self.oven_cars
+        oven1_capacity, oven2_capacity = self.oven_capacity
+        
+        conveyer_stats = self.conveyer.get_stats()
+        
+        return {
+            'buffer_lanes': {
+                'oven1': [self._lane_state(i) for i in oven1],
+                'oven2': [self._lane_state(i) for i in oven2]
+            },
+            'conveyer': {
+                'current_color': conveyer_stats['current_color'],
+                'total_picks': conveyer_stats['total_picks'],
+                'color_changes': conveyer_stats['color_changes'],
+                'recent_sequence': [pick.color for pick in list(self.conveyer.sequence_history)[-20:]],
+            },
+            'kpis': {
+                'throughput': conveyer_stats['total_picks'],
+                'targetJPH': 900,
+                'colorChangeovers': conveyer_stats['color_changes'],
+                'bufferUtilization': round((oven1_cars + oven2_cars) / (oven1_capacity + oven2_capacity) * 100),
+                'ovenEfficiency': 94.2,
+                'totalVehicles': self.stats['total_cars'],
+                'overflowPenalties': self.overflow,
+            },
+            'stats': {
+                'oven1_utilization': round(oven1_cars/oven1_capacity * 100, 1),
+                'oven2_utilization': round(oven2_cars/oven2_capacity * 100, 1),
+                'total_cars': self.stats['total_cars'],
+                'penalties': self.stats['penalties'],
+                'color_distribution': self.stats['by_color']
+            }
+        }
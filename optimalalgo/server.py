@@ -1,11 +1,14 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 import asyncio
 import json
-import datetime
-import random
-from typing import Dict, List, Optional
+from typing import Dict
+
+from inference import InferenceService
+from metrics import metrics, profiler
+from sessions import PROTOCOLS, SessionRegistry
 
 app = FastAPI()
 
@@ -18,407 +21,182 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class ConveyerBelt:
-    """Represents the conveyer belt that picks up cars from buffer lanes."""
-    
-    def __init__(self):
-        self.reset()
-        
-    def reset(self):
-        """Reset conveyer belt to initial state."""
-        self.current_color = None
-        self.color_changes = 0
-        self.picked_cars = []
-        self.sequence_history = []
-        
-    def find_most_frequent_color(self, buffer_lanes):
-        """Find the most frequent color at the front of all lanes."""
-        front_colors = {}
-        for lane in buffer_lanes:
-            for car in lane:
-                if car != 0:
-                    front_colors[car] = front_colors.get(car, 0) + 1
-                    break
-        if not front_colors:
-            return None
-        return max(front_colors.items(), key=lambda x: x[1])[0]
-    
-    def pick_car(self, buffer_lanes):
-        """Pick a car from the buffer lanes based on optimization rules."""
-        # If no current color, find most frequent color
-        if self.current_color is None:
-            self.current_color = self.find_most_frequent_color(buffer_lanes)
-            if self.current_color is None:
-                return None, -1  # No cars available
-        
-        # Try to find a lane with current color at front
-        for lane_idx, lane in enumerate(buffer_lanes):
-            if lane and lane[0] == self.current_color:
-                picked_car = lane[0]
-                self.picked_cars.append(picked_car)
-                self.sequence_history.append({
-                    'color': picked_car,
-                    'lane': lane_idx,
-                    'timestamp': datetime.datetime.now().isoformat(),
-                    'color_change': False
-                })
-                return picked_car, lane_idx
-        
-        # If no matching color found, pick any non-empty lane and count color change
-        for lane_idx, lane in enumerate(buffer_lanes):
-            if lane and lane[0] != 0:
-                picked_car = lane[0]
-                color_changed = picked_car != self.current_color
-                if color_changed:
-                    self.color_changes += 1
-                self.current_color = picked_car
-                self.picked_cars.append(picked_car)
-                self.sequence_history.append({
-                    'color': picked_car,
-                    'lane': lane_idx,
-                    'timestamp': datetime.datetime.now().isoformat(),
-                    'color_change': color_changed
-                })
-                return picked_car, lane_idx
-        
-        return None, -1  # No cars available
-
-    def get_stats(self):
-        """Return statistics about the conveyer belt operations."""
-        stats = {
-            'total_picks': len(self.picked_cars),
-            'color_changes': self.color_changes,
-            'current_color': self.current_color,
-        }
-        if self.picked_cars:
-            color_counts = {}
-            for car in self.picked_cars:
-                color_counts[car] = color_counts.get(car, 0) + 1
-            stats['color_distribution'] = color_counts
-        return stats
-
-
-class BufferSystem:
-    """Represents the buffer lanes and the enqueueing logic for ovens 1 and 2."""
-
-    def __init__(self, buffer_lanes=None, color_distribution=None):
-        self.conveyer = ConveyerBelt()
-        self.default_color_distribution = {
-            'C1': 40, 'C2': 25, 'C3': 12, 'C4': 8, 'C5': 3,
-            'C6': 2, 'C7': 2, 'C8': 2, 'C9': 2, 'C10': 2,
-            'C11': 2, 'C12': 1, 0: 0,
-        }
-        self.overflow = 0
-        self.reset(buffer_lanes, color_distribution)
-
-    def reset(self, buffer_lanes=None, color_distribution=None):
-        """Reset the buffer system to initial state."""
-        # default lanes: lanes 0-3 have 14 slots, lanes 4-8 have 16 slots
-        if buffer_lanes is None:
-            buffer_lanes = [
-                [0] * 14, [0] * 14, [0] * 14, [0] * 14,
-                [0] * 16, [0] * 16, [0] * 16, [0] * 16, [0] * 16,
-            ]
-        
-        if color_distribution is None:
-            color_distribution = self.default_color_distribution.copy()
-            
-        self.buffer_lanes = buffer_lanes
-        self.cars = 0
-        self.color_distribution = color_distribution
-        self.penalty_counter = 0
-        self.stats = {'total_cars': 0, 'by_color': {}, 'penalties': 0}
-        self.operation_log = []
-        self.conveyer.reset()
-        self.overflow = 0
-
-    def generate_cars_by_distribution(self, total_cars):
-        """Generate a list of cars based on the percentage distribution."""
-        colors = []
-        for color, percentage in self.color_distribution.items():
-            if color != 0:  # Skip the 0 key
-                # Calculate number of cars for this color based on percentage
-                num_cars = round((percentage / 100) * total_cars)
-                colors.extend([color] * num_cars)
-        
-        # Shuffle the colors to randomize their order
-        random.shuffle(colors)
-        return colors
-
-    def update_stats(self, color):
-        """Update statistics for the added car."""
-        self.stats['total_cars'] += 1
-        self.stats['by_color'][color] = self.stats['by_color'].get(color, 0) + 1
-        self.stats['penalties'] = self.penalty_counter
-
-    def log_event(self, message):
-        """Log events to operation log."""
-        self.operation_log.append(f"{datetime.datetime.now()}: {message}")
-
-    def add_to_bufferline(self, color, oven):
-        """Enqueue a car with color into the buffer lanes for oven (1 or 2)."""
-        if oven == 1:
-            # 1. Base case: No cars present
-            if self.cars == 0:
-                self.buffer_lanes[0][0] = color
-                self.cars += 1
-                self.update_stats(color)
-                self.operation_log.append(f"Added {color} to lane 0 (first car)")
-                return True
-
-            # 2. Find lane colors (front of each lane 0-3, or 0 if empty)
-            lane_color = [next((c for c in lane if c != 0), 0) for lane in self.buffer_lanes[:4]]
-
-            # 3. Try to find a lane with matching color
-            for i in range(4):
-                if lane_color[i] == color:
-                    for j in range(len(self.buffer_lanes[i])):
-                        if self.buffer_lanes[i][j] == 0:
-                            self.buffer_lanes[i][j] = color
-                            self.cars += 1
-                            self.update_stats(color)
-                            self.operation_log.append(f"Added {color} to lane {i} (color match)")
-                            return True
-
-            # 4. No matching color: find lane with minimum priority color
-            min_priority = float('inf')
-            min_lane = 0
-            for i in range(4):
-                curr_color = lane_color[i]
-                priority = self.color_distribution.get(curr_color, float('inf'))
-                if priority < min_priority:
-                    min_priority = priority
-                    min_lane = i
-
-            # Try to enqueue to the first empty slot in the min_priority lane
-            for j in range(len(self.buffer_lanes[min_lane])):
-                if self.buffer_lanes[min_lane][j] == 0:
-                    self.buffer_lanes[min_lane][j] = color
-                    self.cars += 1
-                    self.update_stats(color)
-                    self.operation_log.append(f"Added {color} to lane {min_lane} (min priority)")
-                    return True
-
-            # 5. All lanes 0-3 are full, call again for lanes 4-8 using oven=2
-            self.penalty_counter += 1
-            self.overflow += 1
-            self.log_event(f"Penalty: Car with color {color} sent to lanes 4-8 using oven1")
-            self.operation_log.append(f"Penalty: {color} overflow to oven 2")
-            return self.add_to_bufferline(color, 2)
-
-        if oven == 2:
-            # Find lane colors (front of each lane 4-8, or 0 if empty)
-            lane_color = [next((c for c in lane if c != 0), 0) for lane in self.buffer_lanes[4:9]]
-
-            # Try to find a lane with matching color
-            for i in range(5):
-                if lane_color[i] == color:
-                    for j in range(len(self.buffer_lanes[4 + i])):
-                        if self.buffer_lanes[4 + i][j] == 0:
-                            self.buffer_lanes[4 + i][j] = color
-                            self.cars += 1
-                            self.update_stats(color)
-                            self.operation_log.append(f"Added {color} to lane {4+i} (oven 2 color match)")
-                            return True
-
-            # No matching color: find lane with minimum priority color
-            min_priority = float('inf')
-            min_lane = 4
-            for i in range(5):
-                curr_color = lane_color[i]
-                priority = self.color_distribution.get(curr_color, float('inf'))
-                if priority < min_priority:
-                    min_priority = priority
-                    min_lane = 4 + i
-
-            # Try to enqueue to the first empty slot in the min_priority lane
-            for j in range(len(self.buffer_lanes[min_lane])):
-                if self.buffer_lanes[min_lane][j] == 0:
-                    self.buffer_lanes[min_lane][j] = color
-                    self.cars += 1
-                    self.update_stats(color)
-                    self.operation_log.append(f"Added {color} to lane {min_lane} (oven 2 min priority)")
-                    return True
-            
-            # All lanes 4-8 are full, log error
-            self.log_event(f"Error: All lanes 4-8 are full for car with color {color}")
-            self.operation_log.append(f"Error: All lanes full for {color}")
-            return False
-
-    def remove_car_from_lane(self, lane_idx):
-        """Remove car from front of lane and shift remaining cars forward."""
-        if not self.buffer_lanes[lane_idx]:
-            return None
-        
-        # Get the car from the front
-        car = self.buffer_lanes[lane_idx][0]
-        
-        # Shift all cars forward
-        self.buffer_lanes[lane_idx] = self.buffer_lanes[lane_idx][1:] + [0]
-        self.cars -= 1
-        return car
-
-    def process_conveyer_pickup(self):
-        """Process one pickup by the conveyer belt."""
-        car, lane_idx = self.conveyer.pick_car(self.buffer_lanes)
-        if car is not None and lane_idx >= 0:
-            self.remove_car_from_lane(lane_idx)
-            self.operation_log.append(f"Conveyer picked {car} from lane {lane_idx}")
-            return True
-        return False
-
-    def get_lane_status(self, lane):
-        """Get status of a lane based on utilization."""
-        filled = sum(1 for car in lane if car != 0)
-        capacity = len(lane)
-        utilization = filled / capacity
-        
-        if utilization >= 0.9:
-            return 'critical'
-        elif utilization >= 0.7:
-            return 'warning'
-        else:
-            return 'active'
-
-    def get_system_state(self):
-        """Get current system state for frontend display."""
-        oven1_cars = sum(1 for lane in self.buffer_lanes[:4] for car in lane if car != 0)
-        oven2_cars = sum(1 for lane in self.buffer_lanes[4:] for car in lane if car != 0)
-        oven1_capacity = sum(len(lane) for lane in self.buffer_lanes[:4])
-        oven2_capacity = sum(len(lane) for lane in self.buffer_lanes[4:])
-        
-        conveyer_stats = self.conveyer.get_stats()
-        
-        return {
-            'buffer_lanes': {
-                'oven1': [
-                    {
-                        'id': f'L{i+1}',
-                        'capacity': len(lane),
-                        'current': sum(1 for car in lane if car != 0),
-                        'vehicles': [car for car in lane if car != 0],
-                        'status': self.get_lane_status(lane)
-                    } for i, lane in enumerate(self.buffer_lanes[:4])
-                ],
-                'oven2': [
-                    {
-                        'id': f'L{i+5}',
-                        'capacity': len(lane),
-                        'current': sum(1 for car in lane if car != 0),
-                        'vehicles': [car for car in lane if car != 0],
-                        'status': self.get_lane_status(lane)
-                    } for i, lane in enumerate(self.buffer_lanes[4:9])
-                ]
-            },
-            'conveyer': {
-                'current_color': conveyer_stats['current_color'],
-                'total_picks': conveyer_stats['total_picks'],
-                'color_changes': conveyer_stats['color_changes'],
-                'recent_sequence': [item['color'] for item in self.conveyer.sequence_history[-20:]],
-            },
-            'kpis': {
-                'throughput': conveyer_stats['total_picks'],
-                'targetJPH': 900,
-                'colorChangeovers': conveyer_stats['color_changes'],
-                'bufferUtilization': round((oven1_cars + oven2_cars) / (oven1_capacity + oven2_capacity) * 100),
-                'ovenEfficiency': 94.2,
-                'totalVehicles': self.stats['total_cars'],
-                'overflowPenalties': self.overflow,
-            },
-            'stats': {
-                'oven1_utilization': round(oven1_cars/oven1_capacity * 100, 1),
-                'oven2_utilization': round(oven2_cars/oven2_capacity * 100, 1),
-                'total_cars': self.stats['total_cars'],
-                'penalties': self.stats['penalties'],
-                'color_distribution': self.stats['by_color']
-            }
-        }
-
-
-class SimulationManager:
-    """Manages simulation state and execution."""
-    
-    def __init__(self):
-        self.buffer_system = BufferSystem()
-        self.is_running = False
-        self.simulation_speed = 1.0  # seconds between operations
-        
-    async def run_simulation(self, websocket):
-        """Run the simulation loop."""
-        self.is_running = True
-        self.buffer_system.reset()
-        
-        # Generate initial batch of cars
-        colors = self.buffer_system.generate_cars_by_distribution(100)
-        
-        color_index = 0
-        operation_count = 0
-        
-        while self.is_running and color_index < len(colors):
-            try:
-                # Alternate between adding cars and processing conveyer
-                if operation_count % 3 != 0:  # Add cars more frequently
-                    if color_index < len(colors):
-                        color = colors[color_index]
-                        oven = 1 if color_index % 2 == 0 else 2
-                        self.buffer_system.add_to_bufferline(color, oven)
-                        color_index += 1
-                else:  # Process conveyer pickup
-                    self.buffer_system.process_conveyer_pickup()
-                
-                # Send updated state to frontend
-                state = self.buffer_system.get_system_state()
-                await websocket.send_json({
-                    'type': 'system_update',
-                    'data': state
-                })
-                
-                operation_count += 1
-                await asyncio.sleep(self.simulation_speed)
-                
-            except Exception as e:
-                print(f"Simulation error: {e}")
-                break
-        
-        self.is_running = False
-    
-    def stop_simulation(self):
-        """Stop the running simulation."""
-        self.is_running = False
+sessions = SessionRegistry()
+# the session plain /ws connections and /api/system-state use
+simulation_manager = sessions.get('default')
+# ML predictions, micro-batched across concurrent requests
+inference = InferenceService()
 
 
-simulation_manager = SimulationManager()
+class Order(BaseModel):
+    buffer: int = Field(ge=1, le=9)
+    priority: int = Field(ge=0, le=1)
+    hour: int = Field(ge=0, le=23)
+    color: str
+    oven: str
 
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time communication."""
+class RecommendationQuery(BaseModel):
+    priority: int = Field(ge=0, le=1)
+    hour: int = Field(ge=0, le=23)
+    color: str
+    oven: str
+    occupancies: Dict[int, int] = Field(min_length=1, description="buffer -> cars currently queued")
+
+
+async def handle_session(websocket: WebSocket, session):
+    """Serve one viewer of a simulation session until it disconnects."""
     await websocket.accept()
+    protocol = websocket.query_params.get('protocol', 'snapshot')
+    if protocol not in PROTOCOLS:
+        await websocket.close(code=1008)
+        return
+    subscriber = session.subscribe(websocket, protocol)
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
             
             if message['type'] == 'start_simulation':
-                asyncio.create_task(simulation_manager.run_simulation(websocket))
+                session.start_simulation()
                 
             elif message['type'] == 'stop_simulation':
-                simulation_manager.stop_simulation()
+                session.stop_simulation()
                 
             elif message['type'] == 'reset_system':
-                simulation_manager.buffer_system.reset()
-                state = simulation_manager.buffer_system.get_system_state()
-                await websocket.send_json({
-                    'type': 'system_update',
-                    'data': state
-                })
+                session.reset()
+                
+            elif message['type'] == 'request_snapshot':
+                # delta clients ask for a keyframe after a gap in seq
+                session.request_keyframe()
                 
             elif message['type'] == 'update_speed':
-                simulation_manager.simulation_speed = message['speed']
+                # speed: seconds per operation; tick_rate: clock Hz; publish_fps: frames per second
+                try:
+                    session.update_speed(message.get('speed'), message.get('tick_rate'), message.get('publish_fps'))
+                except (TypeError, ValueError) as e:
+                    subscriber.offer(json.dumps({'type': 'error', 'detail': str(e)}))
+                
+            elif message['type'] == 'set_timing':
+                # switch the process-wide timing hooks behind /metrics
+                metrics.enabled = bool(message.get('enabled', True))
                 
+            elif message['type'] == 'start_profile':
+                try:
+                    profiler.start(message.get('profiler', 'cprofile'))
+                except RuntimeError as e:
+                    subscriber.offer(json.dumps({'type': 'profile_error', 'detail': str(e)}))
+                    
+            elif message['type'] == 'stop_profile':
+                try:
+                    kind = profiler.kind
+                    report = profiler.stop(message.get('limit', 40))
+                    subscriber.offer(json.dumps({'type': 'profile_report', 'profiler': kind, 'report': report}))
+                except RuntimeError as e:
+                    subscriber.offer(json.dumps({'type': 'profile_error', 'detail': str(e)}))
+                
+    except WebSocketDisconnect:
+        print(f"Client disconnected from session {session.session_id}")
+    finally:
+        session.unsubscribe(subscriber)
+
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """WebSocket endpoint for real-time communication with the default session.
+
+    Connect with ``?protocol=delta`` to receive keyframes plus system_delta
+    patches (see state_stream) instead of a full snapshot per operation.
+    """
+    await handle_session(websocket, simulation_manager)
+
+
+# registered before /ws/{session_id}, which would otherwise match it
+@app.websocket("/ws/inference")
+async def inference_websocket_endpoint(websocket: WebSocket):
+    """Streaming predictions: send ``{'type': 'predict' | 'recommend', 'id': ..., 'data': {...}}``.
+
+    Requests are answered as their batch completes (not necessarily in order)
+    with ``{'type': 'prediction' | 'recommendation', 'id': ..., 'data': {...}}``,
+    or ``{'type': 'error', 'id': ..., 'detail': ...}``.
+    """
+    await websocket.accept()
+    models = {'predict': (Order, inference.predict, 'prediction'),
+              'recommend': (RecommendationQuery, inference.recommend, 'recommendation')}
+    pending = set()
+
+    async def answer(message):
+        request_id = message.get('id')
+        if message.get('type') not in models:
+            await websocket.send_text(json.dumps(
+                {'type': 'error', 'id': request_id, 'detail': f"Unknown message type {message.get('type')!r}"}))
+            return
+        model, call, reply = models[message['type']]
+        try:
+            result = await call(model(**message['data']).model_dump())
+            response = {'type': reply, 'id': request_id, 'data': result}
+        except Exception as e:
+            response = {'type': 'error', 'id': request_id, 'detail': str(e)}
+        await websocket.send_text(json.dumps(response))
+
+    try:
+        while True:
+            message = json.loads(await websocket.receive_text())
+            task = asyncio.create_task(answer(message))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
     except WebSocketDisconnect:
-        simulation_manager.stop_simulation()
-        print("Client disconnected")
+        print("Inference client disconnected")
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+@app.websocket("/ws/{session_id}")
+async def session_websocket_endpoint(websocket: WebSocket, session_id: str):
+    """WebSocket endpoint for a named simulation session, created on first connect.
+
+    Every viewer of the same session id watches (and controls) one shared
+    simulation, which is discarded when the last viewer disconnects.
+    """
+    session = sessions.acquire(session_id)
+    try:
+        await handle_session(websocket, session)
+    finally:
+        sessions.release(session)
+
+
+async def run_inference(call, payload):
+    """Await one batched prediction, mapping overload and model errors to HTTP errors."""
+    try:
+        await inference.ready()
+    except (OSError, ImportError, ValueError) as e:
+        # missing model file, missing torch, or a file that is not a loadable bundle
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {e}") from None
+    try:
+        return await call(payload)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Inference queue is full") from None
+    except (OSError, ImportError) as e:
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {e}") from None
+
+
+@app.post("/api/predict")
+async def predict(order: Order):
+    """Processing time and downtime risk for one order."""
+    return await run_inference(inference.predict, order.model_dump())
+
+
+@app.post("/api/recommend")
+async def recommend(query: RecommendationQuery):
+    """Best buffer for an order given the current buffer occupancies."""
+    return await run_inference(inference.recommend, query.model_dump())
+
+
+@app.get("/api/inference/stats")
+async def inference_stats():
+    """Queue depth and batch-size statistics of the inference batchers."""
+    return inference.stats()
 
 
 @app.get("/")
@@ -431,19 +209,79 @@ async def get():
         </head>
         <body>
             <h1>Conveyor Sequencing System Backend</h1>
-            <p>WebSocket endpoint is available at /ws</p>
+            <p>WebSocket endpoint is available at /ws (or /ws/{session_id} for an independent simulation)</p>
+            <p>Model predictions: POST /api/predict, POST /api/recommend or WebSocket /ws/inference</p>
+            <p>Prometheus metrics at /metrics
+               (send {"type": "set_timing", "enabled": true} over /ws for latency histograms)</p>
             <p>Connect your frontend to visualize the conveyor sequencing system.</p>
         </body>
     </html>
     """)
 
 
+def session_metric_families():
+    """Per-session counters and gauges, read from the sessions at scrape time."""
+    counters = {
+        # lifetime totals, so they keep growing across reset_system and new runs
+        'sequencing_cars_total': ("Cars enqueued into the buffer lanes.", lambda s: s.totals()['cars']),
+        'sequencing_picks_total': ("Cars picked by the conveyer.", lambda s: s.totals()['picks']),
+        'sequencing_overflows_total': ("Oven 1 cars overflowed to oven 2.", lambda s: s.totals()['overflows']),
+        'sequencing_color_changes_total': ("Conveyer color changeovers.", lambda s: s.totals()['color_changes']),
+        'sequencing_dropped_frames_total': ("State messages dropped for slow viewers.",
+                                            lambda s: s.hub.stats()['dropped_total']),
+    }
+    gauges = {
+        'sequencing_connected_clients': ("Websocket viewers subscribed to the session.",
+                                         lambda s: len(s.hub.subscribers)),
+        'sequencing_running': ("1 while the session's simulation is running.", lambda s: int(s.is_running)),
+        'sequencing_buffered_cars': ("Cars currently in the buffer lanes.", lambda s: s.buffer_system.cars),
+        'sequencing_cars_per_second': ("Cars enqueued per second over the session's current run.",
+                                       lambda s: round(s.cars_per_second(), 3)),
+    }
+    families = []
+    for kinds, kind in ((counters, 'counter'), (gauges, 'gauge')):
+        for name, (help_text, read) in kinds.items():
+            samples = [({'session': s.session_id}, read(s)) for s in sessions.sessions.values()]
+            families.append((name, kind, help_text, samples))
+    return families
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of timing histograms and per-session counters."""
+    return PlainTextResponse(metrics.render(session_metric_families()),
+                             media_type='text/plain; version=0.0.4')
+
+
 @app.get("/api/system-state")
 async def get_system_state():
     """Get current system state via REST API."""
     return simulation_manager.buffer_system.get_system_state()
 
 
+@app.get("/api/sessions")
+async def list_sessions():
+    """List simulation sessions with their viewer and queue stats."""
+    return [session.info() for session in sessions.sessions.values()]
+
+
+@app.get("/api/sessions/{session_id}/state")
+async def get_session_state(session_id: str):
+    """Get the current system state of one session."""
+    session = sessions.find(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session {session_id}")
+    return session.buffer_system.get_system_state()
+
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Stop a session and disconnect its viewers."""
+    if session_id == 'default' or not await sessions.remove(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown session {session_id}")
+    return {'deleted': session_id}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,378 @@
+"""Session-scoped simulations and websocket fan-out.
+
+Each session id owns an independent BufferSystem, its own simulation task
+and a BroadcastHub. Any number of websocket viewers can subscribe to a
+session; every viewer gets a bounded queue drained by its own sender task,
+so a slow browser only drops its own stale frames (oldest first) and never
+stalls the simulation loop or the other viewers.
+
+The simulation clock and publishing are decoupled: the clock ticks
+``tick_rate`` times a second and runs every operation due by then (one per
+``simulation_speed`` seconds), while a separate publisher samples the state
+``publish_fps`` times a second, so operations between two frames are
+coalesced into one update.
+"""
+import asyncio
+import json
+import math
+import time
+
+from metrics import metrics
+from sequencing import BufferSystem
+from simulate import run_operations
+from state_stream import DeltaEncoder
+
+PROTOCOLS = ('snapshot', 'delta')
+# timing hook names for the run_operations steps
+STEP_OPS = {'add': 'add_to_bufferline', 'pick': 'process_conveyer_pickup'}
+# per-session counters exported to /metrics; totals carry over buffer resets
+COUNTERS = {
+    'cars': lambda bs: bs.stats['total_cars'],
+    'picks': lambda bs: bs.conveyer.total_picks,
+    'overflows': lambda bs: bs.overflow,
+    'color_changes': lambda bs: bs.conveyer.color_changes,
+}
+DEFAULT_TICK_RATE = 100.0  # simulation clock ticks per second
+DEFAULT_PUBLISH_FPS = 20.0  # state frames per second; 0 publishes after every tick
+# operations a single tick may run while catching up after a stall
+MAX_OPS_PER_TICK = 10000
+
+
+class Subscriber:
+    """One websocket viewer with a bounded, drop-oldest outgoing queue."""
+
+    def __init__(self, websocket, protocol='snapshot', queue_size=16):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._task = asyncio.create_task(self._pump())
+
+    def offer(self, message):
+        """Queue a message, discarding the oldest one if the viewer is behind."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def _pump(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                started = metrics.clock()
+                await self.websocket.send_text(message)
+                metrics.observe_since('websocket_send', started)
+        except Exception as e:
+            # the websocket endpoint notices the disconnect and unsubscribes us
+            print(f"Subscriber send stopped: {e}")
+
+    def close(self):
+        self._task.cancel()
+
+
+class BroadcastHub:
+    """Fans session state messages out to every subscribed viewer."""
+
+    def __init__(self, queue_size=16):
+        self.queue_size = queue_size
+        self.subscribers = []
+        self.departed_dropped = 0  # frames dropped for viewers that have since left
+
+    def subscribe(self, websocket, protocol='snapshot'):
+        subscriber = Subscriber(websocket, protocol, self.queue_size)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+            self.departed_dropped += subscriber.dropped
+        subscriber.close()
+
+    def has_protocol(self, protocol):
+        return any(s.protocol == protocol for s in self.subscribers)
+
+    def publish(self, messages):
+        """Offer messages[protocol] to every subscriber speaking that protocol.
+
+        Each message is JSON-encoded once, however many viewers receive it.
+        """
+        started = metrics.clock()
+        encoded = {
+            protocol: json.dumps(message, separators=(',', ':'), ensure_ascii=False)
+            for protocol, message in messages.items()
+        }
+        metrics.observe_since('json_serialize', started)
+        for subscriber in self.subscribers:
+            message = encoded.get(subscriber.protocol)
+            if message is not None:
+                subscriber.offer(message)
+
+    def stats(self):
+        return {
+            'subscribers': len(self.subscribers),
+            'queued': sum(s.queue.qsize() for s in self.subscribers),
+            'dropped': sum(s.dropped for s in self.subscribers),
+            'dropped_total': self.departed_dropped + sum(s.dropped for s in self.subscribers),
+        }
+
+
+class SimulationManager:
+    """Manages one session's simulation state and execution."""
+
+    def __init__(self, session_id='default', queue_size=16):
+        self.session_id = session_id
+        self.buffer_system = BufferSystem()
+        self.is_running = False
+        self.simulation_speed = 1.0  # seconds between operations; 0 runs one per tick, ticks back to back
+        self.tick_rate = DEFAULT_TICK_RATE
+        self.publish_fps = DEFAULT_PUBLISH_FPS
+        self.hub = BroadcastHub(queue_size)
+        self.encoder = None  # shared DeltaEncoder while any delta viewer is subscribed
+        self._task = None
+        self._run_started = None
+        self._run_ended = None
+        self._operations = 0  # operations run so far; the publisher skips frames with nothing new
+        self._published = None
+        self._retired = dict.fromkeys(COUNTERS, 0)  # counts from before the last buffer reset
+
+    def subscribe(self, websocket, protocol='snapshot'):
+        """Add a viewer; delta viewers trigger a keyframe so they can sync up."""
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol {protocol!r}; expected one of {PROTOCOLS}")
+        if protocol == 'delta':
+            if self.encoder is None:
+                self.encoder = DeltaEncoder(self.buffer_system)
+            self.encoder.request_keyframe()
+        return self.hub.subscribe(websocket, protocol)
+
+    def unsubscribe(self, subscriber):
+        """Remove a viewer; the simulation stops when the last one leaves."""
+        self.hub.unsubscribe(subscriber)
+        if self.encoder is not None and not self.hub.has_protocol('delta'):
+            self.encoder.close()
+            self.encoder = None
+        if not self.hub.subscribers:
+            self.stop_simulation()
+
+    def state_messages(self):
+        """Current state for each protocol that has viewers."""
+        messages = {}
+        if self.hub.has_protocol('snapshot'):
+            started = metrics.clock()
+            messages['snapshot'] = {
+                'type': 'system_update',
+                'data': self.buffer_system.get_system_state()
+            }
+            metrics.observe_since('get_system_state', started)
+        if self.encoder is not None:
+            started = metrics.clock()
+            messages['delta'] = self.encoder.next_message()
+            metrics.observe_since('delta_encode', started)
+        return messages
+
+    def publish(self):
+        self._published = self._operations
+        self.hub.publish(self.state_messages())
+
+    def update_speed(self, speed=None, tick_rate=None, publish_fps=None):
+        """Change the simulation speed (seconds per operation), clock rate and frame rate; None keeps one.
+
+        Every value is checked before any is applied, so a bad one changes nothing.
+        """
+        values = {}
+        for name, value in (('speed', speed), ('tick_rate', tick_rate), ('publish_fps', publish_fps)):
+            if value is not None:
+                value = float(value)
+                if not math.isfinite(value):
+                    raise ValueError(f"{name} must be a finite number")
+                values[name] = value
+        if values.get('tick_rate', 1.0) <= 0:
+            raise ValueError("tick_rate must be positive")
+        if 'speed' in values:
+            self.simulation_speed = max(0.0, values['speed'])
+        if 'tick_rate' in values:
+            self.tick_rate = values['tick_rate']
+        if 'publish_fps' in values:
+            self.publish_fps = max(0.0, values['publish_fps'])
+
+    async def run_publisher(self):
+        """Publish the latest state publish_fps times a second while anything changed."""
+        while True:
+            if self.publish_fps > 0:
+                if self._published != self._operations:
+                    self.publish()
+                await asyncio.sleep(1 / self.publish_fps)
+            else:
+                # the simulation loop publishes every tick itself
+                await asyncio.sleep(1 / self.tick_rate)
+
+    def request_keyframe(self):
+        """Send delta viewers a full snapshot (immediately if the simulation is idle)."""
+        if self.encoder is not None:
+            self.encoder.request_keyframe()
+            if not self.is_running:
+                self.hub.publish({'delta': self.encoder.next_message()})
+
+    def _reset_buffer_system(self):
+        for name, read in COUNTERS.items():
+            self._retired[name] += read(self.buffer_system)
+        self.buffer_system.reset()
+
+    def totals(self):
+        """Monotonic COUNTERS over the session's lifetime, across resets and runs."""
+        return {name: self._retired[name] + read(self.buffer_system) for name, read in COUNTERS.items()}
+
+    def reset(self):
+        self._reset_buffer_system()
+        if self.encoder is not None:
+            self.encoder.request_keyframe()
+        self.publish()
+
+    def start_simulation(self):
+        """Start the simulation task unless this session is already running one."""
+        if self._task is not None and not self._task.done():
+            if self.is_running:
+                return False
+            # a stopped loop may still be sleeping; replace it right away
+            self._task.cancel()
+        self._task = asyncio.create_task(self.run_simulation())
+        return True
+
+    async def run_simulation(self):
+        """Run the simulation clock, with a publisher task sampling its state."""
+        self.is_running = True
+        self._run_started, self._run_ended = time.perf_counter(), None
+        self._reset_buffer_system()
+        if self.encoder is not None:
+            self.encoder.request_keyframe()
+        publisher = asyncio.create_task(self.run_publisher())
+
+        # Alternate between adding cars (2 of every 3 operations) and conveyer pickups
+        operations = run_operations(self.buffer_system, 100, 'alternate', 'interleaved')
+
+        due = 1.0  # operations owed by the clock; the first one runs right away
+        last_tick = next_tick = time.perf_counter()
+        try:
+            while self.is_running:
+                now = time.perf_counter()
+                if self.simulation_speed > 0:
+                    due = min(due + (now - last_tick) / self.simulation_speed, MAX_OPS_PER_TICK)
+                else:
+                    due = 1.0
+                last_tick = now
+
+                finished = False
+                while due >= 1:
+                    started = metrics.clock()
+                    step = next(operations, None)
+                    if step is None:
+                        finished = True
+                        break
+                    metrics.observe_since(STEP_OPS[step[0]], started)
+                    self._operations += 1
+                    due -= 1
+                if finished:
+                    break
+                if self.publish_fps <= 0 and self._published != self._operations:
+                    # Hand updated state to every viewer's queue without waiting on the network
+                    self.publish()
+
+                if self.simulation_speed > 0:
+                    next_tick = max(next_tick + 1 / self.tick_rate, now)
+                    await asyncio.sleep(next_tick - time.perf_counter())
+                    if metrics.enabled:
+                        metrics.observe(None, max(0.0, time.perf_counter() - next_tick),
+                                        'sequencing_tick_lag_seconds')
+                else:
+                    await asyncio.sleep(0)
+
+        except Exception as e:
+            print(f"Simulation error in session {self.session_id}: {e}")
+        finally:
+            publisher.cancel()
+            self.is_running = False
+            self._run_ended = time.perf_counter()
+            # the last frame shows the final state
+            if self._published != self._operations:
+                self.publish()
+
+    def cars_per_second(self):
+        """Cars enqueued per second of wall time over the current (or last) run."""
+        if self._run_started is None:
+            return 0.0
+        ended = time.perf_counter() if self._run_ended is None else self._run_ended
+        elapsed = ended - self._run_started
+        return self.buffer_system.stats['total_cars'] / elapsed if elapsed > 0 else 0.0
+
+    def stop_simulation(self):
+        """Stop the running simulation."""
+        self.is_running = False
+
+    def info(self):
+        return {
+            'session_id': self.session_id,
+            'is_running': self.is_running,
+            'simulation_speed': self.simulation_speed,
+            'tick_rate': self.tick_rate,
+            'publish_fps': self.publish_fps,
+            **self.hub.stats(),
+        }
+
+
+class SessionRegistry:
+    """Simulation sessions keyed by id, created on first use.
+
+    Viewers hold a session through acquire() and release(); once the last
+    one has left and the simulation is stopped, the session is forgotten,
+    unless its id is in ``keep``.
+    """
+
+    def __init__(self, queue_size=16, keep=('default',)):
+        self.queue_size = queue_size
+        self.keep = set(keep)
+        self.sessions = {}
+        # session -> viewers holding it through acquire()
+        self._holders = {}
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = SimulationManager(session_id, self.queue_size)
+            self.sessions[session_id] = session
+        return session
+
+    def find(self, session_id):
+        return self.sessions.get(session_id)
+
+    def acquire(self, session_id):
+        """get() on behalf of a viewer, which must call release() when it leaves."""
+        session = self.get(session_id)
+        self._holders[session] = self._holders.get(session, 0) + 1
+        return session
+
+    def release(self, session):
+        """Drop a viewer's hold; True if that evicted the session."""
+        holders = self._holders.pop(session, 0) - 1
+        if holders > 0:
+            self._holders[session] = holders
+            return False
+        session_id = session.session_id
+        if session_id in self.keep or session.is_running or self.sessions.get(session_id) is not session:
+            return False
+        del self.sessions[session_id]
+        return True
+
+    async def remove(self, session_id):
+        """Stop and forget a session, closing its viewers; False if it does not exist."""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.stop_simulation()
+        for subscriber in list(session.hub.subscribers):
+            session.hub.unsubscribe(subscriber)
+            try:
+                await subscriber.websocket.close(code=1001)
+            except Exception:
+                pass
+        return True
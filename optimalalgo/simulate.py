@@ -0,0 +1,182 @@
+"""Headless batch simulation of the buffer lanes and conveyer belt.
+
+Runs BufferSystem + ConveyerBelt as fast as the CPU allows, without the
+websocket loop or wall-clock pacing, and reports aggregate KPIs.
+
+    python simulate.py --cars 1000000 --seed 7
+"""
+import argparse
+import json
+import random
+import time
+
+from lane_store import parse_layout
+from sequencing import BufferSystem
+
+
+def alternate_ovens(buffer_system, n_cars, rng):
+    """Shuffled distribution batch, ovens alternating 1, 2, 1, ... (the dashboard default)."""
+    colors = buffer_system.generate_cars_by_distribution(n_cars, rng)
+    return ((color, 1 if i % 2 == 0 else 2) for i, color in enumerate(colors))
+
+
+def random_arrivals(buffer_system, n_cars, rng):
+    """Colors drawn independently by distribution share, ovens drawn uniformly."""
+    weighted = [(c, p) for c, p in buffer_system.color_distribution.items() if c != 0 and p > 0]
+    colors = rng.choices([c for c, _ in weighted], weights=[p for _, p in weighted], k=n_cars)
+    return ((color, rng.choice((1, 2))) for color in colors)
+
+
+def forecast_arrivals(feed, line=0, refresh=100):
+    """Arrival policy whose color mix follows a live forecast (e.g. forecasting.ForecastFeed).
+
+    feed.color_distribution(line) is re-read every ``refresh`` cars; until
+    it has a forecast, the buffer system's own color_distribution is used.
+    """
+    def arrivals(buffer_system, n_cars, rng):
+        for i in range(n_cars):
+            if i % refresh == 0:
+                distribution = feed.color_distribution(line) or buffer_system.color_distribution
+                weighted = [(c, p) for c, p in distribution.items() if c != 0 and p > 0]
+                colors, weights = [c for c, _ in weighted], [p for _, p in weighted]
+            yield rng.choices(colors, weights=weights)[0], rng.choice((1, 2))
+    return arrivals
+
+
+def interleaved_picks(operation_count):
+    """One pickup for every two arrivals (the dashboard default)."""
+    return operation_count % 3 == 0
+
+
+def alternate_picks(operation_count):
+    """One pickup for every arrival."""
+    return operation_count % 2 == 0
+
+
+# arrival policies: (buffer_system, n_cars, rng) -> iterable of (color, oven)
+ARRIVAL_POLICIES = {
+    'alternate': alternate_ovens,
+    'random': random_arrivals,
+}
+
+# pick policies: (operation_count) -> True to run a conveyer pickup instead of an arrival
+PICK_POLICIES = {
+    'interleaved': interleaved_picks,
+    'alternate': alternate_picks,
+}
+
+
+def _resolve(policy, registry, kind):
+    if callable(policy):
+        return policy
+    try:
+        return registry[policy]
+    except KeyError:
+        raise ValueError(f"Unknown {kind} policy {policy!r}; expected one of {sorted(registry)}") from None
+
+
+def run_operations(buffer_system, n_cars, arrival_policy='alternate', pick_policy='interleaved', rng=None):
+    """Drive buffer_system through arrivals and pickups until every car has arrived.
+
+    Yields ``(operation, result)`` after each step, where operation is
+    ``'add'`` or ``'pick'`` and result is the boolean the BufferSystem call
+    returned, so callers can pace, publish or aggregate however they like.
+    """
+    arrivals = iter(_resolve(arrival_policy, ARRIVAL_POLICIES, 'arrival')(buffer_system, n_cars, rng or random))
+    should_pick = _resolve(pick_policy, PICK_POLICIES, 'pick')
+
+    operation_count = 0
+    next_car = next(arrivals, None)
+    while next_car is not None:
+        if should_pick(operation_count):
+            yield 'pick', buffer_system.process_conveyer_pickup()
+        else:
+            color, oven = next_car
+            yield 'add', buffer_system.add_to_bufferline(color, oven)
+            next_car = next(arrivals, None)
+        operation_count += 1
+
+
+def simulate(n_cars, arrival_policy='alternate', pick_policy='interleaved', seed=None,
+             color_distribution=None, layout=None, lane_store='ring', sample_every=100, drain=False,
+             event_sink='off'):
+    """Run one headless simulation and return its KPIs.
+
+    Args:
+        n_cars: Number of cars to feed into the buffer lanes
+        arrival_policy: Name in ARRIVAL_POLICIES or a callable (buffer_system, n_cars, rng)
+        pick_policy: Name in PICK_POLICIES or a callable (operation_count) -> bool
+        seed: Seed for the car stream; None for a random run
+        color_distribution: Color share percentages; BufferSystem default if None
+        layout: Lane layout such as '4x14/5x16' (see lane_store.parse_layout); default lanes if None
+        lane_store: Lane storage backend passed to BufferSystem
+        sample_every: Record buffer utilization every this many operations
+        drain: Keep picking after the last arrival until the lanes are empty
+        event_sink: Where BufferSystem records operations (see events.make_sink); off by default
+    """
+    geometry = {}
+    if layout is not None:
+        geometry['lane_capacities'], geometry['oven1_lanes'] = parse_layout(layout)
+    buffer_system = BufferSystem(color_distribution=color_distribution, lane_store=lane_store,
+                                 event_sink=event_sink, **geometry)
+    rng = random.Random(seed)
+    lanes = buffer_system.lanes
+    total_capacity = sum(lanes.capacity(i) for i in range(len(lanes)))
+
+    operations = 0
+    rejected = 0
+    utilization = []
+    started = time.perf_counter()
+    for operation, result in run_operations(buffer_system, n_cars, arrival_policy, pick_policy, rng):
+        if operation == 'add' and not result:
+            rejected += 1
+        operations += 1
+        if operations % sample_every == 0:
+            utilization.append(round(buffer_system.cars / total_capacity * 100, 1))
+    if drain:
+        while buffer_system.process_conveyer_pickup():
+            operations += 1
+    elapsed = time.perf_counter() - started
+    buffer_system.events.close()
+
+    conveyer = buffer_system.conveyer
+    arrived = buffer_system.stats['total_cars'] + rejected
+    return {
+        'cars': arrived,
+        'operations': operations,
+        'total_picks': conveyer.total_picks,
+        'color_changes': conveyer.color_changes,
+        'overflow_penalties': buffer_system.overflow,
+        'rejected': rejected,
+        'cars_in_buffer': buffer_system.cars,
+        'mean_utilization': round(sum(utilization) / len(utilization), 1) if utilization else 0.0,
+        'max_utilization': max(utilization, default=0.0),
+        'utilization': utilization,
+        'elapsed_seconds': round(elapsed, 4),
+        'cars_per_second': round(arrived / elapsed) if elapsed > 0 else 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the conveyer sequencing simulation headless.")
+    parser.add_argument('--cars', type=int, default=10000, help="number of cars to simulate")
+    parser.add_argument('--arrival', choices=sorted(ARRIVAL_POLICIES), default='alternate')
+    parser.add_argument('--pick', choices=sorted(PICK_POLICIES), default='interleaved')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--layout', default=None, help="lane layout, e.g. 4x14/5x16")
+    parser.add_argument('--sample-every', type=int, default=100,
+                        help="operations between utilization samples")
+    parser.add_argument('--drain', action='store_true', help="empty the lanes after the last arrival")
+    parser.add_argument('--series', action='store_true', help="include the utilization time series")
+    parser.add_argument('--events', default='off', help="event sink: off, ring[:N] or jsonl:PATH")
+    args = parser.parse_args(argv)
+
+    kpis = simulate(args.cars, args.arrival, args.pick, args.seed, layout=args.layout,
+                    sample_every=args.sample_every, drain=args.drain, event_sink=args.events)
+    if not args.series:
+        del kpis['utilization']
+    print(json.dumps(kpis, indent=2))
+
+
+if __name__ == "__main__":
+    main()
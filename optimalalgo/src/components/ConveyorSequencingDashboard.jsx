@@ -1,11 +1,45 @@
 import React, { useState, useEffect, useRef } from 'react';
 
+const laneStatus = (current, capacity) => {
+  const utilization = current / capacity;
+  if (utilization >= 0.9) return 'critical';
+  if (utilization >= 0.7) return 'warning';
+  return 'active';
+};
+
+// Apply a system_delta patch (see optimalalgo/state_stream.py) to the last snapshot
+const applyDelta = (state, delta) => {
+  const oven1Lanes = state.buffer_lanes.oven1.length;
+  const oven1 = [...state.buffer_lanes.oven1];
+  const oven2 = [...state.buffer_lanes.oven2];
+  let recentSequence = state.conveyer.recent_sequence;
+
+  delta.ops.forEach(([laneIdx, op, color]) => {
+    const lanes = laneIdx < oven1Lanes ? oven1 : oven2;
+    const i = laneIdx < oven1Lanes ? laneIdx : laneIdx - oven1Lanes;
+    const lane = lanes[i];
+    const vehicles = op === 'a' ? [...lane.vehicles, color] : lane.vehicles.slice(1);
+    lanes[i] = { ...lane, vehicles, current: vehicles.length, status: laneStatus(vehicles.length, lane.capacity) };
+    if (op === 'p') {
+      recentSequence = [...recentSequence, color].slice(-20);
+    }
+  });
+
+  return {
+    ...state,
+    buffer_lanes: { oven1, oven2 },
+    conveyer: { ...state.conveyer, ...delta.conveyer, recent_sequence: recentSequence },
+    kpis: { ...state.kpis, ...delta.kpis }
+  };
+};
+
 const ConveyorSequencingDashboard = () => {
   const [systemState, setSystemState] = useState(null);
   const [isConnected, setIsConnected] = useState(false);
   const [simulationStatus, setSimulationStatus] = useState('stopped');
   const [processHistory, setProcessHistory] = useState([]);
   const websocket = useRef(null);
+  const lastSeq = useRef(null);
 
   // Color definitions
   const colorMap = {
@@ -35,7 +69,7 @@ const ConveyorSequencingDashboard = () => {
 
   const connectWebSocket = () => {
     try {
-      const ws = new WebSocket('ws://localhost:8000/ws');
+      const ws = new WebSocket('ws://localhost:8000/ws?protocol=delta');
       websocket.current = ws;
 
       ws.onopen = () => {
@@ -49,6 +83,7 @@ const ConveyorSequencingDashboard = () => {
           console.log("data:", message.data);
           if (message.type === 'system_update') {
             console.log('📦 Received data:', message.data);
+            lastSeq.current = message.seq ?? null;
             setSystemState(message.data);
 
             // if (message.data.process_flow?.recent_operations) {
@@ -57,6 +92,16 @@ const ConveyorSequencingDashboard = () => {
             //     ...prev.slice(0, 20)
             //   ]);
             // }
+          } else if (message.type === 'system_delta') {
+            // Waiting for a keyframe after a gap
+            if (lastSeq.current === null) return;
+            if (message.seq !== lastSeq.current + 1) {
+              lastSeq.current = null;
+              ws.send(JSON.stringify({ type: 'request_snapshot' }));
+              return;
+            }
+            lastSeq.current = message.seq;
+            setSystemState(prev => (prev ? applyDelta(prev, message) : prev));
           }
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
@@ -0,0 +1,78 @@
+"""Delta-encoded state streaming for the /ws protocol.
+
+Instead of a full ``get_system_state()`` snapshot per tick, a client on the
+delta protocol receives:
+
+- ``{'type': 'system_update', 'seq': n, 'data': {...}}`` keyframes: the full
+  snapshot, sent first and then every ``keyframe_interval`` messages (or on
+  request after the client notices a gap in ``seq``);
+- ``{'type': 'system_delta', 'seq': n, 'ops': [...], 'conveyer': {...}, 'kpis': {...}}``
+  patches in between, where each op is ``[lane_idx, 'a' | 'p', color]`` for a
+  car added to or picked from a lane, in the order they happened.
+
+Lane indexes count across both ovens (0 is L1). The ``stats`` block of the
+snapshot is only refreshed on keyframes.
+"""
+
+OP_CODES = {'add': 'a', 'pick': 'p'}
+
+
+class DeltaEncoder:
+    """Turns BufferSystem lane events into system_update/system_delta messages."""
+
+    def __init__(self, buffer_system, keyframe_interval=100):
+        self.buffer_system = buffer_system
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self._ops = []
+        self._since_keyframe = None  # None forces a keyframe as the first message
+        buffer_system.listeners.append(self._on_lane_event)
+
+    def _on_lane_event(self, op, lane_idx, color):
+        self._ops.append([lane_idx, OP_CODES[op], color])
+
+    def request_keyframe(self):
+        """Make the next message a full snapshot (e.g. after a reset or a client gap)."""
+        self._since_keyframe = None
+
+    def close(self):
+        """Stop listening to the buffer system."""
+        if self._on_lane_event in self.buffer_system.listeners:
+            self.buffer_system.listeners.remove(self._on_lane_event)
+
+    def keyframe(self):
+        """Full snapshot message; pending ops are folded into it."""
+        self.seq += 1
+        self._ops = []
+        self._since_keyframe = 0
+        return {'type': 'system_update', 'seq': self.seq, 'data': self.buffer_system.get_system_state()}
+
+    def next_message(self):
+        """Message covering everything that happened since the previous one."""
+        if self._since_keyframe is None or self._since_keyframe >= self.keyframe_interval:
+            return self.keyframe()
+
+        bs = self.buffer_system
+        conveyer = bs.conveyer
+        total_picks = conveyer.total_picks
+        capacity = sum(bs.lanes.capacity(i) for i in range(len(bs.lanes)))
+        self.seq += 1
+        self._since_keyframe += 1
+        ops, self._ops = self._ops, []
+        return {
+            'type': 'system_delta',
+            'seq': self.seq,
+            'ops': ops,
+            'conveyer': {
+                'current_color': conveyer.current_color,
+                'total_picks': total_picks,
+                'color_changes': conveyer.color_changes,
+            },
+            'kpis': {
+                'throughput': total_picks,
+                'colorChangeovers': conveyer.color_changes,
+                'bufferUtilization': round(bs.cars / capacity * 100) if capacity else 0,
+                'totalVehicles': bs.stats['total_cars'],
+                'overflowPenalties': bs.overflow,
+            },
+        }
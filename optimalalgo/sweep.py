@@ -0,0 +1,287 @@
+"""Monte Carlo sweep over color distributions, lane layouts and seeds.
+
+Every (distribution, layout, seed) scenario runs through simulate() in a
+ProcessPoolExecutor worker. Rows are appended to the results file as each
+scenario finishes, so an interrupted sweep resumes where it stopped when run
+again with the same output path. At the end the rows are merged into
+mean/p95 summary statistics per (distribution, layout).
+
+    python sweep.py --distributions dists.json --layouts 4x14/5x16 3x14/6x16 \\
+        --seeds 1000 --cars 10000 --out sweep.csv
+
+dists.json maps a scenario name to a color share dictionary, e.g.
+{"baseline": {"C1": 40, "C2": 25, ...}, "more_c3": {...}}.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from lane_store import DEFAULT_LANE_CAPACITIES, DEFAULT_OVEN1_LANES, format_layout
+from simulate import ARRIVAL_POLICIES, PICK_POLICIES, simulate
+
+DEFAULT_LAYOUT = format_layout(DEFAULT_LANE_CAPACITIES, DEFAULT_OVEN1_LANES)
+
+RESULT_FIELDS = [
+    'distribution', 'layout', 'seed', 'cars', 'total_picks', 'color_changes',
+    'overflow_penalties', 'rejected', 'mean_utilization', 'max_utilization', 'elapsed_seconds',
+]
+SUMMARY_METRICS = ['color_changes', 'overflow_penalties', 'rejected', 'mean_utilization']
+
+
+def load_distributions(path):
+    """Read named color distributions from JSON; the '0' (empty lane) key becomes int 0."""
+    with open(path) as f:
+        raw = json.load(f)
+    return {
+        name: {(0 if color == '0' else color): share for color, share in shares.items()}
+        for name, shares in raw.items()
+    }
+
+
+def build_scenarios(distributions, layouts, seeds, base_seed=0):
+    """Expand the grid into one scenario dict per (distribution, layout, seed).
+
+    Each scenario carries its own seed (base_seed + seed index), so results
+    do not depend on which worker runs it or in what order.
+    """
+    return [
+        {'distribution': name, 'shares': shares, 'layout': layout, 'seed': base_seed + k}
+        for name, shares in distributions.items()
+        for layout in layouts
+        for k in range(seeds)
+    ]
+
+
+def scenario_key(row):
+    return (row['distribution'], row['layout'], int(row['seed']))
+
+
+def run_scenario(scenario, n_cars, arrival_policy, pick_policy):
+    """Worker entry point: simulate one scenario and return its result row."""
+    shares = dict(scenario['shares'])
+    # keep empty lanes at the lowest priority, as in the default distribution
+    shares.setdefault(0, 0)
+    kpis = simulate(n_cars, arrival_policy, pick_policy, seed=scenario['seed'],
+                    color_distribution=shares, layout=scenario['layout'])
+    row = {field: kpis.get(field) for field in RESULT_FIELDS}
+    row.update(distribution=scenario['distribution'], layout=scenario['layout'], seed=scenario['seed'])
+    return row
+
+
+class CsvResultWriter:
+    """Appends result rows to a CSV file, flushing after every row."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def completed(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def __enter__(self):
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+        if not exists:
+            self._writer.writeheader()
+        return self
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def next_flush_in(self):
+        return None  # every row is already on disk
+
+    def flush_if_due(self):
+        pass
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """Writes result rows as numbered Parquet part files inside a directory.
+
+    Parquet files cannot be appended to (a file is unreadable until its
+    footer is written), so rows are buffered and written out as a new part
+    once ``flush_seconds`` have passed since the last part, or at
+    ``batch_size`` rows; a crash loses at most the scenarios finished in
+    that window. A resumed sweep reads all parts.
+    """
+
+    def __init__(self, path, batch_size=500, flush_seconds=5.0):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow; install it or write CSV instead") from None
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+
+    def _parts(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name for name in os.listdir(self.path) if name.endswith('.parquet'))
+
+    def completed(self):
+        import pyarrow.parquet as pq
+        rows = []
+        for name in self._parts():
+            rows.extend(pq.read_table(os.path.join(self.path, name)).to_pylist())
+        return rows
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._next_part = len(self._parts())
+        self._pending = []
+        self._last_flush = time.monotonic()
+        return self
+
+    def write(self, row):
+        self._pending.append(row)
+        self.flush_if_due()
+
+    def next_flush_in(self):
+        """Seconds until the buffered rows are due as a part; None when nothing is buffered."""
+        if not self._pending:
+            return None
+        return max(0.0, self._last_flush + self.flush_seconds - time.monotonic())
+
+    def flush_if_due(self):
+        if len(self._pending) >= self.batch_size or self.next_flush_in() == 0.0:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self._pending:
+            return
+        table = pa.Table.from_pylist(self._pending)
+        final = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        # write then rename so an interrupted flush never leaves a truncated part
+        pq.write_table(table, final + '.tmp')
+        os.replace(final + '.tmp', final)
+        self._next_part += 1
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def __exit__(self, *exc):
+        self._flush()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(rows):
+    """Merge result rows into mean/p95 statistics per (distribution, layout)."""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['distribution'], row['layout']), []).append(row)
+
+    summary = []
+    for (distribution, layout), group in sorted(groups.items()):
+        entry = {'distribution': distribution, 'layout': layout, 'runs': len(group)}
+        for metric in SUMMARY_METRICS:
+            values = [float(row[metric]) for row in group]
+            entry[f'{metric}_mean'] = round(sum(values) / len(values), 2)
+            entry[f'{metric}_p95'] = percentile(values, 95)
+        summary.append(entry)
+    return summary
+
+
+def run_sweep(scenarios, writer, n_cars, arrival_policy='alternate', pick_policy='interleaved',
+              workers=None, on_result=None):
+    """Run every scenario not already in the writer's output and return all rows.
+
+    At most a few scenarios per worker are in flight at once, so huge grids
+    do not pile up as pending futures. Waiting for them never outlasts the
+    writer's next due flush, so buffered rows reach disk on time even while
+    long scenarios are still running.
+    """
+    done = writer.completed()
+    finished = {scenario_key(row) for row in done}
+    remaining = iter([s for s in scenarios if scenario_key(s) not in finished])
+    workers = workers or os.cpu_count() or 1
+    rows = list(done)
+
+    with writer, ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            for scenario in remaining:
+                pending.add(pool.submit(run_scenario, scenario, n_cars, arrival_policy, pick_policy))
+                if len(pending) >= workers * 4:
+                    break
+            if not pending:
+                break
+            completed, pending = wait(pending, timeout=writer.next_flush_in(), return_when=FIRST_COMPLETED)
+            for future in completed:
+                row = future.result()
+                writer.write(row)
+                rows.append(row)
+                if on_result is not None:
+                    on_result(row)
+            writer.flush_if_due()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo sweep of the conveyer sequencing simulation.")
+    parser.add_argument('--distributions', help="JSON file of named color distributions "
+                                                "(default: the BufferSystem distribution)")
+    parser.add_argument('--layouts', nargs='+', default=[DEFAULT_LAYOUT], help="lane layouts, e.g. 4x14/5x16")
+    parser.add_argument('--seeds', type=int, default=100, help="random seeds per (distribution, layout)")
+    parser.add_argument('--base-seed', type=int, default=0)
+    parser.add_argument('--cars', type=int, default=10000, help="cars per scenario")
+    parser.add_argument('--arrival', choices=sorted(ARRIVAL_POLICIES), default='alternate')
+    parser.add_argument('--pick', choices=sorted(PICK_POLICIES), default='interleaved')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='sweep.csv',
+                        help="results path; a path without .csv is written as a Parquet directory")
+    parser.add_argument('--summary', default=None, help="summary CSV path (default: <out>_summary.csv)")
+    args = parser.parse_args(argv)
+
+    if args.distributions:
+        distributions = load_distributions(args.distributions)
+    else:
+        from sequencing import BufferSystem
+        distributions = {'default': BufferSystem().default_color_distribution}
+
+    scenarios = build_scenarios(distributions, args.layouts, args.seeds, args.base_seed)
+    if args.out.endswith('.csv'):
+        writer = CsvResultWriter(args.out)
+    else:
+        writer = ParquetResultWriter(args.out)
+
+    total = len(scenarios)
+    progress = {'done': 0}
+
+    def report(row):
+        progress['done'] += 1
+        if progress['done'] % 100 == 0:
+            print(f"{progress['done']} new scenarios finished ({total} in grid)")
+
+    rows = run_sweep(scenarios, writer, args.cars, args.arrival, args.pick, args.workers, report)
+
+    summary = summarize(rows)
+    summary_path = args.summary or f"{os.path.splitext(args.out.rstrip('/'))[0]}_summary.csv"
+    with open(summary_path, 'w', newline='') as f:
+        summary_writer = csv.DictWriter(f, fieldnames=list(summary[0]) if summary else ['distribution'])
+        summary_writer.writeheader()
+        summary_writer.writerows(summary)
+    print(json.dumps(summary, indent=2))
+    print(f"Summary written to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
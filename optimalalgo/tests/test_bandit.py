@@ -0,0 +1,36 @@
+"""LinUCB routing against the rule router on simulated lines."""
+import copy
+
+import pytest
+
+from bandit import REWARDS, BanditRouter, LinUCB, simulate_lines
+from sequencing import BufferSystem
+
+
+@pytest.fixture(scope='module')
+def trained():
+    # one warm-up run; cold-start exploration is not what the comparison is about
+    bandit = LinUCB(len(BufferSystem(event_sink='off').lanes), alpha=0.2)
+    simulate_lines(4, 3000, 'linucb', seed=100, bandit=bandit)
+    return bandit
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_linucb_matches_rules(trained, seed):
+    rules = simulate_lines(4, 2000, 'rules', seed=seed)
+    linucb = simulate_lines(4, 2000, 'linucb', seed=seed, bandit=copy.deepcopy(trained))
+    assert linucb['color_changes'] <= rules['color_changes']
+    lost = lambda kpis: kpis['overflow_penalties'] + kpis['rejected']
+    assert lost(linucb) <= 1.05 * lost(rules)
+
+
+def test_reward_is_taken_at_enqueue():
+    bs = BufferSystem(event_sink='off')
+    router = BanditRouter(LinUCB(len(bs.lanes))).attach(bs)
+    assert router.reward(0, 'C1') == REWARDS['empty']
+    bs.add_to_lane(0, 'C1', 'test')
+    assert router.reward(0, 'C1') == REWARDS['match']
+    assert router.reward(0, 'C2') == REWARDS['mismatch']
+    while not bs.lanes.is_full(0):
+        bs.add_to_lane(0, 'C1', 'test')
+    assert router.reward(0, 'C1') == REWARDS['full']
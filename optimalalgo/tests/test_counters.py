@@ -0,0 +1,87 @@
+"""Incremental car and pick counters against a full recompute over lanes and pick history."""
+import random
+
+import pytest
+
+from sequencing import BufferSystem
+
+COLORS = ['C1', 'C2', 'C3', 'C4', 'C5', 'C12']
+WEIGHTS = [40, 25, 12, 8, 3, 1]
+
+
+def watch(bs):
+    # the test's own record of every car added and picked since the last reset
+    bs.added, bs.picked = [], []
+    bs.listeners.append(lambda op, lane_idx, color: (bs.added if op == 'add' else bs.picked).append(color))
+    return bs
+
+
+def tally(colors):
+    counts = {}
+    for color in colors:
+        counts[color] = counts.get(color, 0) + 1
+    return counts
+
+
+def check(bs):
+    padded = bs.lanes.to_lists()
+    per_lane = [sum(1 for car in lane if car != 0) for lane in padded]
+    oven_cars = [sum(per_lane[:bs.oven1_lanes]), sum(per_lane[bs.oven1_lanes:])]
+    assert [bs.lanes.count(i) for i in range(len(padded))] == per_lane
+    assert bs.oven_cars == oven_cars and bs.cars == sum(per_lane)
+
+    conveyer = bs.conveyer
+    assert conveyer.total_picks == len(bs.picked)
+    assert conveyer.color_counts == tally(bs.picked)
+    assert conveyer.get_stats().get('color_distribution', {}) == tally(bs.picked)
+    assert bs.stats['total_cars'] == len(bs.added) and bs.stats['by_color'] == tally(bs.added)
+
+    state = bs.get_system_state()
+    lanes = state['buffer_lanes']['oven1'] + state['buffer_lanes']['oven2']
+    assert [lane['current'] for lane in lanes] == per_lane
+    assert [lane['vehicles'] for lane in lanes] == [[car for car in lane if car != 0] for lane in padded]
+    capacity = [len(lane) for lane in padded]
+    assert state['kpis']['bufferUtilization'] == round(sum(per_lane) / sum(capacity) * 100)
+    assert state['stats']['oven1_utilization'] == round(oven_cars[0] / sum(capacity[:bs.oven1_lanes]) * 100, 1)
+    assert state['stats']['oven2_utilization'] == round(oven_cars[1] / sum(capacity[bs.oven1_lanes:]) * 100, 1)
+    assert state['kpis']['throughput'] == len(bs.picked)
+
+
+def run(bs, rng, steps):
+    for _ in range(steps):
+        if rng.random() < 0.4:
+            bs.process_conveyer_pickup()
+        else:
+            bs.add_to_bufferline(rng.choices(COLORS, WEIGHTS)[0], rng.choice((1, 2)))
+        check(bs)
+
+
+@pytest.mark.parametrize('lane_store', ['list', 'ring'])
+@pytest.mark.parametrize('lane_index', [True, False])
+@pytest.mark.parametrize('seed', range(3))
+def test_counters_match_recompute(lane_store, lane_index, seed):
+    rng = random.Random(seed)
+    bs = watch(BufferSystem(lane_store=lane_store, lane_index=lane_index, event_sink='off'))
+    check(bs)
+    run(bs, rng, 1500)
+
+    bs.reset()
+    bs.added.clear()
+    bs.picked.clear()
+    check(bs)
+    run(bs, rng, 500)
+
+    # prefilled lanes count as cars in the buffer, not as added or picked ones
+    lanes = [[rng.choice(COLORS) for _ in range(rng.randint(0, capacity))] + [0] * capacity
+             for capacity in bs.lane_capacities]
+    bs.reset(buffer_lanes=[lane[:capacity] for lane, capacity in zip(lanes, bs.lane_capacities)])
+    bs.added.clear()
+    bs.picked.clear()
+    check(bs)
+    run(bs, rng, 500)
+
+    fork = watch(bs.fork())
+    fork.added, fork.picked = list(bs.added), list(bs.picked)
+    check(fork)
+    run(fork, rng, 500)
+    check(bs)
@@ -0,0 +1,138 @@
+"""FrontIndex lane choices against brute-force scans of the lane fronts."""
+import random
+
+import pytest
+
+from lane_index import OVEN1, OVEN2
+from sequencing import BufferSystem
+
+# 18 short lanes: enough for the index to be on by default, small enough to fill up
+LANE_CAPACITIES = (4,) * 8 + (5,) * 10
+OVEN1_LANES = 8
+# C13 is not in the color distribution, so it ranks last
+COLORS = ['C1', 'C2', 'C3', 'C4', 'C5', 'C12', 'C13']
+WEIGHTS = [40, 25, 12, 8, 3, 1, 1]
+
+
+def scan(bs):
+    """Every answer FrontIndex gives, computed by scanning the lanes."""
+    lanes = bs.lanes
+    fronts = [lanes.front(i) for i in range(len(lanes))]
+    ovens = {OVEN1: range(bs.oven1_lanes), OVEN2: range(bs.oven1_lanes, len(lanes))}
+    answers = {}
+    for oven, oven_lanes in ovens.items():
+        for color in COLORS + [0]:
+            answers['open', oven, color] = next(
+                (i for i in oven_lanes if fronts[i] == color and not lanes.is_full(i)), None)
+        priorities = [bs.color_distribution.get(fronts[i], float('inf')) for i in oven_lanes]
+        answers['min_priority', oven] = oven_lanes[priorities.index(min(priorities))] if oven_lanes else 0
+    for color in COLORS:
+        answers['front', color] = next((i for i, front in enumerate(fronts) if front == color), None)
+    answers['occupied'] = next((i for i, front in enumerate(fronts) if front != 0), None)
+    counts = {}
+    for front in fronts:
+        if front != 0:
+            counts[front] = counts.get(front, 0) + 1
+    answers['most_frequent'] = max(counts.items(), key=lambda x: x[1])[0] if counts else None
+    return answers
+
+
+def indexed(bs):
+    """The same answers from bs.index."""
+    index = bs.index
+    answers = {}
+    for oven in (OVEN1, OVEN2):
+        for color in COLORS + [0]:
+            answers['open', oven, color] = index.open_lane(color, oven)
+        answers['min_priority', oven] = index.min_priority_lane(oven)
+    for color in COLORS:
+        answers['front', color] = index.front_lane(color)
+    answers['occupied'] = index.first_occupied_lane()
+    answers['most_frequent'] = index.most_frequent_front()
+    return answers
+
+
+def make_system(lane_index):
+    bs = BufferSystem(lane_capacities=LANE_CAPACITIES, oven1_lanes=OVEN1_LANES, event_sink='off',
+                      lane_index=lane_index)
+    return watch(bs)
+
+
+def watch(bs):
+    # every lane the system chose, as (op, lane_idx, color)
+    bs.chosen = []
+    bs.listeners.append(lambda op, lane_idx, color: bs.chosen.append((op, lane_idx, color)))
+    return bs
+
+
+def step(rng, systems):
+    """One random add or pick on every system; returns their results."""
+    if rng.random() < 0.45:
+        return [bs.process_conveyer_pickup() for bs in systems]
+    color, oven = rng.choices(COLORS, WEIGHTS)[0], rng.choice((1, 2))
+    return [bs.add_to_bufferline(color, oven) for bs in systems]
+
+
+def check(systems):
+    indexed_system, scanning_system = systems
+    assert indexed_system.index is not None and scanning_system.index is None
+    assert indexed(indexed_system) == scan(indexed_system)
+    assert indexed_system.chosen == scanning_system.chosen
+    assert indexed_system.get_system_state() == scanning_system.get_system_state()
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_index_matches_scan(seed):
+    rng = random.Random(seed)
+    systems = [make_system(True), make_system(False)]
+    check(systems)
+    for _ in range(2000):
+        results = step(rng, systems)
+        assert results[0] == results[1]
+        check(systems)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_index_after_reset(seed):
+    rng = random.Random(seed)
+    systems = [make_system(True), make_system(False)]
+    for _ in range(300):
+        step(rng, systems)
+    for bs in systems:
+        bs.reset()
+        bs.chosen.clear()
+    check(systems)
+    for _ in range(300):
+        step(rng, systems)
+        check(systems)
+
+    # reset onto partly filled lanes
+    lanes = [[rng.choice(COLORS) for _ in range(rng.randint(0, capacity))] for capacity in LANE_CAPACITIES]
+    for bs in systems:
+        bs.reset(buffer_lanes=[lane + [0] * (capacity - len(lane))
+                               for lane, capacity in zip(lanes, LANE_CAPACITIES)])
+        bs.chosen.clear()
+    check(systems)
+    for _ in range(300):
+        step(rng, systems)
+        check(systems)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_index_after_fork(seed):
+    rng = random.Random(seed)
+    systems = [make_system(True), make_system(False)]
+    for _ in range(500):
+        step(rng, systems)
+    before = [bs.get_system_state() for bs in systems]
+    forks = [watch(bs.fork()) for bs in systems]
+    check(forks)
+    for _ in range(500):
+        step(rng, forks)
+        check(forks)
+    # the originals' lanes and indexes are untouched by the forks
+    assert [bs.get_system_state() for bs in systems] == before
+    check(systems)
+    for _ in range(200):
+        step(rng, systems)
+        check(systems)
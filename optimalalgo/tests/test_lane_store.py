@@ -0,0 +1,175 @@
+"""Lane store backends against the original list-based BufferSystem."""
+import random
+
+import pytest
+
+from lane_store import ListLaneStore, RingLaneStore
+from sequencing import BufferSystem
+
+COLOR_DISTRIBUTION = {
+    'C1': 40, 'C2': 25, 'C3': 12, 'C4': 8, 'C5': 3,
+    'C6': 2, 'C7': 2, 'C8': 2, 'C9': 2, 'C10': 2,
+    'C11': 2, 'C12': 1, 0: 0,
+}
+
+
+class BaselineBufferSystem:
+    """The buffer lanes and greedy conveyer as plain zero-padded lists, before lane stores existed."""
+
+    def __init__(self):
+        self.lanes = [[0] * 14 for _ in range(4)] + [[0] * 16 for _ in range(5)]
+        self.cars = 0
+        self.overflow = 0
+        self.stats = {'total_cars': 0, 'by_color': {}, 'penalties': 0}
+        self.current_color = None
+        self.color_changes = 0
+        self.picked = []
+
+    def _enqueue(self, lane_idx, color):
+        lane = self.lanes[lane_idx]
+        for j in range(len(lane)):
+            if lane[j] == 0:
+                lane[j] = color
+                self.cars += 1
+                self.stats['total_cars'] += 1
+                self.stats['by_color'][color] = self.stats['by_color'].get(color, 0) + 1
+                self.stats['penalties'] = self.overflow
+                return True
+        return False
+
+    def add_to_bufferline(self, color, oven):
+        lanes = range(4) if oven == 1 else range(4, 9)
+        if oven == 1 and self.cars == 0:
+            return self._enqueue(0, color)
+        for i in lanes:
+            if next((c for c in self.lanes[i] if c != 0), 0) == color and self._enqueue(i, color):
+                return True
+        min_priority, min_lane = float('inf'), lanes.start
+        for i in lanes:
+            priority = COLOR_DISTRIBUTION.get(next((c for c in self.lanes[i] if c != 0), 0), float('inf'))
+            if priority < min_priority:
+                min_priority, min_lane = priority, i
+        if self._enqueue(min_lane, color):
+            return True
+        if oven == 1:
+            self.overflow += 1
+            return self.add_to_bufferline(color, 2)
+        return False
+
+    def process_conveyer_pickup(self):
+        if self.current_color is None:
+            fronts = {}
+            for lane in self.lanes:
+                for car in lane:
+                    if car != 0:
+                        fronts[car] = fronts.get(car, 0) + 1
+                        break
+            if not fronts:
+                return False
+            self.current_color = max(fronts.items(), key=lambda x: x[1])[0]
+        lane_idx = next((i for i, lane in enumerate(self.lanes) if lane[0] == self.current_color), None)
+        if lane_idx is None:
+            lane_idx = next((i for i, lane in enumerate(self.lanes) if lane[0] != 0), None)
+            if lane_idx is None:
+                return False
+            self.color_changes += self.lanes[lane_idx][0] != self.current_color
+            self.current_color = self.lanes[lane_idx][0]
+        self.picked.append((self.current_color, lane_idx))
+        self.lanes[lane_idx] = self.lanes[lane_idx][1:] + [0]
+        self.cars -= 1
+        return True
+
+    def get_system_state(self):
+        def lane_state(i):
+            lane = self.lanes[i]
+            current = sum(1 for car in lane if car != 0)
+            utilization = current / len(lane)
+            status = 'critical' if utilization >= 0.9 else 'warning' if utilization >= 0.7 else 'active'
+            return {'id': f'L{i+1}', 'capacity': len(lane), 'current': current,
+                    'vehicles': [car for car in lane if car != 0], 'status': status}
+
+        oven1_cars = sum(lane_state(i)['current'] for i in range(4))
+        oven2_cars = sum(lane_state(i)['current'] for i in range(4, 9))
+        color_counts = {}
+        for color, _ in self.picked:
+            color_counts[color] = color_counts.get(color, 0) + 1
+        return {
+            'buffer_lanes': {
+                'oven1': [lane_state(i) for i in range(4)],
+                'oven2': [lane_state(i) for i in range(4, 9)],
+            },
+            'conveyer': {
+                'current_color': self.current_color,
+                'total_picks': len(self.picked),
+                'color_changes': self.color_changes,
+                'recent_sequence': [color for color, _ in self.picked[-20:]],
+            },
+            'kpis': {
+                'throughput': len(self.picked),
+                'targetJPH': 900,
+                'colorChangeovers': self.color_changes,
+                'bufferUtilization': round((oven1_cars + oven2_cars) / (56 + 80) * 100),
+                'ovenEfficiency': 94.2,
+                'totalVehicles': self.stats['total_cars'],
+                'overflowPenalties': self.overflow,
+            },
+            'stats': {
+                'oven1_utilization': round(oven1_cars / 56 * 100, 1),
+                'oven2_utilization': round(oven2_cars / 80 * 100, 1),
+                'total_cars': self.stats['total_cars'],
+                'penalties': self.stats['penalties'],
+                'color_distribution': self.stats['by_color'],
+            },
+        }
+
+
+def random_operations(rng, n):
+    """(op, color, oven) steps; pick-heavy and add-heavy stretches so lanes both fill up and drain."""
+    colors = [c for c in COLOR_DISTRIBUTION if c != 0]
+    weights = [COLOR_DISTRIBUTION[c] for c in colors]
+    for _ in range(n // 50):
+        pick_share = rng.choice((0.1, 0.4, 0.8))
+        for _ in range(50):
+            if rng.random() < pick_share:
+                yield 'pick', None, None
+            else:
+                yield 'add', rng.choices(colors, weights)[0], rng.choice((1, 2))
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_stores_match_baseline(seed):
+    baseline = BaselineBufferSystem()
+    systems = [BufferSystem(lane_store=store, event_sink='off', lane_index=False)
+               for store in (ListLaneStore, RingLaneStore)]
+    for step, (op, color, oven) in enumerate(random_operations(random.Random(seed), 3000)):
+        if op == 'add':
+            expected = baseline.add_to_bufferline(color, oven)
+            results = [bs.add_to_bufferline(color, oven) for bs in systems]
+        else:
+            expected = baseline.process_conveyer_pickup()
+            results = [bs.process_conveyer_pickup() for bs in systems]
+            if expected:
+                picks = [(bs.conveyer.sequence_history[-1].color, bs.conveyer.sequence_history[-1].lane)
+                         for bs in systems]
+                assert picks == [baseline.picked[-1]] * 2, step
+        assert results == [expected] * 2, step
+        state = baseline.get_system_state()
+        for bs in systems:
+            assert bs.get_system_state() == state, (step, bs.lane_store.__name__)
+            assert bs.overflow == baseline.overflow and bs.cars == baseline.cars
+
+
+@pytest.mark.parametrize('store', [ListLaneStore, RingLaneStore])
+def test_store_operations(store):
+    lanes = store((3, 2))
+    assert [lanes.front(0), lanes.back(0), lanes.count(0)] == [0, 0, 0]
+    assert lanes.push(0, 'C1') and lanes.push(0, 'C2') and lanes.push(0, 'C3')
+    assert not lanes.push(0, 'C4') and lanes.is_full(0)
+    assert lanes.vehicles(0) == ['C1', 'C2', 'C3'] and lanes.peek(0, 2) == ['C1', 'C2']
+    assert lanes.pop(0) == 'C1' and lanes.push(0, 'C4')
+    assert lanes.vehicles(0) == ['C2', 'C3', 'C4'] and lanes.back(0) == 'C4'
+    assert lanes.to_lists() == [['C2', 'C3', 'C4'], [0, 0]]
+    clone = lanes.copy()
+    clone.pop(0)
+    assert lanes.vehicles(0) == ['C2', 'C3', 'C4'] and clone.vehicles(0) == ['C3', 'C4']
+    assert store.from_lanes([['C5', 0], [0, 0, 0]]).to_lists() == [['C5', 0], [0, 0, 0]]
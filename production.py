@@ -1,18 +1,369 @@
 # use_in_production.py
+import functools
+import json
+import os
+import pickle
+import sys
+import time
+import zipfile
+
 import torch
-import pandas as pd
 import numpy as np
-from algorithm import TwinHeadNN
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-import joblib
+
+# Training-only libraries (the algorithm module, pandas, sklearn, joblib) are
+# imported lazily, so serving a bundle needs only torch and NumPy.
+
+# Feature layout used in training: scaled numeric columns, then one-hot blocks
+NUMERIC_COLUMNS = ['buffer', 'priority', 'hour']
+CATEGORICAL_COLUMNS = ['color', 'oven']
+ORDER_COLUMNS = NUMERIC_COLUMNS + CATEGORICAL_COLUMNS
+COLORS = [f'C{i}' for i in range(1, 13)]
+OVENS = ['O1', 'O2']
+N_FEATURES = len(NUMERIC_COLUMNS) + len(COLORS) + len(OVENS)
+
+# Discrete input space materialized by PredictionGrid (9 x 2 x 24 x 12 x 2 orders)
+GRID_BUFFERS = list(range(1, 10))
+GRID_PRIORITIES = [0, 1]
+GRID_HOURS = list(range(24))
+# Seconds of expected wait recommend_best_buffer adds per car already in a buffer
+OCCUPANCY_PENALTY_SECONDS = 30.0
+# How often (seconds) a grid-backed predictor checks its model file for changes
+MODEL_CHECK_INTERVAL = 5.0
+
+# Bundle format written by save_model_bundle
+BUNDLE_FORMAT = 'twin-head-bundle'
+BUNDLE_VERSION = 1
+# Name of the JSON config stored inside exported-graph bundles
+BUNDLE_CONFIG = 'bundle.json'
+
+
+class FeatureTransform:
+    """Fitted scaler + one-hot encoder compiled into a few NumPy array ops.
+
+    Numeric columns go through one fused affine (x * scale + offset, i.e.
+    (x - mean) / std). Each categorical column is a lookup table indexed by
+    the category's position in a sorted array, with one extra row for
+    unknown values (all zeros, or the one-hot of ``unknown[column]``).
+    """
+
+    def __init__(self, numeric_mean, numeric_std, categories, unknown=None):
+        self.numeric_mean = np.asarray(numeric_mean, dtype=np.float64)
+        self.numeric_std = np.asarray(numeric_std, dtype=np.float64)
+        self.categories = {column: list(values) for column, values in categories.items()}
+        self.unknown = dict(unknown or {})
+        self.scale = 1 / self.numeric_std
+        self.offset = -self.numeric_mean / self.numeric_std
+        self.n_features = len(self.numeric_mean) + sum(len(v) for v in self.categories.values())
+
+        self._lookups = []
+        for column, values in self.categories.items():
+            order = np.argsort(values)
+            table = np.zeros((len(values) + 1, len(values)), dtype=np.float32)
+            table[np.arange(len(values)), order] = 1
+            if column in self.unknown:
+                table[-1, values.index(self.unknown[column])] = 1
+            self._lookups.append((column, np.asarray(values)[order].astype(str), table))
+
+    @classmethod
+    def from_fitted(cls, scaler, encoder, numeric_columns=NUMERIC_COLUMNS, categorical_columns=CATEGORICAL_COLUMNS):
+        """Compile a fitted StandardScaler and OneHotEncoder (categories in encoder order)."""
+        categories = {
+            column: [str(c) for c in values]
+            for column, values in zip(categorical_columns, encoder.categories_)
+        }
+        return cls(scaler.mean_, scaler.scale_, categories)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['numeric_mean'], data['numeric_std'], data['categories'], data.get('unknown'))
+
+    def to_dict(self):
+        return {
+            'numeric_mean': self.numeric_mean.tolist(),
+            'numeric_std': self.numeric_std.tolist(),
+            'categories': self.categories,
+            'unknown': self.unknown,
+        }
+
+    def transform(self, orders):
+        """Feature matrix (float32) for a DataFrame, structured array or dict of columns."""
+        numeric = np.column_stack([np.asarray(orders[c], dtype=np.float64) for c in NUMERIC_COLUMNS])
+        features = np.empty((len(numeric), self.n_features), dtype=np.float32)
+        features[:, :len(NUMERIC_COLUMNS)] = numeric * self.scale + self.offset
+
+        start = len(NUMERIC_COLUMNS)
+        for column, sorted_values, table in self._lookups:
+            values = np.asarray(orders[column]).astype(str)
+            positions = np.searchsorted(sorted_values, values)
+            positions = np.minimum(positions, len(sorted_values) - 1)
+            positions[sorted_values[positions] != values] = len(sorted_values)
+            features[:, start:start + table.shape[1]] = table[positions]
+            start += table.shape[1]
+        return features
+
+
+# Hand-written preprocessing used before bundles existed; unknown ovens count as O2
+LEGACY_TRANSFORM = FeatureTransform([5, 0.5, 12], [3, 0.5, 6], {'color': COLORS, 'oven': OVENS},
+                                    unknown={'oven': 'O2'})
+
+
+def save_model_bundle(path, model, transform, model_args=(N_FEATURES,), metadata=None, exported=False):
+    """Save TwinHeadNN weights and the compiled preprocessing as one versioned file.
+
+    By default the bundle is a state_dict plus a small config holding only
+    tensors and plain Python values, so it loads with
+    ``torch.load(..., weights_only=True)``. With exported=True the model is
+    saved as a ``torch.export`` graph instead, which loads without the
+    training module at all (but takes longer to deserialize).
+    """
+    config = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'model_args': list(model_args),
+        'transform': transform.to_dict(),
+        'metadata': metadata or {},
+    }
+    if exported:
+        example = torch.zeros(2, transform.n_features)
+        program = torch.export.export(model.eval(), (example,), dynamic_shapes=({0: torch.export.Dim('batch')},))
+        torch.export.save(program, path, extra_files={BUNDLE_CONFIG: json.dumps(config)})
+    else:
+        torch.save({**config, 'state_dict': model.state_dict()}, path)
+
+
+def _is_exported_bundle(path):
+    if not zipfile.is_zipfile(path):
+        return False
+    with zipfile.ZipFile(path) as archive:
+        return any(name.endswith('/extra/' + BUNDLE_CONFIG) for name in archive.namelist())
+
+
+def _check_bundle(path, config):
+    if config.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"{path} is not a {BUNDLE_FORMAT} file")
+    if config['version'] > BUNDLE_VERSION:
+        raise ValueError(f"{path} has bundle version {config['version']}; this code reads up to {BUNDLE_VERSION}")
+
+
+def _model_from_state(path, config, model_class=None):
+    _check_bundle(path, config)
+    if model_class is None:
+        from algorithm import TwinHeadNN as model_class
+    model = model_class(*config['model_args'])
+    model.load_state_dict(config['state_dict'])
+    return model, FeatureTransform.from_dict(config['transform']), config['metadata']
+
+
+def load_model_bundle(path, model_class=None):
+    """Load a bundle written by save_model_bundle; returns (model, transform, metadata).
+
+    State-dict bundles rebuild the network with model_class(*model_args),
+    importing TwinHeadNN from the training module only when no class is given.
+    """
+    if _is_exported_bundle(path):
+        extra_files = {BUNDLE_CONFIG: ''}
+        program = torch.export.load(path, extra_files=extra_files)
+        config = json.loads(extra_files[BUNDLE_CONFIG])
+        _check_bundle(path, config)
+        return program.module(), FeatureTransform.from_dict(config['transform']), config['metadata']
+    config = torch.load(path, map_location='cpu', weights_only=True)
+    return _model_from_state(path, config, model_class)
+
+
+def load_model_file(path, allow_pickle=False):
+    """Load a bundle or a legacy fully pickled module; returns (model, transform or None).
+
+    Pickled modules are only accepted with allow_pickle, since unpickling
+    runs arbitrary code from the file and needs the training module; keep
+    that opt-in to offline scripts with trusted files.
+    """
+    if _is_exported_bundle(path):
+        model, transform, _ = load_model_bundle(path)
+        return model, transform
+    try:
+        saved = torch.load(path, map_location='cpu', weights_only=True)
+    except pickle.UnpicklingError:
+        if not allow_pickle:
+            raise ValueError(f"{path} is a pickled module; pass allow_pickle=True or convert it "
+                             "with export_bundle") from None
+        return torch.load(path, map_location='cpu', weights_only=False), None
+    model, transform, _ = _model_from_state(path, saved)
+    return model, transform
+
+
+def export_bundle(model_path, scaler_path, encoder_path, bundle_path, exported=False):
+    """Bundle a pickled training model with its joblib-saved scaler and encoder."""
+    import joblib
+    model = torch.load(model_path, map_location='cpu', weights_only=False)
+    transform = FeatureTransform.from_fitted(joblib.load(scaler_path), joblib.load(encoder_path))
+    save_model_bundle(bundle_path, model, transform, model_args=(transform.n_features,),
+                      metadata={'source': model_path}, exported=exported)
+
+
+class PredictionGrid:
+    """Raw predictions for every in-grid order, materialized once into dense tables.
+
+    ``processing_time`` and ``downtime_risk`` are indexed
+    [buffer, priority, hour, color, oven] by position in GRID_BUFFERS,
+    GRID_PRIORITIES, GRID_HOURS, COLORS and OVENS. Orders outside the grid
+    fall back to the model through an LRU cache.
+    """
+
+    _INDEXES = [
+        {value: i for i, value in enumerate(values)}
+        for values in (GRID_BUFFERS, GRID_PRIORITIES, GRID_HOURS, COLORS, OVENS)
+    ]
+    # the same axes as arrays, with the order that sorts each, for batch lookups
+    _AXES = [np.asarray(values) for values in (GRID_BUFFERS, GRID_PRIORITIES, GRID_HOURS, COLORS, OVENS)]
+    _SORTERS = [np.argsort(axis, kind='stable') for axis in _AXES]
+
+    def __init__(self, predictor, lru_size=4096):
+        self.predictor = predictor
+        self._fallback = functools.lru_cache(maxsize=lru_size)(predictor._predict_raw)
+        self.build()
+
+    def build(self):
+        """(Re)compute the tables from the predictor's current model."""
+        axes = np.meshgrid(*(np.arange(len(index)) for index in self._INDEXES), indexing='ij')
+        shape = axes[0].shape
+        orders = {
+            'buffer': np.asarray(GRID_BUFFERS)[axes[0].ravel()],
+            'priority': np.asarray(GRID_PRIORITIES)[axes[1].ravel()],
+            'hour': np.asarray(GRID_HOURS)[axes[2].ravel()],
+            'color': np.asarray(COLORS)[axes[3].ravel()],
+            'oven': np.asarray(OVENS)[axes[4].ravel()],
+        }
+        processing_time, downtime_risk = self.predictor._forward(self.predictor.transform.transform(orders))
+        self.processing_time = processing_time.reshape(shape)
+        self.downtime_risk = downtime_risk.reshape(shape)
+        self._fallback.cache_clear()
+
+    def index(self, buffer, priority, hour, color, oven):
+        """Table position of an order, or None if it lies outside the grid."""
+        try:
+            return tuple(index[value] for index, value in
+                         zip(self._INDEXES, (buffer, priority, hour, color, oven)))
+        except (KeyError, TypeError):
+            return None
+
+    def predict(self, buffer, priority, hour, color, oven):
+        """Raw (processing_time, downtime_risk) for one order."""
+        position = self.index(buffer, priority, hour, color, oven)
+        if position is None:
+            return self._fallback(buffer, priority, hour, color, oven)
+        return float(self.processing_time[position]), float(self.downtime_risk[position])
+
+    def lookup(self, orders, chunk_size=4096):
+        """Raw (processing_time, downtime_risk) arrays for many orders.
+
+        In-grid rows are read from the tables; the rest go through one
+        forward pass (in chunks of chunk_size rows).
+        """
+        columns = [np.asarray(orders[name]) for name in ORDER_COLUMNS]
+        positions = np.stack([_axis_positions(axis, sorter, values)
+                              for axis, sorter, values in zip(self._AXES, self._SORTERS, columns)])
+        inside = (positions >= 0).all(axis=0)
+        processing_time = np.empty(positions.shape[1], dtype=np.float32)
+        downtime_risk = np.empty(positions.shape[1], dtype=np.float32)
+        index = tuple(positions[:, inside])
+        processing_time[inside] = self.processing_time[index]
+        downtime_risk[inside] = self.downtime_risk[index]
+        if not inside.all():
+            outside = {name: values[~inside] for name, values in zip(ORDER_COLUMNS, columns)}
+            features = self.predictor.transform.transform(outside)
+            processing_time[~inside], downtime_risk[~inside] = self.predictor._forward(features, chunk_size)
+        return processing_time, downtime_risk
+
+
+def _axis_positions(axis, sorter, values):
+    # positions of a column's values on one grid axis (-1 off the grid), via a sorted search
+    numeric = axis.dtype.kind in 'iu'
+    if values.dtype.kind == 'O':
+        try:
+            values = values.astype(np.float64 if numeric else str)
+        except (TypeError, ValueError):
+            return np.full(len(values), -1, dtype=np.intp)
+    elif values.dtype.kind not in ('biuf' if numeric else 'U'):
+        return np.full(len(values), -1, dtype=np.intp)
+    positions = sorter[np.minimum(np.searchsorted(axis, values, sorter=sorter), len(axis) - 1)]
+    return np.where(axis[positions] == values, positions, -1)
+
 
 class ProductionPredictor:
-    def __init__(self, model_path='twin_head_model.pth'):
-        # Load the saved model
-        self.model = torch.load(model_path, map_location='cpu')
-        self.model.eval()  # Set to evaluation mode
+    def __init__(self, model_path='twin_head_model.pth', model=None, transform=None,
+                 allow_pickle=False, warmup=False, prediction_grid=False):
+        # Load the saved model (or use an already constructed one). Bundles carry
+        # their own preprocessing; a fully pickled module is only unpickled when
+        # allow_pickle is set, since that runs arbitrary code from the file.
+        # Hot reloads follow the same rule.
+        self.model_path = model_path if model is None else None
+        self.allow_pickle = allow_pickle
+        if model is None:
+            self._model_stat = self._stat_model_file()
+            model, bundle_transform = load_model_file(model_path, allow_pickle)
+            transform = transform or bundle_transform
+        self._set_model(model, transform)
+        if warmup:
+            self.warmup()
+        # Optional dense table of every in-grid prediction (see PredictionGrid)
+        self.grid = PredictionGrid(self) if prediction_grid else None
+        self._next_model_check = time.monotonic() + MODEL_CHECK_INTERVAL
         print("✅ Production model loaded successfully!")
     
+    def _set_model(self, model, transform):
+        self.model = model
+        # Exported graphs are captured in eval mode and do not support .eval()
+        if not isinstance(self.model, torch.fx.GraphModule):
+            self.model.eval()  # Set to evaluation mode
+        # Preprocessing; the hand-written legacy one unless the model came from a bundle
+        self.transform = transform or LEGACY_TRANSFORM
+    
+    def _stat_model_file(self):
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def reload_if_changed(self):
+        """Reload the model (and rebuild the prediction grid) if its file changed on disk.
+
+        A replacement that is not a loadable bundle (or a pickled module
+        without allow_pickle) is skipped until the file changes again, and
+        the current model keeps serving.
+        """
+        if self.model_path is None:
+            return False
+        stat = self._stat_model_file()
+        if stat == self._model_stat:
+            return False
+        self._model_stat = stat
+        try:
+            model, transform = load_model_file(self.model_path, self.allow_pickle)
+        except ValueError as e:
+            print(f"⚠️ Model file not reloaded: {e}")
+            return False
+        self._set_model(model, transform)
+        if self.grid is not None:
+            self.grid.build()
+        return True
+    
+    def _check_model_file(self):
+        # Throttled, so grid lookups don't pay a stat() on every call
+        now = time.monotonic()
+        if self.grid is not None and now >= self._next_model_check:
+            self._next_model_check = now + MODEL_CHECK_INTERVAL
+            self.reload_if_changed()
+    
+    @classmethod
+    def from_bundle(cls, bundle_path, model_class=None, warmup=False):
+        """Load a predictor whose preprocessing matches training (see save_model_bundle)."""
+        model, transform, _ = load_model_bundle(bundle_path, model_class)
+        return cls(model=model, transform=transform, warmup=warmup)
+    
+    def warmup(self, batch_sizes=(1, 64, 4096)):
+        """Run throwaway forward passes so the first real request doesn't pay one-time setup costs."""
+        with torch.no_grad():
+            for batch_size in batch_sizes:
+                self.model(torch.zeros(batch_size, self.transform.n_features))
+    
     def predict_for_new_order(self, buffer, priority, hour, color, oven):
         """
         Predict processing time and downtime risk for a new manufacturing order
@@ -24,50 +375,151 @@ class ProductionPredictor:
             color: Product color (C1, C2, C3, etc.)
             oven: Which oven (O1 or O2)
         """
-        # Prepare features (you'll need to save scaler/encoder from training)
-        # For now, using dummy preprocessing - in real case, save these with model
-        features = self._prepare_features(buffer, priority, hour, color, oven)
-        
-        with torch.no_grad():
-            features_tensor = torch.tensor(features, dtype=torch.float32)
-            processing_time, downtime_risk = self.model(features_tensor)
+        if self.grid is not None:
+            self._check_model_file()
+            processing_time, downtime_risk = self.grid.predict(buffer, priority, hour, color, oven)
+        else:
+            processing_time, downtime_risk = self._predict_raw(buffer, priority, hour, color, oven)
         
         return {
-            'processing_time_seconds': round(processing_time.item(), 1),
-            'downtime_risk_percent': round(downtime_risk.item() * 100, 1),
+            'processing_time_seconds': round(processing_time, 1),
+            'downtime_risk_percent': round(downtime_risk * 100, 1),
             'recommended_buffer': buffer,
-            'estimated_completion': f"{processing_time.item()/60:.1f} minutes"
+            'estimated_completion': f"{processing_time/60:.1f} minutes"
+        }
+    
+    def recommend_best_buffer(self, priority, hour, color, oven, occupancies,
+                              occupancy_penalty=OCCUPANCY_PENALTY_SECONDS):
+        """
+        Pick the buffer with the lowest predicted processing time plus queueing penalty
+        
+        Args:
+            priority, hour, color, oven: The order, as in predict_for_new_order
+            occupancies: Dict of buffer -> cars currently queued; its keys are the candidates
+            occupancy_penalty: Seconds added to a buffer's score per queued car
+        """
+        buffers = list(occupancies)
+        positions = None
+        if self.grid is not None:
+            self._check_model_file()
+            positions = [self.grid.index(b, priority, hour, color, oven) for b in buffers]
+        
+        if positions is not None and None not in positions:
+            # Every candidate is in the grid: a single fancy-indexed lookup
+            index = tuple(np.array(axis) for axis in zip(*positions))
+            processing_time = self.grid.processing_time[index]
+            downtime_risk = self.grid.downtime_risk[index]
+        else:
+            n = len(buffers)
+            orders = {'buffer': np.asarray(buffers), 'priority': np.full(n, priority), 'hour': np.full(n, hour),
+                      'color': np.full(n, color), 'oven': np.full(n, oven)}
+            processing_time, downtime_risk = self._forward(self.transform.transform(orders))
+        
+        return self._recommendation(occupancies, processing_time, downtime_risk, occupancy_penalty)
+    
+    def recommend_batch(self, queries, occupancy_penalty=OCCUPANCY_PENALTY_SECONDS):
+        """
+        recommend_best_buffer for many orders with a single forward pass
+        
+        Args:
+            queries: Dicts with priority, hour, color, oven and occupancies
+            occupancy_penalty: Seconds added to a buffer's score per queued car
+        """
+        queries = list(queries)
+        columns = {name: [] for name in ORDER_COLUMNS}
+        for query in queries:
+            for buffer in query['occupancies']:
+                columns['buffer'].append(buffer)
+                for name in ('priority', 'hour', 'color', 'oven'):
+                    columns[name].append(query[name])
+        processing_time, downtime_risk = self._raw_batch(columns)
+        
+        results = []
+        start = 0
+        for query in queries:
+            end = start + len(query['occupancies'])
+            results.append(self._recommendation(query['occupancies'], processing_time[start:end],
+                                                downtime_risk[start:end], occupancy_penalty))
+            start = end
+        return results
+    
+    def _recommendation(self, occupancies, processing_time, downtime_risk, occupancy_penalty):
+        # Candidate buffers are the occupancies keys, in the order of the prediction arrays
+        buffers = list(occupancies)
+        scores = processing_time + occupancy_penalty * np.array([occupancies[b] for b in buffers])
+        best = int(np.argmin(scores))
+        return {
+            'recommended_buffer': buffers[best],
+            'expected_processing_time': float(processing_time[best]),
+            'expected_downtime_risk': float(downtime_risk[best]) * 100,
+            'scores': dict(zip(buffers, scores.tolist())),
         }
     
-    def _prepare_features(self, buffer, priority, hour, color, oven):
-        # This is simplified - in production, you'd save the actual scaler/encoder
-        # For demo purposes, using basic preprocessing
-        num_features = np.array([[buffer, priority, hour]])
-        # Simple scaling (replace with your actual scaler)
-        num_features = (num_features - np.array([5, 0.5, 12])) / np.array([3, 0.5, 6])
+    def _predict_raw(self, buffer, priority, hour, color, oven):
+        # Unrounded (processing_time, downtime_risk) for one order, straight from the model
+        order = {'buffer': [buffer], 'priority': [priority], 'hour': [hour], 'color': [color], 'oven': [oven]}
+        processing_time, downtime_risk = self._forward(self.transform.transform(order))
+        return float(processing_time[0]), float(downtime_risk[0])
+    
+    def _raw_batch(self, orders, chunk_size=4096):
+        # Raw outputs for a batch of orders: grid lookups (after the throttled
+        # model file check) when the grid is enabled, else a forward pass
+        if self.grid is not None:
+            self._check_model_file()
+            return self.grid.lookup(orders, chunk_size)
+        return self._forward(self.transform.transform(orders), chunk_size)
+
+    def _forward(self, features, chunk_size=4096):
+        # Raw model outputs for a feature matrix, in chunks of at most chunk_size rows
+        processing_time = np.empty(len(features), dtype=np.float32)
+        downtime_risk = np.empty(len(features), dtype=np.float32)
+        with torch.no_grad():
+            for start in range(0, len(features), chunk_size):
+                chunk = torch.from_numpy(features[start:start + chunk_size])
+                time_out, risk_out = self.model(chunk)
+                processing_time[start:start + chunk_size] = time_out.reshape(-1).numpy()
+                downtime_risk[start:start + chunk_size] = risk_out.reshape(-1).numpy()
+        return processing_time, downtime_risk
+
+    def predict_batch(self, orders, chunk_size=4096):
+        """
+        Predict processing time and downtime risk for many orders at once
         
-        # One-hot encoding (simplified)
-        color_encoded = [0] * 12  # 12 colors in original
-        oven_encoded = [0] * 2    # 2 ovens
+        Args:
+            orders: DataFrame, structured array or dict of columns with
+                buffer, priority, hour, color and oven (same meaning as in
+                predict_for_new_order)
+            chunk_size: Rows per forward pass, to bound peak memory
         
-        # Mock encoding - in real case, use saved encoder
-        if color in [f'C{i}' for i in range(1,13)]:
-            color_idx = int(color[1:]) - 1
-            color_encoded[color_idx] = 1
+        With prediction_grid, in-grid orders are table lookups and only the
+        rest run the model.
         
-        if oven == 'O1': oven_encoded[0] = 1
-        else: oven_encoded[1] = 1
+        Returns:
+            Dict of NumPy columns (a DataFrame if orders was one) with
+            processing_time_seconds, downtime_risk_percent,
+            recommended_buffer and estimated_completion_minutes
+        """
+        processing_time, downtime_risk = self._raw_batch(orders, chunk_size)
         
-        features = np.hstack([num_features[0], color_encoded, oven_encoded])
-        return features.reshape(1, -1)
+        results = {
+            'processing_time_seconds': np.round(processing_time, 1),
+            'downtime_risk_percent': np.round(downtime_risk * 100, 1),
+            'recommended_buffer': np.asarray(orders['buffer']),
+            'estimated_completion_minutes': np.round(processing_time / 60, 1),
+        }
+        # orders can only be a DataFrame if pandas is already imported
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(orders, pd.DataFrame):
+            return pd.DataFrame(results, index=orders.index)
+        return results
 
 # Example usage
 if __name__ == "__main__":
     print("🏭 Manufacturing AI - Production Deployment")
     print("=" * 50)
     
-    # Initialize the predictor
-    predictor = ProductionPredictor('twin_head_model.pth')
+    # Initialize the predictor (a trusted local file, which may be a legacy pickled module)
+    predictor = ProductionPredictor('twin_head_model.pth', allow_pickle=True)
     
     # Test cases - real manufacturing scenarios
     test_orders = [